@@ -1,7 +1,7 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Path
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Path, Depends, WebSocket
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse, RedirectResponse
 from fastapi.requests import Request
 from pydantic import BaseModel
 from murf import Murf
@@ -10,6 +10,11 @@ import google.generativeai as genai
 import os
 import uuid
 import logging
+import logging.handlers
+import queue
+import random
+import atexit
+import contextvars
 from datetime import datetime
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
@@ -19,19 +24,173 @@ import asyncio
 import time
 import traceback
 import json
+import hashlib
+import functools
+import re
+import shutil
+import io
+import gzip
+import mimetypes
+import math
+import struct
+import socket
+import ipaddress
+from urllib.parse import urlsplit
+import heapq
+import itertools
+import contextlib
+import abc
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict, deque
+import httpx
+import aiofiles
 
-# Configure comprehensive logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Optional numeric and audio decoding stack for server-side preprocessing and caching
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import av
+    AUDIO_PREPROCESSING_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    AUDIO_PREPROCESSING_AVAILABLE = False
+
+load_dotenv()
+
+# Logging: LOG_FORMAT "text" (default) or "json" for structured records. Records are handed
+# to a queue and formatted and written on a listener thread, so the request path never
+# blocks on I/O. INFO records of the chatty per-turn categories are sampled with
+# LOG_SAMPLING, e.g. {"session": 0.1, "provider": 1.0}; warnings and errors are always kept.
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_ENABLED = os.getenv("LOG_QUEUE_ENABLED", "true").lower() == "true"
+LOG_SAMPLING = {"session": 0.1, "provider": 1.0, "pipeline": 1.0}
+LOG_SAMPLING.update(json.loads(os.getenv("LOG_SAMPLING", "{}")))
+TEXT_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Request-scoped log context (endpoint, session_id, turn_id, stage), set by the pipeline engine
+log_context: contextvars.ContextVar = contextvars.ContextVar("log_context", default={})
+
+class LogContextFilter(logging.Filter):
+    """Attach the current request context to each record on the calling task"""
+    def filter(self, record):
+        record.context = log_context.get()
+        return True
+
+class LogSamplingFilter(logging.Filter):
+    """Keep a fraction of INFO/DEBUG records from one category logger"""
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+    
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records as-is: message formatting happens on the listener thread (the queue is in-process)"""
+    def prepare(self, record):
+        return record
+
+def record_extras(record: logging.LogRecord) -> Dict[str, Any]:
+    """Request context overlaid with the record's structured fields (unset fields keep the context value)"""
+    extras = dict(getattr(record, "context", {}))
+    extras.update((key, value) for key, value in getattr(record, "fields", {}).items() if value is not None)
+    return extras
+
+class ContextTextFormatter(logging.Formatter):
+    """The classic text format, followed by the request context and any structured fields"""
+    def format(self, record):
+        message = super().format(record)
+        extras = record_extras(record)
+        if extras:
+            message += " " + json.dumps(extras, default=str, separators=(",", ":"))
+        return message
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request context and structured fields"""
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **record_extras(record)
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+log_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging(log_format: str = LOG_FORMAT, use_queue: bool = LOG_QUEUE_ENABLED, stream=None) -> None:
+    """(Re)build the root handlers; the benchmark calls this to compare configurations"""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+    
+    output_handler = logging.StreamHandler(stream)
+    output_handler.setFormatter(JsonLogFormatter() if log_format == "json" else ContextTextFormatter(TEXT_LOG_FORMAT))
+    if use_queue:
+        root_handler = DeferredQueueHandler(queue.SimpleQueue())
+        log_listener = logging.handlers.QueueListener(root_handler.queue, output_handler)
+        log_listener.start()
+    else:
+        root_handler = output_handler
+    root_handler.addFilter(LogContextFilter())
+    
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(root_handler)
+    root.setLevel(LOG_LEVEL)
+
+def stop_logging() -> None:
+    """Flush queued records"""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+configure_logging()
+atexit.register(stop_logging)
 logger = logging.getLogger(__name__)
 
+# Per-turn category loggers, sampled by LOG_SAMPLING
+session_logger = logger.getChild("session")
+provider_logger = logger.getChild("provider")
+pipeline_logger = logger.getChild("pipeline")
+for category_logger in (session_logger, provider_logger, pipeline_logger):
+    rate = LOG_SAMPLING.get(category_logger.name.rsplit(".", 1)[-1], 1.0)
+    if rate < 1.0:
+        category_logger.addFilter(LogSamplingFilter(rate))
+
 # Error handling logger
 error_logger = logging.getLogger('error_handler')
 error_logger.setLevel(logging.ERROR)
 
-load_dotenv()
+if not AUDIO_PREPROCESSING_AVAILABLE:
+    logger.warning("PyAV/numpy not installed - audio preprocessing (VAD, silence trimming) disabled")
+
+
+# LLM models: primary and the smaller alternate used for fallback and hedging
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_FALLBACK_MODEL = os.getenv("GEMINI_FALLBACK_MODEL", "gemini-2.0-flash-lite")
 
 # API Keys with environment variable fallbacks
 MURF_API_KEY = os.getenv("MURF_API_KEY") or "ap2_0f754b94-2f6b-4dba-8498-ef39bb26b35e"
@@ -55,6 +214,208 @@ service_health = {
     "murf": {"status": "unknown", "last_check": None, "error_count": 0}
 }
 
+# Provider API base URLs (overridable to point at local stand-in services)
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+MURF_BASE_URL = os.getenv("MURF_BASE_URL", "https://api.murf.ai")
+
+# Async provider clients on a shared connection pool (instead of the blocking SDKs)
+ASYNC_PROVIDER_CLIENTS = os.getenv("ASYNC_PROVIDER_CLIENTS", "false").lower() == "true"
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true" and HTTP2_AVAILABLE
+ASSEMBLYAI_POLL_INTERVAL = float(os.getenv("ASSEMBLYAI_POLL_INTERVAL", "0.25"))
+ASSEMBLYAI_POLL_MAX_INTERVAL = float(os.getenv("ASSEMBLYAI_POLL_MAX_INTERVAL", "1.5"))
+ASSEMBLYAI_TIMEOUT = float(os.getenv("ASSEMBLYAI_TIMEOUT", "120"))
+ASSEMBLYAI_POLL_CONCURRENCY = int(os.getenv("ASSEMBLYAI_POLL_CONCURRENCY", "20"))
+# Public base URL of this server; when set, AssemblyAI pushes completions to /webhooks/assemblyai
+ASSEMBLYAI_WEBHOOK_BASE_URL = os.getenv("ASSEMBLYAI_WEBHOOK_BASE_URL", "").rstrip("/")
+ASSEMBLYAI_WEBHOOK_SECRET = os.getenv("ASSEMBLYAI_WEBHOOK_SECRET") or uuid.uuid4().hex
+# With webhooks the shared poller only runs as a slow safety net for lost deliveries
+ASSEMBLYAI_WEBHOOK_SAFETY_POLL = float(os.getenv("ASSEMBLYAI_WEBHOOK_SAFETY_POLL", "10"))
+
+# Connection and polling overhead per provider, measured from httpx connection traces
+provider_client_metrics = {
+    name: {"requests": 0, "new_connections": 0, "connect_ms": 0.0, "tls_ms": 0.0, "poll_requests": 0, "poll_wait_ms": 0.0}
+    for name in ("assemblyai", "gemini", "murf")
+}
+
+# Background health probing configuration
+HEALTH_PROBE_ENABLED = os.getenv("HEALTH_PROBE_ENABLED", "false").lower() == "true"
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "30"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+
+# Precomputed /health response up to the live session count; rebuilt after probe rounds, or
+# on the next read once service health has changed
+HEALTH_BODY_TAIL = b', "active_sessions": '
+health_snapshot = {"status": "unknown", "body_prefix": b'{"status": "unknown"' + HEALTH_BODY_TAIL,
+                   "dirty": False, "probe_rounds": 0}
+
+# Request coalescing (single-flight) configuration
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+
+# Identical provider calls currently in flight, keyed by request fingerprint: {"task", "waiters"}
+inflight_requests: Dict[str, Dict[str, Any]] = {}
+
+# Single-flight metrics per provider ("coalesced" is the number of provider calls saved)
+singleflight_metrics = {
+    "assemblyai": {"calls": 0, "executed": 0, "coalesced": 0},
+    "gemini": {"calls": 0, "executed": 0, "coalesced": 0},
+    "murf": {"calls": 0, "executed": 0, "coalesced": 0}
+}
+
+# Token-bucket rate limiting: sustained requests per second and burst size per client
+# session and IP on the provider-backed endpoints, and per upstream provider
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_SESSION_RATE = float(os.getenv("RATE_LIMIT_SESSION_RATE", "0.5"))
+RATE_LIMIT_SESSION_BURST = float(os.getenv("RATE_LIMIT_SESSION_BURST", "5"))
+RATE_LIMIT_CLIENT_RATE = float(os.getenv("RATE_LIMIT_CLIENT_RATE", "2"))
+RATE_LIMIT_CLIENT_BURST = float(os.getenv("RATE_LIMIT_CLIENT_BURST", "20"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))       # tracked sessions/IPs per scope
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+# Provider buckets should mirror the account quotas ([requests per second, burst]; unset or 0
+# disables), e.g. PROVIDER_RATE_LIMITS='{"gemini": [0.25, 15]}' for 15 requests per minute
+PROVIDER_RATE_LIMITS = {}
+PROVIDER_RATE_LIMITS.update(json.loads(os.getenv("PROVIDER_RATE_LIMITS", "{}")))
+# Provider calls queue for a token up to this long before failing fast with 429
+RATE_LIMIT_PROVIDER_MAX_WAIT = float(os.getenv("RATE_LIMIT_PROVIDER_MAX_WAIT", "5"))
+
+# Provider call scheduling: concurrent calls per provider, handed out by priority class
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+PROVIDER_CONCURRENCY = {"assemblyai": 8, "gemini": 8, "murf": 8}
+PROVIDER_CONCURRENCY.update(json.loads(os.getenv("PROVIDER_CONCURRENCY", "{}")))
+SCHEDULER_CLASSES = ("interactive", "standard", "bulk")  # highest priority first
+# Pipeline endpoint -> class; anything not listed is "standard"
+SCHEDULER_ENDPOINT_CLASSES = {
+    "agent_chat": "interactive", "agent_stream": "interactive", "llm_query": "interactive",
+    "tts_echo": "standard",
+    "transcribe_file": "bulk", "transcribe_batch": "bulk", "tts": "bulk", "bulk_tts": "bulk"
+}
+SCHEDULER_ENDPOINT_CLASSES.update(json.loads(os.getenv("SCHEDULER_ENDPOINT_CLASSES", "{}")))
+SCHEDULER_BULK_SHARE = float(os.getenv("SCHEDULER_BULK_SHARE", "0.5"))      # most of a provider's slots bulk work may hold
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "30"))  # waiting this long moves a call up one class
+
+# Voice activity detection / silence trimming configuration
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "12"))      # speech must be this far above the noise floor
+VAD_MIN_LEVEL_DB = float(os.getenv("VAD_MIN_LEVEL_DB", "-50"))     # absolute floor (dBFS) for speech frames
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "250"))     # less voiced audio than this counts as silence
+VAD_PADDING_MS = int(os.getenv("VAD_PADDING_MS", "200"))           # audio kept around detected speech
+VAD_MIN_TRIM_SECONDS = float(os.getenv("VAD_MIN_TRIM_SECONDS", "0.5"))  # below this, upload the original file
+
+# Pre-STT preprocessing stages per endpoint: "trim" (VAD silence trimming) and
+# "transcode" (always re-encode to mono 16 kHz Ogg/Opus). Override with a JSON
+# object in STT_PREPROCESSING, e.g. {"agent_chat": ["trim", "transcode"]}
+STT_PREPROCESSING_PROFILES = {
+    "default": ["trim"],
+    "agent_chat": ["trim", "transcode"]
+}
+STT_PREPROCESSING_PROFILES.update(json.loads(os.getenv("STT_PREPROCESSING", "{}")))
+AUDIO_PREPROCESSING_WORKERS = int(os.getenv("AUDIO_PREPROCESSING_WORKERS", "2"))
+TRANSCODE_BITRATE = int(os.getenv("TRANSCODE_BITRATE", "24000"))
+
+audio_preprocessing_metrics = {
+    "processed": 0,
+    "trimmed": 0,
+    "transcoded": 0,
+    "rejected_silence": 0,
+    "failed": 0,
+    "bytes_saved": 0,
+    "seconds_saved": 0.0
+}
+
+# Local audio proxy/cache: stream Murf output into our own store and serve it from /audio/{audio_id}
+AUDIO_PROXY_ENABLED = os.getenv("AUDIO_PROXY_ENABLED", "false").lower() == "true"
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "audio_cache")
+AUDIO_CACHE_MAX_FILES = int(os.getenv("AUDIO_CACHE_MAX_FILES", "500"))
+AUDIO_PROXY_CHUNK_SIZE = 64 * 1024
+AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Multi-segment TTS replies (llm_query, /tts) joined server-side into one streamed URL
+AUDIO_ASSEMBLY_ENABLED = os.getenv("AUDIO_ASSEMBLY_ENABLED", "true").lower() == "true"
+AUDIO_ASSEMBLY_TTL_SECONDS = int(os.getenv("AUDIO_ASSEMBLY_TTL_SECONDS", "600"))
+AUDIO_ASSEMBLY_MAX = int(os.getenv("AUDIO_ASSEMBLY_MAX", "500"))
+AUDIO_ASSEMBLY_SEGMENT_TIMEOUT = float(os.getenv("AUDIO_ASSEMBLY_SEGMENT_TIMEOUT", "60"))
+
+audio_proxy_metrics = {
+    "cache_hits": 0,
+    "downloads": 0,
+    "download_failures": 0,
+    "evictions": 0,
+    "bytes_downloaded": 0,
+    "bytes_served": 0
+}
+
+# Batch transcription jobs (manifest and NDJSON results persisted so jobs can resume)
+BATCH_JOBS_DIR = os.getenv("BATCH_JOBS_DIR", "batch_jobs")
+BATCH_STT_CONCURRENCY = int(os.getenv("BATCH_STT_CONCURRENCY", "4"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+# Manifest URLs are fetched by the server: only these hosts when set, otherwise any public host
+BATCH_URL_ALLOWED_HOSTS = {host.strip().lower() for host in os.getenv("BATCH_URL_ALLOWED_HOSTS", "").split(",") if host.strip()}
+BATCH_URL_MAX_BYTES = int(os.getenv("BATCH_URL_MAX_BYTES", str(100 * 1024 * 1024)))  # per manifest URL
+BATCH_JOB_RETENTION_HOURS = float(os.getenv("BATCH_JOB_RETENTION_HOURS", "168"))  # finished job dirs kept this long
+BULK_TTS_MAX_ITEMS = int(os.getenv("BULK_TTS_MAX_ITEMS", "10000"))
+BULK_TTS_CONCURRENCY = int(os.getenv("BULK_TTS_CONCURRENCY", "4"))
+BULK_TTS_RATE = float(os.getenv("BULK_TTS_RATE", "5"))  # Murf requests started per second
+
+# Asynchronous pipeline jobs ("Prefer: respond-async" on agent_chat and /llm/query)
+PIPELINE_JOB_WORKERS = int(os.getenv("PIPELINE_JOB_WORKERS", "4"))
+PIPELINE_JOB_QUEUE_SIZE = int(os.getenv("PIPELINE_JOB_QUEUE_SIZE", "200"))
+PIPELINE_JOB_STORE_SIZE = int(os.getenv("PIPELINE_JOB_STORE_SIZE", "1000"))
+PIPELINE_JOB_RESULT_TTL = int(os.getenv("PIPELINE_JOB_RESULT_TTL", "300"))   # seconds a finished job's result is kept
+PIPELINE_JOB_MAX_WAIT = float(os.getenv("PIPELINE_JOB_MAX_WAIT", "30"))      # longest long-poll on GET /jobs/{job_id}
+
+# Streaming turns (/agent/stream): AssemblyAI real-time STT with speculative LLM generation
+STREAM_SAMPLE_RATE = 16000
+STREAM_END_UTTERANCE_SILENCE_MS = int(os.getenv("STREAM_END_UTTERANCE_SILENCE_MS", "700"))
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "true").lower() == "true"
+SPECULATION_STABLE_MS = int(os.getenv("SPECULATION_STABLE_MS", "300"))        # partial unchanged this long -> end of utterance likely
+SPECULATION_MIN_WORDS = int(os.getenv("SPECULATION_MIN_WORDS", "3"))
+SPECULATION_MAX_ATTEMPTS = int(os.getenv("SPECULATION_MAX_ATTEMPTS", "2"))    # speculative starts per utterance
+# Cap on tokens spent on discarded speculations (refills continuously)
+SPECULATION_WASTE_TOKENS_PER_MINUTE = float(os.getenv("SPECULATION_WASTE_TOKENS_PER_MINUTE", "20000"))
+# Server-side endpointing on the streamed audio (needs numpy; otherwise AssemblyAI's own
+# STREAM_END_UTTERANCE_SILENCE_MS endpointing closes utterances)
+ENDPOINTING_ENABLED = os.getenv("ENDPOINTING_ENABLED", "true").lower() == "true" and NUMPY_AVAILABLE
+ENDPOINT_SILENCE_MS = int(os.getenv("ENDPOINT_SILENCE_MS", "700"))          # trailing silence that ends a turn, before tuning
+ENDPOINT_MIN_SILENCE_MS = int(os.getenv("ENDPOINT_MIN_SILENCE_MS", "350"))
+ENDPOINT_MAX_SILENCE_MS = int(os.getenv("ENDPOINT_MAX_SILENCE_MS", "1500"))
+ENDPOINT_MARGIN_MS = int(os.getenv("ENDPOINT_MARGIN_MS", "150"))            # added to the user's usual mid-sentence pause
+ENDPOINT_FALSE_CUT_MS = int(os.getenv("ENDPOINT_FALSE_CUT_MS", "1000"))     # speech this soon after an endpoint = cut too early
+ENDPOINT_SPECULATE_RATIO = float(os.getenv("ENDPOINT_SPECULATE_RATIO", "0.5"))  # fraction of the threshold that triggers speculation
+# Gemini context caching of the stable prompt prefix (older turns) per session
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "false").lower() == "true"
+if CONTEXT_CACHE_ENABLED and not ASYNC_PROVIDER_CLIENTS:
+    # Caches are created and referenced through the async REST client; replies made with the
+    # SDK would pay for the caches without ever reading from them
+    logger.warning("CONTEXT_CACHE_ENABLED needs ASYNC_PROVIDER_CLIENTS=true; context caching is off")
+    CONTEXT_CACHE_ENABLED = False
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "4096"))        # Gemini rejects smaller cached contents
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "600"))       # idle sessions' caches expire after this
+CONTEXT_CACHE_REFRESH_SECONDS = int(os.getenv("CONTEXT_CACHE_REFRESH_SECONDS", "180"))  # extend the TTL on use when less remains
+CONTEXT_CACHE_REBUILD_RATIO = float(os.getenv("CONTEXT_CACHE_REBUILD_RATIO", "0.5"))  # re-register once the uncached suffix is this share of the prefix
+CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("CONTEXT_CACHE_MAX_ENTRIES", "200"))
+# Latency-targeted generation budgets: max_tokens, model and a brevity instruction per spoken turn
+GENERATION_BUDGET_ENABLED = os.getenv("GENERATION_BUDGET_ENABLED", "false").lower() == "true"  # requests can also opt in with targets
+BUDGET_TARGET_FIRST_AUDIO_MS = int(os.getenv("BUDGET_TARGET_FIRST_AUDIO_MS", "3000"))
+BUDGET_TARGET_TOTAL_MS = int(os.getenv("BUDGET_TARGET_TOTAL_MS", "6000"))
+BUDGET_ENDPOINTS = set(os.getenv("BUDGET_ENDPOINTS", "agent_chat,agent_stream").split(","))
+BUDGET_MIN_TOKENS = int(os.getenv("BUDGET_MIN_TOKENS", "80"))             # never squeeze a reply below this
+BUDGET_SAMPLE_WINDOW = int(os.getenv("BUDGET_SAMPLE_WINDOW", "50"))
+# Latency priors until enough turns are measured: [base ms, ms per output token] per LLM backend
+BUDGET_LLM_PRIORS = {"gemini": [500, 8], "gemini-lite": [350, 5]}
+BUDGET_LLM_PRIORS.update(json.loads(os.getenv("BUDGET_LLM_PRIORS", "{}")))
+# Segmentation of streamed replies for TTS: "adaptive" (short first segment, growing after) or "fixed"
+TTS_SEGMENTATION = os.getenv("TTS_SEGMENTATION", "adaptive").lower()
+TTS_LATENCY_PRIOR = json.loads(os.getenv("TTS_LATENCY_PRIOR", "[400, 6]"))  # Murf [base ms, ms per character] until measured
+TTS_FIRST_SEGMENT_TARGET_MS = int(os.getenv("TTS_FIRST_SEGMENT_TARGET_MS", "800"))  # synthesis time aimed for the first segment
+TTS_FIRST_SEGMENT_MIN_CHARS = int(os.getenv("TTS_FIRST_SEGMENT_MIN_CHARS", "40"))
+TTS_FIRST_SEGMENT_MAX_CHARS = int(os.getenv("TTS_FIRST_SEGMENT_MAX_CHARS", "240"))
+TTS_SEGMENT_GROWTH = float(os.getenv("TTS_SEGMENT_GROWTH", "2.0"))
+TTS_SPEECH_CHARS_PER_SECOND = float(os.getenv("TTS_SPEECH_CHARS_PER_SECOND", "15"))
+
 # Initialize clients with error handling
 def initialize_clients():
     """Initialize API clients with proper error handling"""
@@ -66,7 +427,7 @@ def initialize_clients():
         logger.info("Murf client initialized successfully")
         service_health["murf"]["status"] = "healthy"
     except Exception as e:
-        logger.error(f"Failed to initialize Murf client: {str(e)}")
+        logger.error("Failed to initialize Murf client: %s", e)
         service_health["murf"]["status"] = "error"
         client = None
 
@@ -77,18 +438,18 @@ def initialize_clients():
         logger.info("AssemblyAI client initialized successfully")
         service_health["assemblyai"]["status"] = "healthy"
     except Exception as e:
-        logger.error(f"Failed to initialize AssemblyAI client: {str(e)}")
+        logger.error("Failed to initialize AssemblyAI client: %s", e)
         service_health["assemblyai"]["status"] = "error"
         transcriber = None
 
     try:
         # Configure Gemini
         genai.configure(api_key=GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+        gemini_model = genai.GenerativeModel(GEMINI_MODEL)
         logger.info("Gemini client initialized successfully")
         service_health["gemini"]["status"] = "healthy"
     except Exception as e:
-        logger.error(f"Failed to initialize Gemini client: {str(e)}")
+        logger.error("Failed to initialize Gemini client: %s", e)
         service_health["gemini"]["status"] = "error"
         gemini_model = None
 
@@ -111,27 +472,110 @@ STATIC_DIR = "static"
 TEMPLATES_DIR = "templates"
 UPLOAD_DIR = "uploads"
 
-for directory in [STATIC_DIR, TEMPLATES_DIR, UPLOAD_DIR]:
+for directory in [STATIC_DIR, TEMPLATES_DIR, UPLOAD_DIR, AUDIO_CACHE_DIR, BATCH_JOBS_DIR]:
     if not os.path.exists(directory):
         os.makedirs(directory)
-        logger.info(f"Created directory: {directory}")
+        logger.info("Created directory: %s", directory)
 
 # Check current working directory and templates
 current_dir = os.getcwd()
 templates_path = os.path.join(current_dir, TEMPLATES_DIR)
-logger.info(f"Current working directory: {current_dir}")
-logger.info(f"Templates directory path: {templates_path}")
-logger.info(f"Templates directory exists: {os.path.exists(templates_path)}")
+logger.info("Current working directory: %s", current_dir)
+logger.info("Templates directory path: %s", templates_path)
+logger.info("Templates directory exists: %s", os.path.exists(templates_path))
 
 if os.path.exists(templates_path):
     template_files = os.listdir(templates_path)
-    logger.info(f"Files in templates directory: {template_files}")
+    logger.info("Files in templates directory: %s", template_files)
 
 # Setup static files and templates
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
+# Static asset pipeline: at startup every file under static/ gets a content-hashed name
+# (served from /assets with immutable caching) plus gzip/brotli variants, and the index
+# page is rendered once with those names and served from memory with ETag revalidation.
+# Restart the server after changing a static file or the template.
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ASSET_MIN_COMPRESS_BYTES = 512
+
+# Fingerprinted name -> {"content_type", "etag", "variants": {encoding: bytes}}
+static_assets: Dict[str, Dict[str, Any]] = {}
+# Source path under static/ -> fingerprinted name
+asset_names: Dict[str, str] = {}
+index_page: Dict[str, Any] = {}
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    """Identity plus whichever precompressed encodings are actually smaller"""
+    variants = {"identity": body}
+    if len(body) >= ASSET_MIN_COMPRESS_BYTES:
+        candidates = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if BROTLI_AVAILABLE:
+            candidates["br"] = brotli.compress(body, quality=11)
+        variants.update((encoding, data) for encoding, data in candidates.items() if len(data) < len(body))
+    return variants
+
+def build_static_assets() -> None:
+    for root, _, filenames in os.walk(STATIC_DIR):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            source = os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                body = f.read()
+            digest = hashlib.sha256(body).hexdigest()[:12]
+            stem, extension = os.path.splitext(source)
+            name = f"{stem}.{digest}{extension}"
+            static_assets[name] = {
+                "content_type": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+                "etag": f'W/"{digest}"',
+                "variants": compress_variants(body)
+            }
+            asset_names[source] = name
+    logger.info("Prepared %d static assets (brotli=%s)", len(static_assets), BROTLI_AVAILABLE)
+
+def asset_url(path: str) -> str:
+    """URL of the fingerprinted asset, falling back to the plain /static path"""
+    name = asset_names.get(path)
+    return f"/assets/{name}" if name else f"/static/{path}"
+
+def render_index_page() -> None:
+    html = templates.env.get_template("index.html").render(asset_url=asset_url).encode()
+    index_page.update({
+        "content_type": "text/html; charset=utf-8",
+        "etag": f'W/"{hashlib.sha256(html).hexdigest()[:16]}"',
+        "variants": compress_variants(html)
+    })
+
+def negotiate_encoding(request: Request, variants: Dict[str, bytes]) -> str:
+    """Best precompressed variant the client accepts (brotli, then gzip)"""
+    accepted = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                pass
+        accepted[token.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+def serve_precompressed(request: Request, entry: Dict[str, Any], cache_control: str) -> Response:
+    headers = {"ETag": entry["etag"], "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or entry["etag"] in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate_encoding(request, entry["variants"])
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry["variants"][encoding], media_type=entry["content_type"], headers=headers)
+
+build_static_assets()
+
 # Pydantic models for request validation
 class TextInput(BaseModel):
     text: str
@@ -141,6 +585,15 @@ class LLMQuery(BaseModel):
     query: str
     max_tokens: int = 1000
     temperature: float = 0.7
+    use_cache: bool = True
+
+class BulkTTSItem(BaseModel):
+    text: str
+    voice_id: str = "en-US-natalie"
+    id: Optional[str] = None
+
+class BulkTTSRequest(BaseModel):
+    items: List[BulkTTSItem]
 
 class ErrorResponse(BaseModel):
     success: bool = False
@@ -153,6 +606,8 @@ class ErrorResponse(BaseModel):
 # In-memory chat storage (enhanced with error tracking)
 chat_sessions: Dict[str, Dict[str, Any]] = {}
 
+health_probe_task: Optional[asyncio.Task] = None
+
 # Error handling utilities
 def log_error(error_type: str, error_message: str, session_id: str = None, additional_info: Dict = None):
     """Centralized error logging with context"""
@@ -163,7 +618,7 @@ def log_error(error_type: str, error_message: str, session_id: str = None, addit
         "timestamp": datetime.now().isoformat(),
         "additional_info": additional_info or {}
     }
-    error_logger.error(f"Error occurred: {json.dumps(error_context, indent=2)}")
+    error_logger.error("Error occurred: %s", error_type, extra={"fields": error_context})
 
 def update_service_health(service_name: str, is_healthy: bool, error_message: str = None):
     """Update service health status"""
@@ -177,40 +632,1038 @@ def update_service_health(service_name: str, is_healthy: bool, error_message: st
             service_health[service_name]["error_count"] += 1
             if error_message:
                 service_health[service_name]["last_error"] = error_message
+        # Called on every provider response, so leave serialisation to the next reader
+        health_snapshot["dirty"] = True
+
+def refresh_health_snapshot() -> None:
+    """Rebuild the serialized /health payload so the endpoint does no work per request"""
+    health_snapshot["dirty"] = False
+    overall_status = "healthy"
+    issues = []
+    
+    for service, health in service_health.items():
+        if health["status"] == "error":
+            overall_status = "degraded"
+            issues.append(f"{service}: {health.get('last_error', 'Unknown error')}")
+    
+    if len(issues) >= 3:
+        overall_status = "unhealthy"
+    
+    body = json.dumps({
+        "status": overall_status,
+        "timestamp": datetime.now().isoformat(),
+        "services": service_health,
+        "issues": issues,
+        "probe_rounds": health_snapshot["probe_rounds"],
+        "probe_interval": HEALTH_PROBE_INTERVAL if HEALTH_PROBE_ENABLED else None
+    }).encode("utf-8")
+    health_snapshot["status"] = overall_status
+    # Leave the object open so /health only has to append the session count and close it
+    health_snapshot["body_prefix"] = body[:-1] + HEALTH_BODY_TAIL
+
+def current_health_snapshot() -> Dict[str, Any]:
+    if health_snapshot["dirty"]:
+        refresh_health_snapshot()
+    return health_snapshot
+
+def build_health_probe(service_name: str) -> tuple:
+    """Cheap authenticated read-only request for each provider: (url, headers, params)"""
+    if service_name == "assemblyai":
+        return f"{ASSEMBLYAI_BASE_URL}/v2/transcript", {"authorization": ASSEMBLYAI_API_KEY}, {"limit": 1}
+    if service_name == "gemini":
+        return f"{GEMINI_BASE_URL}/v1beta/models/{GEMINI_MODEL}", {"x-goog-api-key": GEMINI_API_KEY}, None
+    return f"{MURF_BASE_URL}/v1/speech/voices", {"api-key": MURF_API_KEY}, None
+
+async def probe_service(service_name: str) -> None:
+    """Actively check one provider and record its status and latency"""
+    url, headers, params = build_health_probe(service_name)
+    start_time = time.time()
+    try:
+        response = await get_http_client().get(url, headers=headers, params=params, timeout=HEALTH_PROBE_TIMEOUT)
+        service_health[service_name]["probe_latency_ms"] = round((time.time() - start_time) * 1000, 1)
+        service_health[service_name]["last_probe"] = datetime.now().isoformat()
+        if response.status_code < 400:
+            update_service_health(service_name, True)
+        else:
+            update_service_health(service_name, False, f"Health probe returned HTTP {response.status_code}")
+    except Exception as e:
+        service_health[service_name]["probe_latency_ms"] = None
+        service_health[service_name]["last_probe"] = datetime.now().isoformat()
+        update_service_health(service_name, False, f"Health probe failed: {str(e)}")
+
+async def health_probe_loop() -> None:
+    """Probe all providers concurrently every HEALTH_PROBE_INTERVAL seconds"""
+    while True:
+        await asyncio.gather(*(probe_service(name) for name in service_health), return_exceptions=True)
+        health_snapshot["probe_rounds"] += 1
+        refresh_health_snapshot()
+        await asyncio.sleep(HEALTH_PROBE_INTERVAL)
+
+def make_request_key(provider: str, *parts: Any) -> str:
+    """Build a stable fingerprint for a provider call from its arguments"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray)):
+            digest.update(part)
+        else:
+            digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return f"{provider}:{digest.hexdigest()}"
+
+async def single_flight(provider: str, key: str, call) -> Any:
+    """Run call() once per key; concurrent callers with the same key share its result.
+
+    The call runs as its own task, so one caller being cancelled (e.g. a losing hedge)
+    does not fail the others; it is only cancelled once every waiter has gone.
+    """
+    stats = singleflight_metrics[provider]
+    stats["calls"] += 1
+    
+    entry = inflight_requests.get(key)
+    coalesced = entry is not None
+    if coalesced:
+        stats["coalesced"] += 1
+        provider_logger.info("Coalesced %s request onto in-flight call (%d saved)", provider, stats["coalesced"])
+    else:
+        stats["executed"] += 1
+        entry = {"task": asyncio.ensure_future(call()), "waiters": 0}
+        inflight_requests[key] = entry
+        
+        def finished(task, entry=entry):
+            if inflight_requests.get(key) is entry:
+                del inflight_requests[key]
+            # Mark the outcome as retrieved even if every waiter was cancelled
+            if not task.cancelled():
+                task.exception()
+        
+        entry["task"].add_done_callback(finished)
+    
+    entry["waiters"] += 1
+    try:
+        result = await asyncio.shield(entry["task"])
+    except asyncio.CancelledError:
+        if entry["waiters"] == 1 and not entry["task"].done():
+            entry["task"].cancel()
+        raise
+    finally:
+        entry["waiters"] -= 1
+    return dict(result) if coalesced and isinstance(result, dict) else result
+
+def coalesce_inflight(provider: str):
+    """Decorator that deduplicates identical in-flight calls to a safe_* helper"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not SINGLEFLIGHT_ENABLED:
+                return await func(*args, **kwargs)
+            key = make_request_key(provider, func.__name__, *args, *sorted(kwargs.items()))
+            return await single_flight(provider, key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+# Audio preprocessing (CPU-only, runs before any provider call)
+def decode_audio_to_pcm(audio_data: bytes, sample_rate: int = VAD_SAMPLE_RATE):
+    """Decode an uploaded container (WebM/Opus, Ogg, WAV, ...) to mono int16 PCM"""
+    container = av.open(io.BytesIO(audio_data))
+    try:
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+        chunks = []
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    finally:
+        container.close()
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+
+def detect_speech_bounds(samples, sample_rate: int = VAD_SAMPLE_RATE) -> Optional[tuple]:
+    """Energy-based frame VAD; returns (start_sample, end_sample) of speech or None for silence"""
+    frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+    frame_count = len(samples) // frame_length
+    if frame_count == 0:
+        return None
+    
+    frames = samples[:frame_count * frame_length].astype(np.float32).reshape(frame_count, frame_length) / 32768.0
+    levels_db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+    
+    # Adaptive threshold relative to the quietest part of the clip
+    noise_floor_db = np.percentile(levels_db, 10)
+    threshold_db = max(noise_floor_db + VAD_THRESHOLD_DB, VAD_MIN_LEVEL_DB)
+    voiced = np.flatnonzero(levels_db > threshold_db)
+    
+    if len(voiced) * VAD_FRAME_MS < VAD_MIN_SPEECH_MS:
+        # A clip that is speech throughout has no quiet part to measure against; only call it
+        # silence when it is quiet in absolute terms too, otherwise keep all of it
+        if np.count_nonzero(levels_db > VAD_MIN_LEVEL_DB) * VAD_FRAME_MS < VAD_MIN_SPEECH_MS:
+            return None
+        return 0, len(samples)
+    
+    padding_frames = VAD_PADDING_MS // VAD_FRAME_MS
+    start_frame = max(int(voiced[0]) - padding_frames, 0)
+    end_frame = min(int(voiced[-1]) + 1 + padding_frames, frame_count)
+    return start_frame * frame_length, end_frame * frame_length
+
+def encode_pcm_to_ogg_opus(samples, sample_rate: int = VAD_SAMPLE_RATE) -> bytes:
+    """Encode mono int16 PCM as a compact Ogg/Opus file"""
+    buffer = io.BytesIO()
+    container = av.open(buffer, mode="w", format="ogg")
+    try:
+        stream = container.add_stream("libopus", rate=sample_rate)
+        stream.codec_context.layout = "mono"
+        stream.codec_context.bit_rate = TRANSCODE_BITRATE
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = sample_rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    finally:
+        container.close()
+    return buffer.getvalue()
+
+def run_audio_preprocessing(audio_data: bytes, stages: tuple) -> tuple:
+    """Apply pre-STT stages to an upload; returns (audio or None for silence, stats).
+
+    Module-level so it can run in the preprocessing process pool.
+    """
+    samples = decode_audio_to_pcm(audio_data)
+    original_seconds = len(samples) / VAD_SAMPLE_RATE
+    stats = {
+        "stages": list(stages),
+        "original_bytes": len(audio_data),
+        "original_seconds": round(original_seconds, 3),
+        "output_bytes": len(audio_data),
+        "speech_detected": None,
+        "trimmed": False,
+        "transcoded": False,
+        "bytes_saved": 0,
+        "seconds_saved": 0.0
+    }
+    
+    if "trim" in stages:
+        bounds = detect_speech_bounds(samples)
+        if bounds is None:
+            stats.update({
+                "speech_detected": False,
+                "output_bytes": 0,
+                "bytes_saved": len(audio_data),
+                "seconds_saved": round(original_seconds, 3)
+            })
+            return None, stats
+        stats["speech_detected"] = True
+        start, end = bounds
+        trimmed_seconds = original_seconds - (end - start) / VAD_SAMPLE_RATE
+        if trimmed_seconds >= VAD_MIN_TRIM_SECONDS:
+            samples = samples[start:end]
+            stats["trimmed"] = True
+            stats["seconds_saved"] = round(trimmed_seconds, 3)
+    
+    if not stats["trimmed"] and "transcode" not in stages:
+        return audio_data, stats
+    
+    output_audio = encode_pcm_to_ogg_opus(samples)
+    # A transcode that does not shrink the upload is not worth sending
+    if not stats["trimmed"] and len(output_audio) >= len(audio_data):
+        return audio_data, stats
+    
+    stats.update({
+        "transcoded": "transcode" in stages,
+        "output_bytes": len(output_audio),
+        "bytes_saved": len(audio_data) - len(output_audio)
+    })
+    return output_audio, stats
+
+audio_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_audio_process_pool() -> ProcessPoolExecutor:
+    """Lazily create the process pool used for audio decoding and encoding"""
+    global audio_process_pool
+    if audio_process_pool is None:
+        audio_process_pool = ProcessPoolExecutor(max_workers=AUDIO_PREPROCESSING_WORKERS)
+        logger.info("Started audio preprocessing pool with %d workers", AUDIO_PREPROCESSING_WORKERS)
+    return audio_process_pool
+
+async def preprocess_audio_for_stt(audio_data: bytes, endpoint: str = "default") -> tuple:
+    """Run the endpoint's pre-STT stages; rejects silence-only clips and fails open on decode errors"""
+    stages = tuple(STT_PREPROCESSING_PROFILES.get(endpoint, STT_PREPROCESSING_PROFILES["default"]))
+    if not VAD_ENABLED:
+        stages = tuple(stage for stage in stages if stage != "trim")
+    if not stages or not AUDIO_PREPROCESSING_AVAILABLE:
+        return audio_data, None
+    
+    try:
+        loop = asyncio.get_running_loop()
+        start_time = time.time()
+        processed_audio, stats = await loop.run_in_executor(
+            get_audio_process_pool(), run_audio_preprocessing, audio_data, stages
+        )
+        stats["processing_time"] = (time.time() - start_time) * 1000
+    except Exception as e:
+        audio_preprocessing_metrics["failed"] += 1
+        logger.warning("Audio preprocessing failed, uploading original audio: %s", e)
+        return audio_data, None
+    
+    audio_preprocessing_metrics["processed"] += 1
+    audio_preprocessing_metrics["bytes_saved"] += stats["bytes_saved"]
+    audio_preprocessing_metrics["seconds_saved"] += stats["seconds_saved"]
+    
+    if processed_audio is None:
+        audio_preprocessing_metrics["rejected_silence"] += 1
+        pipeline_logger.info("Rejected silence-only clip (%ss) before STT", stats["original_seconds"])
+        raise HTTPException(status_code=400, detail="No speech detected in the audio")
+    
+    if stats["trimmed"]:
+        audio_preprocessing_metrics["trimmed"] += 1
+    if stats["transcoded"]:
+        audio_preprocessing_metrics["transcoded"] += 1
+    if stats["trimmed"] or stats["transcoded"]:
+        pipeline_logger.info("Preprocessed audio for %s: %d -> %d bytes, %ss silence removed",
+                             endpoint, stats["original_bytes"], stats["output_bytes"], stats["seconds_saved"])
+    
+    return processed_audio, stats
+
+# Shared HTTP client for outbound provider traffic
+http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Lazily create the shared, tuned outbound connection pool"""
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            follow_redirects=True
+        )
+        logger.info("Outbound HTTP pool ready (http2=%s, max_connections=%d)", HTTP2_ENABLED, HTTP_POOL_MAX_CONNECTIONS)
+    return http_client
+
+def connection_trace(provider: str):
+    """httpcore trace hook that records TCP connect and TLS handshake time for a provider"""
+    stats = provider_client_metrics[provider]
+    started = {}
+    
+    async def trace(event_name: str, info: Dict[str, Any]) -> None:
+        if event_name.endswith(".started"):
+            started[event_name[:-len(".started")]] = time.perf_counter()
+        elif event_name.endswith(".complete"):
+            step = event_name[:-len(".complete")]
+            if step not in started:
+                return
+            elapsed_ms = (time.perf_counter() - started.pop(step)) * 1000
+            if step == "connection.connect_tcp":
+                stats["new_connections"] += 1
+                stats["connect_ms"] += elapsed_ms
+            elif step == "connection.start_tls":
+                stats["tls_ms"] += elapsed_ms
+    
+    return trace
+
+class AsyncProviderClient:
+    """Base for async provider clients sharing the pooled HTTP client"""
+    provider = ""
+    
+    def __init__(self, base_url: str, headers: Dict[str, str]):
+        self.base_url = base_url.rstrip("/")
+        self.headers = headers
+    
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        provider_client_metrics[self.provider]["requests"] += 1
+        response = await get_http_client().request(
+            method,
+            f"{self.base_url}{path}",
+            headers={**self.headers, **kwargs.pop("headers", {})},
+            extensions={"trace": connection_trace(self.provider)},
+            **kwargs
+        )
+        response.raise_for_status()
+        return response
 
-async def safe_transcribe_audio(audio_data: bytes, max_retries: int = 2) -> Dict[str, Any]:
+class AsyncAssemblyAIClient(AsyncProviderClient):
+    """Upload, submit and poll AssemblyAI transcripts over the shared pool"""
+    provider = "assemblyai"
+    
+    async def upload(self, audio_data: bytes) -> str:
+        response = await self.request("POST", "/v2/upload", content=audio_data)
+        return response.json()["upload_url"]
+    
+    async def submit(self, audio_url: str, **options) -> Dict[str, Any]:
+        response = await self.request("POST", "/v2/transcript", json={"audio_url": audio_url, **options})
+        return response.json()
+    
+    async def get_transcript(self, transcript_id: str) -> Dict[str, Any]:
+        response = await self.request("GET", f"/v2/transcript/{transcript_id}")
+        return response.json()
+    
+    async def transcribe(self, audio_data: bytes) -> Dict[str, Any]:
+        """Upload, submit and await completion through the shared transcription engine"""
+        return await transcription_engine.transcribe(audio_data)
+
+class TranscriptionEngine:
+    """Submit-and-await AssemblyAI jobs.
+
+    Each caller uploads, registers its transcript ID and awaits a future. Completions
+    arrive through the webhook route or a single shared poller task that multiplexes
+    every outstanding job, so concurrent transcriptions need no threads of their own.
+    """
+    
+    def __init__(self, api: "AsyncAssemblyAIClient"):
+        self.api = api
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.poller_task: Optional[asyncio.Task] = None
+        # Set when a job is registered, so a poller sleeping until a distant poll wakes up
+        self.wakeup = asyncio.Event()
+        self.metrics = {
+            "submitted": 0,
+            "completed_by_webhook": 0,
+            "completed_by_poll": 0,
+            "completed_on_submit": 0,
+            "timeouts": 0,
+            "poll_sweeps": 0
+        }
+    
+    async def transcribe(self, audio_data: bytes) -> Dict[str, Any]:
+        options = {}
+        if ASSEMBLYAI_WEBHOOK_BASE_URL:
+            options = {
+                "webhook_url": f"{ASSEMBLYAI_WEBHOOK_BASE_URL}/webhooks/assemblyai",
+                "webhook_auth_header_name": "X-Webhook-Secret",
+                "webhook_auth_header_value": ASSEMBLYAI_WEBHOOK_SECRET
+            }
+        # A provider slot covers the upload and submit requests only; waiting for the transcript
+        # is a registered future and uses no provider capacity
+        async with provider_slot("assemblyai", len(audio_data)):
+            job = await self.api.submit(await self.api.upload(audio_data), **options)
+        self.metrics["submitted"] += 1
+        if job["status"] in ("completed", "error"):
+            self.metrics["completed_on_submit"] += 1
+            return job
+        
+        future = asyncio.get_running_loop().create_future()
+        self.pending[job["id"]] = {
+            "future": future,
+            "interval": ASSEMBLYAI_POLL_INTERVAL,
+            "next_poll": time.time() + (ASSEMBLYAI_WEBHOOK_SAFETY_POLL if ASSEMBLYAI_WEBHOOK_BASE_URL else ASSEMBLYAI_POLL_INTERVAL)
+        }
+        self.wakeup.set()
+        self.ensure_poller()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), ASSEMBLYAI_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            raise TimeoutError(f"AssemblyAI transcript {job['id']} timed out")
+        finally:
+            self.pending.pop(job["id"], None)
+    
+    def resolve(self, job: Dict[str, Any], source: str) -> bool:
+        """Complete the waiter for a finished job; returns False if nobody is waiting"""
+        entry = self.pending.get(job.get("id"))
+        if entry is None or entry["future"].done() or job.get("status") not in ("completed", "error"):
+            return False
+        entry["future"].set_result(job)
+        self.metrics[f"completed_by_{source}"] += 1
+        return True
+    
+    async def handle_webhook(self, transcript_id: str) -> bool:
+        """Fetch the finished transcript announced by a webhook and wake its waiter"""
+        if transcript_id not in self.pending:
+            return False
+        return self.resolve(await self.api.get_transcript(transcript_id), "webhook")
+    
+    def ensure_poller(self) -> None:
+        if self.poller_task is None or self.poller_task.done():
+            self.poller_task = asyncio.create_task(self.poll_loop())
+    
+    async def poll_loop(self) -> None:
+        """One task polls every outstanding job, each on its own backoff schedule"""
+        semaphore = asyncio.Semaphore(ASSEMBLYAI_POLL_CONCURRENCY)
+        stats = provider_client_metrics["assemblyai"]
+        
+        def back_off(transcript_id: str) -> None:
+            entry = self.pending.get(transcript_id)
+            if entry is not None:
+                max_interval = ASSEMBLYAI_WEBHOOK_SAFETY_POLL if ASSEMBLYAI_WEBHOOK_BASE_URL else ASSEMBLYAI_POLL_MAX_INTERVAL
+                entry["interval"] = min(entry["interval"] * 1.5, max_interval)
+                entry["next_poll"] = time.time() + entry["interval"]
+        
+        async def poll(transcript_id: str) -> None:
+            async with semaphore:
+                try:
+                    job = await self.api.get_transcript(transcript_id)
+                except Exception as e:
+                    # Failed polls back off too, so an outage is not polled in a tight loop
+                    logger.warning("Poll for transcript %s failed: %s", transcript_id, e)
+                    back_off(transcript_id)
+                    return
+                stats["poll_requests"] += 1
+                if not self.resolve(job, "poll"):
+                    back_off(transcript_id)
+        
+        while self.pending:
+            self.wakeup.clear()
+            wait = max(min(entry["next_poll"] for entry in self.pending.values()) - time.time(), 0)
+            start_time = time.time()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            stats["poll_wait_ms"] += (time.time() - start_time) * 1000
+            now = time.time()
+            due = [tid for tid, entry in list(self.pending.items()) if entry["next_poll"] <= now]
+            if due:
+                self.metrics["poll_sweeps"] += 1
+                await asyncio.gather(*(poll(tid) for tid in due))
+
+class AsyncGeminiClient(AsyncProviderClient):
+    """Gemini generateContent over the shared pool"""
+    provider = "gemini"
+    
+    async def generate(self, prompt: str, model: str = GEMINI_MODEL, max_tokens: int = 800, temperature: float = 0.7,
+                       cached_content: Optional[str] = None) -> Dict[str, Any]:
+        payload = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"maxOutputTokens": max_tokens, "temperature": temperature}
+        }
+        if cached_content:
+            # The prompt is only the suffix; Gemini prepends the cached contents
+            payload["cachedContent"] = cached_content
+        response = await self.request("POST", f"/v1beta/models/{model}:generateContent", json=payload)
+        data = response.json()
+        candidates = data.get("candidates") or [{}]
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return {"text": "".join(part.get("text", "") for part in parts), "usage": data.get("usageMetadata", {})}
+
+    async def create_cache(self, text: str, model: str, ttl_seconds: int) -> Dict[str, Any]:
+        response = await self.request("POST", "/v1beta/cachedContents", json={
+            "model": f"models/{model}",
+            "contents": [{"role": "user", "parts": [{"text": text}]}],
+            "ttl": f"{ttl_seconds}s"
+        })
+        return response.json()
+
+    async def update_cache_ttl(self, name: str, ttl_seconds: int) -> Dict[str, Any]:
+        response = await self.request("PATCH", f"/v1beta/{name}", params={"updateMask": "ttl"}, json={"ttl": f"{ttl_seconds}s"})
+        return response.json()
+
+    async def delete_cache(self, name: str) -> None:
+        await self.request("DELETE", f"/v1beta/{name}")
+
+class AsyncMurfClient(AsyncProviderClient):
+    """Murf speech generation over the shared pool"""
+    provider = "murf"
+    
+    async def generate(self, text: str, voice_id: str) -> Dict[str, Any]:
+        response = await self.request("POST", "/v1/speech/generate", json={"text": text, "voiceId": voice_id})
+        return response.json()
+
+assemblyai_client = AsyncAssemblyAIClient(ASSEMBLYAI_BASE_URL, {"authorization": ASSEMBLYAI_API_KEY})
+transcription_engine = TranscriptionEngine(assemblyai_client)
+gemini_client = AsyncGeminiClient(GEMINI_BASE_URL, {"x-goog-api-key": GEMINI_API_KEY})
+murf_client = AsyncMurfClient(MURF_BASE_URL, {"api-key": MURF_API_KEY})
+
+# Rate limiting
+class TokenBucket:
+    """Refills continuously at `rate` tokens per second up to `burst`"""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+    
+    def take(self, cost: float = 1.0, max_wait: float = 0.0) -> tuple:
+        """Spend `cost` tokens; returns (allowed, seconds). An allowed take may reserve future
+        tokens (up to max_wait) and the caller waits those seconds; a refused take reports the retry-after"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = (cost - self.tokens) / self.rate if self.tokens < cost else 0.0
+        if wait > max_wait:
+            return False, wait
+        self.tokens -= cost
+        return True, wait
+
+class RateLimiter:
+    """Token buckets per scope (session, client, provider) and key, dropping the least recently used keys"""
+    
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.buckets: Dict[str, "OrderedDict[str, TokenBucket]"] = {}
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+    
+    def check(self, scope: str, key: str, rate: float, burst: float, cost: float = 1.0, max_wait: float = 0.0) -> tuple:
+        if rate <= 0:
+            return True, 0.0
+        buckets = self.buckets.setdefault(scope, OrderedDict())
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, burst)
+            if len(buckets) > self.max_keys:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+        
+        allowed, wait = bucket.take(cost, max_wait)
+        stats = self.metrics.setdefault(scope, {"allowed": 0, "limited": 0, "delayed": 0, "delay_ms": 0.0})
+        if not allowed:
+            stats["limited"] += 1
+        else:
+            stats["allowed"] += 1
+            if wait > 0:
+                stats["delayed"] += 1
+                stats["delay_ms"] += wait * 1000
+        return allowed, wait
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            scope: {**stats, "delay_ms": round(stats["delay_ms"], 1), "tracked_keys": len(self.buckets.get(scope, ()))}
+            for scope, stats in self.metrics.items()
+        }
+
+rate_limiter = RateLimiter(RATE_LIMIT_MAX_KEYS)
+
+def rate_limit_error(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+def client_address(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED and request.headers.get("x-forwarded-for"):
+        return request.headers["x-forwarded-for"].split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+async def enforce_rate_limits(request: Request) -> None:
+    """Route dependency: per-session then per-client buckets on provider-backed endpoints"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    session_id = request.path_params.get("session_id")
+    if session_id:
+        allowed, retry_after = rate_limiter.check("session", session_id, RATE_LIMIT_SESSION_RATE, RATE_LIMIT_SESSION_BURST)
+        if not allowed:
+            raise rate_limit_error("Too many requests for this session", retry_after)
+    allowed, retry_after = rate_limiter.check("client", client_address(request), RATE_LIMIT_CLIENT_RATE, RATE_LIMIT_CLIENT_BURST)
+    if not allowed:
+        raise rate_limit_error("Too many requests from this client", retry_after)
+
+async def acquire_provider_capacity(provider: str) -> None:
+    """Shape outgoing calls to the provider quota: wait for a token, or fail fast once the wait is too long"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    rate, burst = PROVIDER_RATE_LIMITS.get(provider, (0, 0))
+    allowed, wait = rate_limiter.check(provider, provider, rate, burst, max_wait=RATE_LIMIT_PROVIDER_MAX_WAIT)
+    if not allowed:
+        raise rate_limit_error(f"{provider} request quota exhausted, try again shortly", wait)
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+# Provider scheduling: each provider has a fixed number of concurrent call slots. Waiting
+# calls are served by priority class (bulk work is also capped to a share of the slots so
+# conversational turns always find one free), fairly across sessions within a class
+# (start-time fair queuing on estimated cost), and shortest job first within a session.
+request_priority: contextvars.ContextVar = contextvars.ContextVar("request_priority", default=("standard", "default"))
+
+class ProviderScheduler:
+    """Concurrency slots for one provider, handed out by class, then fairly across flows"""
+    
+    def __init__(self, provider: str, limit: int):
+        self.provider = provider
+        self.limit = limit
+        self.bulk_limit = max(1, int(limit * SCHEDULER_BULK_SHARE))
+        self.active = {name: 0 for name in SCHEDULER_CLASSES}
+        self.depth = {name: 0 for name in SCHEDULER_CLASSES}
+        # class -> flow -> heap of (cost, seq, waiter)
+        self.waiting: Dict[str, Dict[str, list]] = {name: {} for name in SCHEDULER_CLASSES}
+        self.virtual_time = {name: 0.0 for name in SCHEDULER_CLASSES}
+        self.flow_finish: Dict[tuple, float] = {}
+        self.sequence = itertools.count()
+        self.metrics = {
+            name: {"calls": 0, "queued": 0, "aged": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+            for name in SCHEDULER_CLASSES
+        }
+    
+    def admits(self, priority: str) -> bool:
+        if sum(self.active.values()) >= self.limit:
+            return False
+        return priority != "bulk" or self.active["bulk"] < self.bulk_limit
+    
+    def grant(self, priority: str, flow: str, cost: float) -> None:
+        start = max(self.virtual_time[priority], self.flow_finish.get((priority, flow), 0.0))
+        self.virtual_time[priority] = start
+        self.flow_finish[(priority, flow)] = start + cost
+        self.active[priority] += 1
+        if len(self.flow_finish) > 1000:
+            # Flows that are behind the virtual clock would restart from it anyway
+            self.flow_finish = {key: finish for key, finish in self.flow_finish.items() if finish > self.virtual_time[key[0]]}
+    
+    async def acquire(self, priority: str, flow: str, cost: float) -> None:
+        stats = self.metrics[priority]
+        stats["calls"] += 1
+        if not any(self.depth.values()) and self.admits(priority):
+            self.grant(priority, flow, cost)
+            return
+        waiter = {"flow": flow, "cost": cost, "enqueued_at": time.time(), "cancelled": False,
+                  "future": asyncio.get_running_loop().create_future()}
+        heapq.heappush(self.waiting[priority].setdefault(flow, []), (cost, next(self.sequence), waiter))
+        self.depth[priority] += 1
+        stats["queued"] += 1
+        self.dispatch()
+        try:
+            await waiter["future"]
+        except asyncio.CancelledError:
+            if waiter["future"].done() and not waiter["future"].cancelled():
+                self.release(priority)  # granted just as the caller went away
+            else:
+                waiter["cancelled"] = True
+                self.depth[priority] -= 1
+            raise
+        wait_ms = (time.time() - waiter["enqueued_at"]) * 1000
+        stats["total_wait_ms"] += wait_ms
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+    
+    def release(self, priority: str) -> None:
+        self.active[priority] -= 1
+        self.dispatch()
+    
+    def head(self, priority: str, flow: str) -> Optional[tuple]:
+        queue = self.waiting[priority][flow]
+        while queue and queue[0][2]["cancelled"]:
+            heapq.heappop(queue)
+        if not queue:
+            del self.waiting[priority][flow]
+            return None
+        return queue[0]
+    
+    def dispatch(self) -> None:
+        now = time.time()
+        while True:
+            # Strict priority, except that a class whose oldest call has waited too long moves up one
+            order = []
+            for rank, priority in enumerate(SCHEDULER_CLASSES):
+                heads = [(flow, entry) for flow in list(self.waiting[priority]) if (entry := self.head(priority, flow))]
+                if heads:
+                    aged = any(now - entry[2]["enqueued_at"] >= SCHEDULER_AGING_SECONDS for _, entry in heads)
+                    order.append((rank - 1 if aged else rank, rank, priority, heads, aged))
+            for _, _, priority, heads, aged in sorted(order, key=lambda item: item[:2]):
+                if self.admits(priority):
+                    break
+            else:
+                return
+            # Across flows: the smallest virtual finish time; each flow offers its shortest job
+            flow, (cost, _, waiter) = min(heads, key=lambda item: (
+                max(self.virtual_time[priority], self.flow_finish.get((priority, item[0]), 0.0)) + item[1][0], item[1][1]
+            ))
+            heapq.heappop(self.waiting[priority][flow])
+            self.depth[priority] -= 1
+            if aged:
+                self.metrics[priority]["aged"] += 1
+            self.grant(priority, flow, cost)
+            waiter["future"].set_result(None)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "slots": self.limit,
+            "bulk_slots": self.bulk_limit,
+            "classes": {
+                name: {
+                    "active": self.active[name],
+                    "queue_depth": self.depth[name],
+                    **{key: value for key, value in stats.items() if key != "total_wait_ms"},
+                    "max_wait_ms": round(stats["max_wait_ms"], 1),
+                    "avg_wait_ms": round(stats["total_wait_ms"] / stats["queued"], 1) if stats["queued"] else 0.0
+                }
+                for name, stats in self.metrics.items()
+            }
+        }
+
+provider_schedulers = {provider: ProviderScheduler(provider, limit) for provider, limit in PROVIDER_CONCURRENCY.items()}
+
+def scheduling_class(endpoint: str) -> str:
+    return SCHEDULER_ENDPOINT_CLASSES.get(endpoint, "standard")
+
+@contextlib.asynccontextmanager
+async def provider_slot(provider: str, cost: float):
+    """Hold one of the provider's call slots (then its rate-limit token) for the duration of a call"""
+    scheduler = provider_schedulers.get(provider) if SCHEDULER_ENABLED else None
+    if scheduler is None:
+        await acquire_provider_capacity(provider)
+        yield
+        return
+    priority, flow = request_priority.get()
+    await scheduler.acquire(priority, flow, cost)
+    try:
+        await acquire_provider_capacity(provider)
+        yield
+    finally:
+        scheduler.release(priority)
+
+# Gemini context caching: the stable front of a session's prompt is registered once as a
+# cachedContent and each turn sends only what was appended since. The session the current
+# LLM call belongs to is carried in a context variable so backend signatures stay unchanged.
+context_cache_scope: contextvars.ContextVar = contextvars.ContextVar("context_cache_scope", default=None)
+
+def stable_prompt_prefix(prompt: str) -> str:
+    """Everything before the newest user line; later prompts of the session extend it"""
+    cut = prompt.rfind("\nUser: ")
+    return prompt[:cut] if cut > 0 else ""
+
+class ContextCacheManager:
+    """Per-session cachedContent for the prompt prefix, refreshed on use and left to expire when idle"""
+
+    def __init__(self, gemini: AsyncGeminiClient):
+        self.gemini = gemini
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.registering: Dict[str, asyncio.Task] = {}
+        self.metrics = {
+            "created": 0, "create_failures": 0, "rebuilt": 0, "refreshed": 0,
+            "expired": 0, "invalidated": 0, "cleared": 0, "evicted": 0,
+            "cached_calls": 0, "uncached_calls": 0, "cached_ms": 0.0, "uncached_ms": 0.0,
+            "input_tokens_sent": 0, "input_tokens_from_cache": 0
+        }
+
+    def lookup(self, scope: str, prompt: str, model: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(scope)
+        if entry is None or entry["model"] != model:
+            return None
+        # Leave a margin so the cache cannot expire between this check and the provider reading it
+        if entry["expires_at"] - 5 <= time.time():
+            self.drop(scope, "expired")
+            return None
+        prefix = prompt[:entry["length"]]
+        if len(prompt) <= entry["length"] or hashlib.sha256(prefix.encode("utf-8")).hexdigest() != entry["digest"]:
+            # History was rewritten (cleared or trimmed); the cached prefix no longer applies
+            self.drop(scope, "invalidated")
+            return None
+        self.entries.move_to_end(scope)
+        return entry
+
+    async def generate(self, scope: str, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
+        entry = self.lookup(scope, prompt, model)
+        start_time = time.perf_counter()
+        if entry is None:
+            result = await self.gemini.generate(prompt, model=model, max_tokens=max_tokens, temperature=temperature)
+        else:
+            result = await self.gemini.generate(prompt[entry["length"]:].lstrip("\n"), model=model, max_tokens=max_tokens,
+                                                temperature=temperature, cached_content=entry["name"])
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+        usage = result.get("usage", {})
+        from_cache = usage.get("cachedContentTokenCount", 0)
+        kind = "uncached" if entry is None else "cached"
+        self.metrics[f"{kind}_calls"] += 1
+        self.metrics[f"{kind}_ms"] += elapsed_ms
+        self.metrics["input_tokens_sent"] += usage.get("promptTokenCount", estimate_tokens(prompt)) - from_cache
+        self.metrics["input_tokens_from_cache"] += from_cache
+
+        self.maintain(scope, prompt, model, entry)
+        return result["text"]
+
+    def maintain(self, scope: str, prompt: str, model: str, entry: Optional[Dict[str, Any]]) -> None:
+        """After a call: register, grow or refresh the session's cache in the background"""
+        if model != GEMINI_MODEL or scope in self.registering:
+            return
+        prefix = stable_prompt_prefix(prompt)
+        prefix_tokens = estimate_tokens(prefix)
+        if entry is None:
+            if prefix_tokens >= CONTEXT_CACHE_MIN_TOKENS:
+                self.registering[scope] = asyncio.create_task(self.register(scope, prefix, model))
+        elif prefix_tokens - entry["tokens"] >= entry["tokens"] * CONTEXT_CACHE_REBUILD_RATIO:
+            # The uncached suffix has grown enough that a bigger prefix pays for itself
+            self.registering[scope] = asyncio.create_task(self.register(scope, prefix, model))
+        elif entry["expires_at"] - time.time() < CONTEXT_CACHE_REFRESH_SECONDS:
+            entry["expires_at"] = time.time() + CONTEXT_CACHE_TTL_SECONDS
+            asyncio.create_task(self.refresh(entry))
+
+    async def register(self, scope: str, prefix: str, model: str) -> None:
+        try:
+            await acquire_provider_capacity("gemini")
+            data = await self.gemini.create_cache(prefix, model, CONTEXT_CACHE_TTL_SECONDS)
+            entry = {
+                "name": data["name"],
+                "model": model,
+                "length": len(prefix),
+                "digest": hashlib.sha256(prefix.encode("utf-8")).hexdigest(),
+                "tokens": estimate_tokens(prefix),
+                "created_at": time.time(),
+                "expires_at": time.time() + CONTEXT_CACHE_TTL_SECONDS
+            }
+            if scope not in chat_sessions:
+                # The session was cleared while the cache was being created
+                await self.delete(entry)
+                return
+            previous = self.entries.pop(scope, None)
+            self.entries[scope] = entry
+            self.metrics["rebuilt" if previous else "created"] += 1
+            provider_logger.info("Registered context cache for %s (%d tokens)", scope, entry["tokens"])
+            if previous is not None and previous["expires_at"] > time.time():
+                await self.delete(previous)
+            while len(self.entries) > CONTEXT_CACHE_MAX_ENTRIES:
+                _, evicted = self.entries.popitem(last=False)
+                self.metrics["evicted"] += 1
+                await self.delete(evicted)
+        except Exception as e:
+            self.metrics["create_failures"] += 1
+            provider_logger.warning("Context cache registration failed for %s: %s", scope, e)
+        finally:
+            self.registering.pop(scope, None)
+
+    async def refresh(self, entry: Dict[str, Any]) -> None:
+        try:
+            await self.gemini.update_cache_ttl(entry["name"], CONTEXT_CACHE_TTL_SECONDS)
+            self.metrics["refreshed"] += 1
+        except Exception as e:
+            # Most likely already expired on the provider side; the next lookup will stop using it
+            entry["expires_at"] = 0
+            provider_logger.warning("Context cache refresh failed for %s: %s", entry["name"], e)
+
+    async def delete(self, entry: Dict[str, Any]) -> None:
+        try:
+            await self.gemini.delete_cache(entry["name"])
+        except Exception as e:
+            provider_logger.debug("Context cache delete failed for %s: %s", entry["name"], e)
+
+    def drop(self, scope: str, reason: str) -> None:
+        entry = self.entries.pop(scope, None)
+        if entry is None:
+            return
+        self.metrics[reason] += 1
+        # Expired caches are already gone on the provider; the others would bill storage until their TTL
+        if reason != "expired":
+            asyncio.create_task(self.delete(entry))
+
+    def sweep(self) -> None:
+        """Forget caches of sessions that stayed idle past the TTL"""
+        now = time.time()
+        for scope in [scope for scope, entry in self.entries.items() if entry["expires_at"] <= now]:
+            self.drop(scope, "expired")
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats = self.metrics
+        cached_avg = stats["cached_ms"] / stats["cached_calls"] if stats["cached_calls"] else None
+        uncached_avg = stats["uncached_ms"] / stats["uncached_calls"] if stats["uncached_calls"] else None
+        total_tokens = stats["input_tokens_sent"] + stats["input_tokens_from_cache"]
+        return {
+            "enabled": CONTEXT_CACHE_ENABLED,
+            "active": len(self.entries),
+            "registering": len(self.registering),
+            **{name: value for name, value in stats.items() if not name.endswith("_ms")},
+            "input_tokens_saved_ratio": round(stats["input_tokens_from_cache"] / total_tokens, 3) if total_tokens else 0.0,
+            "avg_cached_ms": round(cached_avg, 1) if cached_avg is not None else None,
+            "avg_uncached_ms": round(uncached_avg, 1) if uncached_avg is not None else None,
+            "latency_saved_ms_per_call": round(uncached_avg - cached_avg, 1) if cached_avg is not None and uncached_avg is not None else None
+        }
+
+context_cache = ContextCacheManager(gemini_client)
+context_cache_sweep_task: Optional[asyncio.Task] = None
+
+async def context_cache_sweep_loop() -> None:
+    while True:
+        await asyncio.sleep(60)
+        context_cache.sweep()
+
+# Provider call adapters: one normalised shape for both the async clients and the SDKs
+async def run_transcription(audio_data: bytes) -> Dict[str, Any]:
+    """Transcribe audio; returns {"status", "text", "confidence", "error"}"""
+    if ASYNC_PROVIDER_CLIENTS:
+        # The engine takes the provider slot for the upload and submit only
+        job = await assemblyai_client.transcribe(audio_data)
+        return {"status": job["status"], "text": job.get("text"), "confidence": job.get("confidence"), "error": job.get("error")}
+    
+    async with provider_slot("assemblyai", len(audio_data)):
+        # Run the blocking SDK call in a worker thread so the event loop stays free
+        transcript = await asyncio.to_thread(transcriber.transcribe, audio_data)
+        return {
+            "status": "error" if transcript.status == aai.TranscriptStatus.error else "completed",
+            "text": transcript.text,
+            "confidence": transcript.confidence,
+            "error": transcript.error
+        }
+
+# SDK model handles by name (the primary is created in initialize_clients)
+gemini_models: Dict[str, Any] = {}
+
+def get_gemini_model(model: str):
+    """Return a cached SDK model handle for the given Gemini model name"""
+    if model == GEMINI_MODEL:
+        return gemini_model
+    if model not in gemini_models:
+        gemini_models[model] = genai.GenerativeModel(model)
+    return gemini_models[model]
+
+async def run_llm_generation(prompt: str, max_tokens: int, temperature: float, model: str = GEMINI_MODEL) -> str:
+    """Generate text from Gemini"""
+    async with provider_slot("gemini", estimate_tokens(prompt) + max_tokens):
+        scope = context_cache_scope.get()
+        if CONTEXT_CACHE_ENABLED and scope:
+            return await context_cache.generate(scope, prompt, model, max_tokens, temperature)
+        if ASYNC_PROVIDER_CLIENTS:
+            result = await gemini_client.generate(prompt, model=model, max_tokens=max_tokens, temperature=temperature)
+            return result["text"]
+        
+        generation_config = genai.types.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=temperature,
+        )
+        response = await asyncio.to_thread(
+            get_gemini_model(model).generate_content,
+            prompt,
+            generation_config=generation_config
+        )
+        return response.text
+
+async def run_tts_generation(text: str, voice_id: str) -> str:
+    """Synthesise speech with Murf; returns the provider audio URL"""
+    async with provider_slot("murf", len(text)):
+        if ASYNC_PROVIDER_CLIENTS:
+            result = await murf_client.generate(text, voice_id)
+            return result["audioFile"]
+        
+        response = await asyncio.to_thread(
+            client.text_to_speech.generate,
+            text=text,
+            voice_id=voice_id
+        )
+        return response.audio_file
+
+@coalesce_inflight("assemblyai")
+async def safe_transcribe_audio(audio_data: bytes, max_retries: int = 2, endpoint: str = "default") -> Dict[str, Any]:
     """Safely transcribe audio with retries and fallback"""
-    if not transcriber:
+    if not transcriber and not ASYNC_PROVIDER_CLIENTS:
         raise HTTPException(status_code=503, detail="Transcription service unavailable")
     
+    audio_data, preprocessing_stats = await preprocess_audio_for_stt(audio_data, endpoint)
+    
     for attempt in range(max_retries + 1):
         try:
-            logger.info(f"Transcription attempt {attempt + 1}/{max_retries + 1}")
+            provider_logger.info("Transcription attempt %d/%d", attempt + 1, max_retries + 1)
             start_time = time.time()
             
-            # Set timeout for transcription
-            transcript = transcriber.transcribe(audio_data)
+            transcript = await run_transcription(audio_data)
             
             processing_time = (time.time() - start_time) * 1000
             
-            if transcript.status == aai.TranscriptStatus.error:
-                error_msg = f"AssemblyAI transcription failed: {transcript.error}"
+            if transcript["status"] == "error":
+                error_msg = f"AssemblyAI transcription failed: {transcript['error']}"
                 update_service_health("assemblyai", False, error_msg)
                 if attempt == max_retries:
                     raise HTTPException(status_code=503, detail=error_msg)
                 continue
             
-            if not transcript.text or transcript.text.strip() == "":
+            if not transcript["text"] or transcript["text"].strip() == "":
                 if attempt == max_retries:
                     raise HTTPException(status_code=400, detail="No speech detected in the audio")
                 continue
             
             update_service_health("assemblyai", True)
             return {
-                "text": transcript.text.strip(),
-                "confidence": transcript.confidence,
+                "text": transcript["text"].strip(),
+                "confidence": transcript["confidence"],
                 "processing_time": processing_time,
-                "attempt": attempt + 1
+                "attempt": attempt + 1,
+                "preprocessing": preprocessing_stats
             }
             
         except HTTPException:
@@ -230,36 +1683,30 @@ async def safe_transcribe_audio(audio_data: bytes, max_retries: int = 2) -> Dict
             # Wait before retry
             await asyncio.sleep(1 * (attempt + 1))
 
-async def safe_generate_llm_response(prompt: str, max_tokens: int = 800, temperature: float = 0.7, max_retries: int = 2) -> Dict[str, Any]:
+@coalesce_inflight("gemini")
+async def safe_generate_llm_response(prompt: str, max_tokens: int = 800, temperature: float = 0.7, max_retries: int = 2, model: str = GEMINI_MODEL) -> Dict[str, Any]:
     """Safely generate LLM response with retries and fallback"""
-    if not gemini_model:
+    if not gemini_model and not ASYNC_PROVIDER_CLIENTS:
         raise HTTPException(status_code=503, detail="LLM service unavailable")
     
     for attempt in range(max_retries + 1):
         try:
-            logger.info(f"LLM generation attempt {attempt + 1}/{max_retries + 1}")
+            provider_logger.info("LLM generation attempt %d/%d", attempt + 1, max_retries + 1)
             start_time = time.time()
             
-            generation_config = genai.types.GenerationConfig(
-                max_output_tokens=max_tokens,
-                temperature=temperature,
-            )
-            
-            response = gemini_model.generate_content(
-                prompt,
-                generation_config=generation_config
-            )
+            response_text = await run_llm_generation(prompt, max_tokens, temperature, model)
             
             processing_time = (time.time() - start_time) * 1000
             
-            if not response.text:
+            if not response_text:
                 if attempt == max_retries:
                     raise HTTPException(status_code=503, detail="No response generated from LLM")
                 continue
             
             update_service_health("gemini", True)
             return {
-                "text": response.text.strip(),
+                "text": response_text.strip(),
+                "model": model,
                 "processing_time": processing_time,
                 "attempt": attempt + 1
             }
@@ -281,36 +1728,154 @@ async def safe_generate_llm_response(prompt: str, max_tokens: int = 800, tempera
             # Wait before retry
             await asyncio.sleep(2 * (attempt + 1))
 
-async def safe_generate_audio(text: str, voice_id: str = "en-US-natalie", max_retries: int = 2) -> Dict[str, Any]:
-    """Safely generate audio with retries and fallback"""
-    if not client:
-        # Return text fallback if TTS is unavailable
-        return {
-            "audio_url": None,
-            "fallback_text": text,
-            "error": "TTS service unavailable"
-        }
-    
-    for attempt in range(max_retries + 1):
+# Local audio proxy and cache
+audio_cache_entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+audio_download_tasks = set()
+
+def audio_cache_id(text: str, voice_id: str) -> str:
+    """Content address for synthesised audio (same text and voice -> same id)"""
+    return make_request_key("murf", text, voice_id).split(":", 1)[1][:32]
+
+async def get_cached_audio(audio_id: str) -> Optional[Dict[str, Any]]:
+    """Return a usable cache entry (complete or still downloading), loading it from disk if needed"""
+    entry = audio_cache_entries.get(audio_id)
+    if entry is None:
         try:
-            logger.info(f"TTS generation attempt {attempt + 1}/{max_retries + 1}")
+            async with aiofiles.open(os.path.join(AUDIO_CACHE_DIR, f"{audio_id}.json")) as f:
+                metadata = json.loads(await f.read())
+        except (OSError, ValueError):
+            return None
+        # Another request may have loaded or started this entry while the file was read
+        entry = audio_cache_entries.setdefault(
+            audio_id, {**metadata, "complete": True, "error": None, "condition": asyncio.Condition()}
+        )
+    if entry.get("error"):
+        return None
+    audio_cache_entries.move_to_end(audio_id)
+    return entry
+
+def remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+async def evict_audio_cache() -> None:
+    """Drop the least recently used completed files beyond AUDIO_CACHE_MAX_FILES"""
+    paths = []
+    while len(audio_cache_entries) > AUDIO_CACHE_MAX_FILES:
+        evictable = next((audio_id for audio_id, entry in audio_cache_entries.items() if entry["complete"] or entry.get("error")), None)
+        if evictable is None:
+            break
+        entry = audio_cache_entries.pop(evictable)
+        paths += [entry["path"], os.path.join(AUDIO_CACHE_DIR, f"{evictable}.json")]
+        audio_proxy_metrics["evictions"] += 1
+    if paths:
+        # The entries are already gone from the index, so only the unlinking runs off the loop
+        await asyncio.to_thread(remove_files, paths)
+
+async def download_provider_audio(audio_id: str) -> None:
+    """Stream provider audio into the local store, waking readers as bytes arrive"""
+    entry = audio_cache_entries[audio_id]
+    condition = entry["condition"]
+    audio_proxy_metrics["downloads"] += 1
+    try:
+        async with get_http_client().stream("GET", entry["source_url"]) as response:
+            response.raise_for_status()
+            entry["content_type"] = response.headers.get("content-type", "audio/wav")
+            async with aiofiles.open(entry["path"], "wb") as f:
+                async for chunk in response.aiter_bytes(AUDIO_PROXY_CHUNK_SIZE):
+                    await f.write(chunk)
+                    await f.flush()
+                    entry["size"] += len(chunk)
+                    audio_proxy_metrics["bytes_downloaded"] += len(chunk)
+                    async with condition:
+                        condition.notify_all()
+        
+        entry["complete"] = True
+        metadata = {key: entry[key] for key in ("audio_id", "path", "source_url", "content_type", "size", "created_at")}
+        async with aiofiles.open(os.path.join(AUDIO_CACHE_DIR, f"{audio_id}.json"), "w") as f:
+            await f.write(json.dumps(metadata))
+    except Exception as e:
+        entry["error"] = str(e)
+        audio_proxy_metrics["download_failures"] += 1
+        log_error("audio_proxy_error", f"Failed to cache audio {audio_id}: {str(e)}")
+    finally:
+        async with condition:
+            condition.notify_all()
+
+async def proxy_provider_audio(audio_id: str, source_url: str) -> str:
+    """Start caching a provider audio URL locally and return the local URL to hand to the client"""
+    path = os.path.join(AUDIO_CACHE_DIR, f"{audio_id}.audio")
+    # Create the file up front so readers can open it before the first byte lands
+    async with aiofiles.open(path, "wb"):
+        pass
+    audio_cache_entries[audio_id] = {
+        "audio_id": audio_id,
+        "path": path,
+        "source_url": source_url,
+        "content_type": "audio/wav",
+        "size": 0,
+        "complete": False,
+        "error": None,
+        "created_at": datetime.now().isoformat(),
+        "condition": asyncio.Condition()
+    }
+    task = asyncio.create_task(download_provider_audio(audio_id))
+    audio_download_tasks.add(task)
+    task.add_done_callback(audio_download_tasks.discard)
+    await evict_audio_cache()
+    return f"/audio/{audio_id}"
+
+@coalesce_inflight("murf")
+async def safe_generate_audio(text: str, voice_id: str = "en-US-natalie", max_retries: int = 2) -> Dict[str, Any]:
+    """Safely generate audio with retries and fallback"""
+    if not client and not ASYNC_PROVIDER_CLIENTS:
+        # Return text fallback if TTS is unavailable
+        return {
+            "audio_url": None,
+            "fallback_text": text,
+            "error": "TTS service unavailable"
+        }
+    
+    if AUDIO_PROXY_ENABLED:
+        audio_id = audio_cache_id(text, voice_id)
+        if await get_cached_audio(audio_id):
+            audio_proxy_metrics["cache_hits"] += 1
+            return {
+                "audio_url": f"/audio/{audio_id}",
+                "processing_time": 0.0,
+                "attempt": 0,
+                "cached": True
+            }
+    
+    for attempt in range(max_retries + 1):
+        try:
+            provider_logger.info("TTS generation attempt %d/%d", attempt + 1, max_retries + 1)
             start_time = time.time()
             
-            response = client.text_to_speech.generate(
-                text=text,
-                voice_id=voice_id
-            )
+            provider_audio_url = await run_tts_generation(text, voice_id)
             
             processing_time = (time.time() - start_time) * 1000
             
             update_service_health("murf", True)
+            if AUDIO_PROXY_ENABLED:
+                return {
+                    "audio_url": await proxy_provider_audio(audio_id, provider_audio_url),
+                    "source_audio_url": provider_audio_url,
+                    "processing_time": processing_time,
+                    "attempt": attempt + 1
+                }
             return {
-                "audio_url": response.audio_file,
+                "audio_url": provider_audio_url,
                 "processing_time": processing_time,
                 "attempt": attempt + 1
             }
             
         except Exception as e:
+            if isinstance(e, HTTPException) and e.status_code == 429:
+                raise  # our own provider quota, not a Murf failure: no retry, no health change
             error_msg = f"TTS generation error (attempt {attempt + 1}): {str(e)}"
             logger.error(error_msg)
             update_service_health("murf", False, error_msg)
@@ -340,14 +1905,14 @@ def get_or_create_session(session_id: str) -> Dict[str, Any]:
                 "error_count": 0,
                 "last_error": None
             }
-            logger.info(f"Created new chat session: {session_id}")
+            session_logger.info("Created new chat session: %s", session_id)
         else:
             chat_sessions[session_id]["last_activity"] = datetime.now().isoformat()
-            logger.info(f"Retrieved existing chat session: {session_id} with {len(chat_sessions[session_id]['messages'])} messages")
+            session_logger.debug("Retrieved existing chat session: %s with %d messages", session_id, len(chat_sessions[session_id]["messages"]))
         
         return chat_sessions[session_id]
     except Exception as e:
-        logger.error(f"Error managing session {session_id}: {str(e)}")
+        logger.error("Error managing session %s: %s", session_id, e)
         # Create minimal session even if there's an error
         return {
             "messages": [],
@@ -368,9 +1933,9 @@ def add_message_to_session(session_id: str, role: str, content: str) -> None:
         }
         session["messages"].append(message)
         session["last_activity"] = datetime.now().isoformat()
-        logger.info(f"Added {role} message to session {session_id}: {content[:100]}{'...' if len(content) > 100 else ''}")
+        session_logger.info("Added %s message to session %s (%d chars)", role, session_id, len(content))
     except Exception as e:
-        logger.error(f"Error adding message to session {session_id}: {str(e)}")
+        logger.error("Error adding message to session %s: %s", session_id, e)
 
 def format_chat_history_for_llm(session_id: str, current_message: str) -> str:
     """Format conversation history for LLM with error handling"""
@@ -387,58 +1952,2349 @@ def format_chat_history_for_llm(session_id: str, current_message: str) -> str:
         # conversation_parts.append(f"User: {current_message}")
         
         formatted_history = "\n".join(conversation_parts)
-        logger.info(f"Formatted conversation context ({len(formatted_history)} chars)")
+        session_logger.info("Formatted conversation context (%d chars)", len(formatted_history))
         return formatted_history
         
     except Exception as e:
-        logger.error(f"Error formatting chat history for session {session_id}: {str(e)}")
+        logger.error("Error formatting chat history for session %s: %s", session_id, e)
         # Return just current message if history formatting fails
         return f"User: {current_message}"
 
+# Pipeline engine: every endpoint runs STT -> context -> LLM -> TTS stages through one engine,
+# so caching, streaming and instrumentation are added once and apply everywhere
+MURF_MAX_CHARS = 3000
+
+# Backend order per stage (first is primary, the rest are fallbacks), e.g. {"llm": ["gemini", "gemini-lite"]}.
+# The lite model is not in the default chain: routing and hedging would otherwise move replies
+# onto a weaker model on latency alone
+PIPELINE_BACKENDS = {"stt": ["assemblyai"], "llm": ["gemini"], "tts": ["murf"]}
+PIPELINE_BACKENDS.update(json.loads(os.getenv("PIPELINE_BACKENDS", "{}")))
+PIPELINE_MAX_RETRIES = {"stt": 2, "llm": 2, "tts": 2}
+PIPELINE_MAX_RETRIES.update(json.loads(os.getenv("PIPELINE_MAX_RETRIES", "{}")))
+
+# Latency-aware routing and hedged requests
+LATENCY_ROUTING_ENABLED = os.getenv("LATENCY_ROUTING_ENABLED", "true").lower() == "true"
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "200"))                  # samples kept per backend
+LATENCY_MIN_SAMPLES = int(os.getenv("LATENCY_MIN_SAMPLES", "20"))         # before p95/EWMA are trusted
+LATENCY_ROUTING_SWITCH_RATIO = float(os.getenv("LATENCY_ROUTING_SWITCH_RATIO", "1.5"))
+LATENCY_ROUTING_EXPLORE_EVERY = int(os.getenv("LATENCY_ROUTING_EXPLORE_EVERY", "20"))  # keep configured order 1 in N
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_STAGES = set(os.getenv("HEDGE_STAGES", "llm").split(","))
+HEDGE_MAX_RATE = float(os.getenv("HEDGE_MAX_RATE", "0.1"))                # max fraction of calls that hedge
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "4.0"))      # seconds, until p95 is known
+
+# Opt-in response cache for first-turn and context-free queries
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))  # cosine threshold, semantic tier
+RESPONSE_CACHE_DIMENSIONS = 2048
+
+# Registered backends per stage: name -> async callable
+stage_backends: Dict[str, Dict[str, Any]] = {"stt": {}, "llm": {}, "tts": {}}
+
+# Global timing hooks: async hook(event, stage_name, ctx); events are stage_start, stage_end,
+# stage_error and, from the tts stage, segment_ready (with ctx["segment"]) per audio segment
+pipeline_hooks: List[Any] = []
+
+pipeline_metrics: Dict[str, Dict[str, Any]] = {}
+
+def register_stage_backend(stage: str, name: str, backend) -> None:
+    """Plug a backend into a pipeline stage"""
+    stage_backends[stage][name] = backend
+
+register_stage_backend(
+    "stt", "assemblyai",
+    lambda audio_data, endpoint, max_retries: safe_transcribe_audio(audio_data, max_retries, endpoint)
+)
+register_stage_backend(
+    "llm", "gemini",
+    lambda prompt, max_tokens, temperature, max_retries: safe_generate_llm_response(prompt, max_tokens, temperature, max_retries, GEMINI_MODEL)
+)
+register_stage_backend(
+    "llm", "gemini-lite",
+    lambda prompt, max_tokens, temperature, max_retries: safe_generate_llm_response(prompt, max_tokens, temperature, max_retries, GEMINI_FALLBACK_MODEL)
+)
+register_stage_backend(
+    "tts", "murf",
+    lambda text, voice_id, max_retries: safe_generate_audio(text, voice_id, max_retries)
+)
+
+class LatencyRouter:
+    """Moving latency estimates per stage backend, used to order backends and time hedges"""
+    
+    def __init__(self):
+        self.samples: Dict[str, deque] = {}
+        self.ewma: Dict[str, float] = {}
+        self.metrics: Dict[str, Dict[str, int]] = {}
+    
+    def stage_metrics(self, stage: str) -> Dict[str, int]:
+        return self.metrics.setdefault(stage, {"calls": 0, "hedges": 0, "hedge_wins": 0, "hedges_capped": 0, "reroutes": 0})
+    
+    def record(self, stage: str, backend: str, elapsed_ms: float) -> None:
+        key = f"{stage}:{backend}"
+        self.samples.setdefault(key, deque(maxlen=LATENCY_WINDOW)).append(elapsed_ms)
+        previous = self.ewma.get(key)
+        self.ewma[key] = elapsed_ms if previous is None else 0.8 * previous + 0.2 * elapsed_ms
+    
+    def estimate(self, stage: str, backend: str) -> Optional[float]:
+        """EWMA latency in ms, or None until enough samples exist"""
+        key = f"{stage}:{backend}"
+        if len(self.samples.get(key, ())) < LATENCY_MIN_SAMPLES:
+            return None
+        return self.ewma[key]
+    
+    def percentile(self, stage: str, backend: str, fraction: float = 0.95) -> Optional[float]:
+        samples = self.samples.get(f"{stage}:{backend}")
+        if not samples or len(samples) < LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+    
+    def order(self, stage: str, backends: List[str]) -> List[str]:
+        """Configured order, unless an alternate is consistently faster than the primary"""
+        stats = self.stage_metrics(stage)
+        stats["calls"] += 1
+        if not LATENCY_ROUTING_ENABLED or len(backends) < 2 or stats["calls"] % LATENCY_ROUTING_EXPLORE_EVERY == 0:
+            return list(backends)
+        primary_estimate = self.estimate(stage, backends[0])
+        estimates = [(self.estimate(stage, name), name) for name in backends[1:]]
+        estimates = [(estimate, name) for estimate, name in estimates if estimate is not None]
+        if primary_estimate is None or not estimates:
+            return list(backends)
+        best_estimate, best = min(estimates)
+        if primary_estimate > best_estimate * LATENCY_ROUTING_SWITCH_RATIO:
+            stats["reroutes"] += 1
+            return [best] + [name for name in backends if name != best]
+        return list(backends)
+    
+    def hedge_delay(self, stage: str, backend: str) -> float:
+        """Seconds to wait on a backend before hedging: its p95, or a default until known"""
+        p95 = self.percentile(stage, backend)
+        return p95 / 1000 if p95 is not None else HEDGE_DEFAULT_DELAY
+    
+    def allow_hedge(self, stage: str) -> bool:
+        stats = self.stage_metrics(stage)
+        if (stats["hedges"] + 1) / max(stats["calls"], 1) > HEDGE_MAX_RATE:
+            stats["hedges_capped"] += 1
+            return False
+        return True
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": LATENCY_ROUTING_ENABLED,
+            "hedging": HEDGE_ENABLED,
+            "hedge_max_rate": HEDGE_MAX_RATE,
+            "stages": {
+                stage: {**stats, "hedge_rate": round(stats["hedges"] / stats["calls"], 4) if stats["calls"] else 0.0}
+                for stage, stats in self.metrics.items()
+            },
+            "backends": {
+                key: {
+                    "samples": len(samples),
+                    "ewma_ms": round(self.ewma[key], 1),
+                    "p95_ms": self.percentile(*key.split(":", 1))
+                }
+                for key, samples in self.samples.items()
+            }
+        }
+
+latency_router = LatencyRouter()
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace for cache matching"""
+    cleaned = "".join(char if char.isalnum() or char.isspace() else " " for char in text.lower())
+    return " ".join(cleaned.split())
+
+def query_vector(normalized: str):
+    """L2-normalised hashed character trigram vector (CPU-only stand-in for an embedding)"""
+    vector = np.zeros(RESPONSE_CACHE_DIMENSIONS, dtype=np.float32)
+    padded = f" {normalized} "
+    for i in range(len(padded) - 2):
+        digest = hashlib.md5(padded[i:i + 3].encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % RESPONSE_CACHE_DIMENSIONS] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+NUMBER_WORDS = frozenset(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen sixteen "
+    "seventeen eighteen nineteen twenty thirty forty fifty sixty seventy eighty ninety hundred thousand "
+    "million billion half quarter first second third".split()
+)
+
+def query_numbers(normalized: str) -> tuple:
+    """The digit and number-word tokens of a query, in order; semantic hits must match them exactly"""
+    return tuple(token for token in normalized.split()
+                 if token in NUMBER_WORDS or any(char.isdigit() for char in token))
+
+class ResponseCache:
+    """Exact-match tier plus a vectorised cosine-similarity tier over normalised queries"""
+    
+    def __init__(self):
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.matrix = None
+        self.matrix_keys: List[str] = []
+        self.metrics = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "audio_reuses": 0}
+    
+    def expire(self) -> None:
+        now = time.time()
+        expired = [key for key, entry in self.entries.items() if now - entry["created_at"] > RESPONSE_CACHE_TTL]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self.matrix = None
+    
+    def lookup(self, query: str) -> Optional[tuple]:
+        """Return (entry, tier) for a cached answer to this query, or None"""
+        self.metrics["lookups"] += 1
+        self.expire()
+        normalized = normalize_query(query)
+        entry = self.entries.get(normalized)
+        if entry is not None:
+            self.entries.move_to_end(normalized)
+            self.metrics["exact_hits"] += 1
+            return entry, "exact"
+        
+        if NUMPY_AVAILABLE and self.entries:
+            if self.matrix is None:
+                self.matrix_keys = list(self.entries)
+                self.matrix = np.stack([self.entries[key]["vector"] for key in self.matrix_keys])
+            scores = self.matrix @ query_vector(normalized)
+            numbers = query_numbers(normalized)
+            # "convert 5 km" and "convert 50 km" are near neighbours; only the best match with
+            # the same numbers counts
+            for index in np.argsort(-scores):
+                if scores[index] < RESPONSE_CACHE_SIMILARITY:
+                    break
+                key = self.matrix_keys[int(index)]
+                if query_numbers(key) == numbers:
+                    self.entries.move_to_end(key)
+                    self.metrics["semantic_hits"] += 1
+                    return self.entries[key], "semantic"
+        
+        self.metrics["misses"] += 1
+        return None
+    
+    def store(self, query: str, response: str) -> Dict[str, Any]:
+        normalized = normalize_query(query)
+        entry = {
+            "query": query,
+            "response": response,
+            "created_at": time.time(),
+            "audio": {},
+            "vector": query_vector(normalized) if NUMPY_AVAILABLE else None
+        }
+        self.entries[normalized] = entry
+        self.entries.move_to_end(normalized)
+        while len(self.entries) > RESPONSE_CACHE_MAX_ENTRIES:
+            self.entries.popitem(last=False)
+        self.matrix = None
+        self.metrics["stores"] += 1
+        return entry
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": RESPONSE_CACHE_ENABLED,
+            "entries": len(self.entries),
+            "similarity_threshold": RESPONSE_CACHE_SIMILARITY,
+            "ttl": RESPONSE_CACHE_TTL,
+            **self.metrics
+        }
+
+response_cache = ResponseCache()
+
+def response_cache_eligible(ctx: Dict[str, Any]) -> bool:
+    """Only first-turn and context-free queries are cacheable, and sessions can opt out"""
+    if not RESPONSE_CACHE_ENABLED or not ctx.get("use_cache", True):
+        return False
+    if not ctx["session_id"]:
+        return True
+    session = get_or_create_session(ctx["session_id"])
+    if session.get("response_cache_opt_out"):
+        return False
+    # The current user message has already been recorded by the context stage
+    return sum(1 for message in session["messages"] if message["role"] != "system") <= 1
+
+def split_text_for_murf(text: str, max_length: int = MURF_MAX_CHARS) -> list:
+    """
+    Split text into chunks that fit within Murf's 3000 character limit.
+    Tries to split at sentence boundaries for better audio flow.
+    """
+    if len(text) <= max_length:
+        return [text]
+    
+    # Try to split at sentence boundaries first
+    sentences = text.replace('!', '.').replace('?', '.').split('.')
+    chunks = []
+    current_chunk = ""
+    
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        
+        sentence_with_period = sentence + "."
+        
+        if len(current_chunk) + len(sentence_with_period) + 1 <= max_length:
+            if current_chunk:
+                current_chunk += " " + sentence_with_period
+            else:
+                current_chunk = sentence_with_period
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = sentence_with_period
+    
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    
+    # If we still have chunks that are too long, split them by words
+    final_chunks = []
+    for chunk in chunks:
+        if len(chunk) <= max_length:
+            final_chunks.append(chunk)
+        else:
+            words = chunk.split()
+            word_chunk = ""
+            for word in words:
+                if len(word_chunk) + len(word) + 1 <= max_length:
+                    if word_chunk:
+                        word_chunk += " " + word
+                    else:
+                        word_chunk = word
+                else:
+                    if word_chunk:
+                        final_chunks.append(word_chunk)
+                    word_chunk = word
+            if word_chunk:
+                final_chunks.append(word_chunk)
+    
+    return final_chunks
+
+# Streamed replies are synthesised in segments that start small and grow: the first is about a
+# clause so its audio is ready quickly, and each later one is as long as can be synthesised
+# before the audio ahead of it finishes playing. Sizes follow Murf latency measured per voice.
+class LinearLatencyModel:
+    """latency_ms = base + per_unit * size, fitted by least squares over recent samples (a prior until then)"""
+    
+    def __init__(self, base_ms: float, per_unit_ms: float):
+        self.prior = (float(base_ms), float(per_unit_ms))
+        self.samples: deque = deque(maxlen=BUDGET_SAMPLE_WINDOW)
+    
+    def observe(self, size: float, elapsed_ms: float) -> None:
+        self.samples.append((size, elapsed_ms))
+    
+    def coefficients(self) -> tuple:
+        if len(self.samples) < 5:
+            return self.prior
+        mean_x = sum(x for x, _ in self.samples) / len(self.samples)
+        mean_y = sum(y for _, y in self.samples) / len(self.samples)
+        variance = sum((x - mean_x) ** 2 for x, _ in self.samples)
+        # Same-sized samples can't separate base from slope; keep the prior slope
+        slope = self.prior[1] if variance == 0 else max(sum((x - mean_x) * (y - mean_y) for x, y in self.samples) / variance, 0.0)
+        return max(mean_y - slope * mean_x, 0.0), slope
+    
+    def predict(self, size: float) -> float:
+        base, slope = self.coefficients()
+        return base + slope * size
+
+tts_latency_models: Dict[str, LinearLatencyModel] = {}
+tts_segmentation_metrics = {"segmented_replies": 0, "segments": 0, "first_segment_chars": 0}
+# Sentence ends, then clause breaks, then any space: the preferred places to end a segment
+TTS_SEGMENT_BREAKS = [re.compile(r"[.!?]['\")\]]*\s"), re.compile(r"[,;:\u2014]\s|\s-\s"), re.compile(r"\s")]
+
+def tts_latency_model(voice_id: str) -> LinearLatencyModel:
+    if voice_id not in tts_latency_models:
+        tts_latency_models[voice_id] = LinearLatencyModel(*TTS_LATENCY_PRIOR)
+    return tts_latency_models[voice_id]
+
+async def record_tts_latency(event: str, stage_name: str, ctx: Dict[str, Any]) -> None:
+    """Pipeline hook: feed each synthesised segment's time into its voice's latency model"""
+    if event == "segment_ready" and ctx["segment"].get("processing_time"):
+        tts_latency_model(ctx["voice_id"]).observe(len(ctx["segment"]["text"]), ctx["segment"]["processing_time"])
+
+pipeline_hooks.append(record_tts_latency)
+
+def first_tts_segment_chars(voice_id: str) -> int:
+    base, per_char = tts_latency_model(voice_id).coefficients()
+    chars = (TTS_FIRST_SEGMENT_TARGET_MS - base) / per_char if per_char > 0 else TTS_FIRST_SEGMENT_MAX_CHARS
+    return int(min(max(chars, TTS_FIRST_SEGMENT_MIN_CHARS), TTS_FIRST_SEGMENT_MAX_CHARS))
+
+def next_tts_segment_chars(voice_id: str, lengths: List[int]) -> int:
+    """Grow geometrically, but only as far as the segment is ready before the audio ahead of it runs out"""
+    model = tts_latency_model(voice_id)
+    base, per_char = model.coefficients()
+    # Segments are synthesised concurrently, so segment k plays once segment 0 is ready and 0..k-1 have played
+    ready_by_ms = model.predict(lengths[0]) + sum(lengths) / TTS_SPEECH_CHARS_PER_SECOND * 1000
+    gap_free = (ready_by_ms - base) / per_char if per_char > 0 else MURF_MAX_CHARS
+    return int(min(MURF_MAX_CHARS, max(lengths[0], min(lengths[-1] * TTS_SEGMENT_GROWTH, gap_free))))
+
+def tts_segment_lengths(total_chars: int, voice_id: str) -> List[int]:
+    """Planned segment lengths for a reply of total_chars (ignoring where the text can break)"""
+    lengths = []
+    size = first_tts_segment_chars(voice_id)
+    remaining = total_chars
+    while remaining > 0:
+        # A short tail is folded into the segment before it
+        if remaining <= size * 1.5 and remaining <= MURF_MAX_CHARS:
+            lengths.append(remaining)
+            break
+        lengths.append(size)
+        remaining -= size
+        size = next_tts_segment_chars(voice_id, lengths)
+    return lengths
+
+def find_segment_break(text: str, start: int, size: int) -> int:
+    """End of a segment of about `size` characters from start, at the strongest break in its second half"""
+    end = min(start + size, len(text))
+    lower = start + size // 2
+    for pattern in TTS_SEGMENT_BREAKS:
+        last = None
+        for last in pattern.finditer(text, lower, end):
+            pass
+        if last is not None:
+            return last.end()
+    return end
+
+def streams_segments(ctx: Dict[str, Any]) -> bool:
+    """Whether the reply is played segment by segment as each is ready (SSE and the stream socket)"""
+    return bool(ctx.get("stream_segments")) and TTS_SEGMENTATION == "adaptive"
+
+def plan_tts_segments(text: str, voice_id: str) -> List[str]:
+    """Split a streamed reply into growing segments ending at sentence or clause breaks"""
+    segments = []
+    lengths: List[int] = []
+    position = 0
+    size = first_tts_segment_chars(voice_id)
+    while position < len(text):
+        remaining = len(text) - position
+        if remaining <= size * 1.5 and remaining <= MURF_MAX_CHARS:
+            segments.append(text[position:])
+            break
+        cut = find_segment_break(text, position, size)
+        segments.append(text[position:cut])
+        lengths.append(cut - position)
+        position = cut
+        size = next_tts_segment_chars(voice_id, lengths)
+    segments = [segment.strip() for segment in segments if segment.strip()]
+    if len(segments) > 1:
+        tts_segmentation_metrics["segmented_replies"] += 1
+        tts_segmentation_metrics["segments"] += len(segments)
+        tts_segmentation_metrics["first_segment_chars"] += len(segments[0])
+    return segments
+
+def new_pipeline_context(endpoint: str, **values) -> Dict[str, Any]:
+    """Fresh per-request pipeline state"""
+    ctx = {
+        "endpoint": endpoint,
+        "session_id": None,
+        "audio_data": None,
+        "voice_id": "en-US-natalie",
+        "max_tokens": 800,
+        "temperature": 0.7,
+        "turn_id": uuid.uuid4().hex[:12],
+        "halted": False,
+        "timings": {},
+        "backends": {},
+        "hooks": []
+    }
+    ctx.update(values)
+    return ctx
+
+async def emit_pipeline_event(event: str, stage_name: str, ctx: Dict[str, Any]) -> None:
+    """Fan a stage event out to global and per-request hooks; hook errors never break a turn"""
+    for hook in pipeline_hooks + ctx["hooks"]:
+        try:
+            await hook(event, stage_name, ctx)
+        except Exception as e:
+            logger.warning("Pipeline hook failed on %s/%s: %s", event, stage_name, e)
+
+class PipelineStage(abc.ABC):
+    """One step of the voice pipeline with a backend fallback chain and retry policy"""
+    name = ""
+    # Stages that still run after an earlier stage halted the pipeline (e.g. speaking a fallback)
+    runs_after_halt = False
+    
+    def __init__(self, backends: Optional[List[str]] = None, max_retries: Optional[int] = None):
+        self.backends = backends if backends is not None else PIPELINE_BACKENDS.get(self.name, [])
+        self.max_retries = max_retries if max_retries is not None else PIPELINE_MAX_RETRIES.get(self.name, 2)
+    
+    def should_run(self, ctx: Dict[str, Any]) -> bool:
+        return True
+    
+    async def invoke_backend(self, backend_name: str, args: tuple) -> Dict[str, Any]:
+        """Call one backend and feed its latency to the router"""
+        start_time = time.time()
+        result = await stage_backends[self.name][backend_name](*args, max_retries=self.max_retries)
+        latency_router.record(self.name, backend_name, (time.time() - start_time) * 1000)
+        return result
+    
+    async def hedged_call(self, primary: str, alternate: str, args: tuple) -> tuple:
+        """Run the primary; if it outlives its p95, race a duplicate on the alternate and take the first answer"""
+        primary_task = asyncio.create_task(self.invoke_backend(primary, args))
+        pending = {primary_task}
+        try:
+            await asyncio.wait(pending, timeout=latency_router.hedge_delay(self.name, primary))
+            if primary_task.done():
+                error = primary_task.exception()
+                if error is None:
+                    return primary, primary_task.result()
+                if isinstance(error, HTTPException) and error.status_code < 500:
+                    raise error
+                # Primary failed fast: the alternate is an ordinary fallback, not a hedge
+                return alternate, await self.invoke_backend(alternate, args)
+            
+            if not latency_router.allow_hedge(self.name):
+                return primary, await primary_task
+            
+            stats = latency_router.stage_metrics(self.name)
+            stats["hedges"] += 1
+            provider_logger.info("Hedging %s: %s exceeded p95, racing %s", self.name, primary, alternate)
+            hedge_task = asyncio.create_task(self.invoke_backend(alternate, args))
+            names = {primary_task: primary, hedge_task: alternate}
+            pending = {primary_task, hedge_task}
+            last_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            stats["hedge_wins"] += 1
+                        return names[task], task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def call_backends(self, ctx: Dict[str, Any], *args) -> Dict[str, Any]:
+        """Try each backend in latency-aware order (hedging the first two where enabled);
+        client errors (4xx) are not retried on another backend"""
+        order = latency_router.order(self.name, [name for name in self.backends if name in stage_backends[self.name]])
+        preferred = ctx.get("preferred_backends", {}).get(self.name)
+        if preferred in order:
+            order = [preferred] + [name for name in order if name != preferred]
+        last_error = None
+        
+        if HEDGE_ENABLED and self.name in HEDGE_STAGES and len(order) > 1:
+            try:
+                backend_name, result = await self.hedged_call(order[0], order[1], args)
+                ctx["backends"][self.name] = backend_name
+                return result
+            except HTTPException as e:
+                if e.status_code < 500:
+                    raise
+                last_error = e
+                order = order[2:]
+        
+        for backend_name in order:
+            try:
+                result = await self.invoke_backend(backend_name, args)
+                ctx["backends"][self.name] = backend_name
+                return result
+            except HTTPException as e:
+                if e.status_code < 500:
+                    raise
+                last_error = e
+                logger.warning("%s backend %s failed, trying next: %s", self.name, backend_name, e.detail)
+        raise last_error or HTTPException(status_code=503, detail=f"No {self.name} backend available")
+    
+    @abc.abstractmethod
+    async def run(self, ctx: Dict[str, Any]) -> None:
+        """Read this stage's inputs from ctx and write its outputs back"""
+    
+    async def on_failure(self, ctx: Dict[str, Any], error: HTTPException, recover: bool) -> None:
+        """Default policy: propagate the error"""
+        raise error
+
+def record_session_failure(ctx: Dict[str, Any], error_type: str, system_message: str) -> None:
+    """Halt a conversational turn with a spoken fallback and track the error on the session"""
+    ctx.update({
+        "halted": True,
+        "error_type": error_type,
+        "fallback_message": FALLBACK_MESSAGES[error_type]
+    })
+    if ctx["session_id"]:
+        add_message_to_session(ctx["session_id"], "system", system_message)
+        session_data = get_or_create_session(ctx["session_id"])
+        session_data["error_count"] = session_data.get("error_count", 0) + 1
+
+class TranscribeStage(PipelineStage):
+    """Speech-to-text: audio_data -> user_message"""
+    name = "stt"
+    
+    def should_run(self, ctx):
+        return ctx["audio_data"] is not None and not ctx.get("user_message")
+    
+    async def run(self, ctx):
+        result = await self.call_backends(ctx, ctx["audio_data"], ctx["endpoint"])
+        ctx["transcription"] = result
+        ctx["user_message"] = result["text"]
+        pipeline_logger.info("Transcription successful (%d chars)", len(result["text"]))
+    
+    async def on_failure(self, ctx, error, recover):
+        if not recover:
+            raise error
+        record_session_failure(ctx, "transcription_error", f"Transcription failed: {error.detail}")
+
+class ContextStage(PipelineStage):
+    """Record the user turn and build the LLM prompt from session history"""
+    name = "context"
+    
+    async def run(self, ctx):
+        if ctx["session_id"]:
+            add_message_to_session(ctx["session_id"], "user", ctx["user_message"])
+            ctx["prompt"] = format_chat_history_for_llm(ctx["session_id"], ctx["user_message"])
+        else:
+            ctx["prompt"] = ctx["user_message"]
+
+class GenerateReplyStage(PipelineStage):
+    """LLM: prompt -> ai_response"""
+    name = "llm"
+    
+    async def run(self, ctx):
+        speculative = await speculation_engine.commit(ctx["speculation"], ctx.get("budget")) if ctx.get("speculation") else None
+        cacheable = speculative is None and response_cache_eligible(ctx)
+        cached = response_cache.lookup(ctx["user_message"]) if cacheable else None
+        if speculative is not None:
+            ctx["backends"][self.name] = "speculative"
+            result = speculative
+        elif cached is not None:
+            entry, tier = cached
+            ctx["response_cache_entry"] = entry
+            ctx["response_cache"] = tier
+            result = {"text": entry["response"], "model": "cache", "processing_time": 0.0, "cached": True}
+        else:
+            scope_token = context_cache_scope.set(ctx["session_id"])
+            try:
+                result = await self.call_backends(ctx, ctx["prompt"], ctx["max_tokens"], ctx["temperature"])
+            finally:
+                context_cache_scope.reset(scope_token)
+            if cacheable:
+                ctx["response_cache_entry"] = response_cache.store(ctx["user_message"], result["text"])
+        ctx["llm"] = result
+        ctx["ai_response"] = result["text"]
+        pipeline_logger.info("LLM response generated: %d characters", len(result["text"]))
+        if ctx["session_id"]:
+            add_message_to_session(ctx["session_id"], "assistant", ctx["ai_response"])
+    
+    async def on_failure(self, ctx, error, recover):
+        if not recover:
+            raise error
+        record_session_failure(ctx, "llm_error", f"LLM failed: {error.detail}")
+        ctx["ai_response"] = ctx["fallback_message"]
+
+class SynthesizeStage(PipelineStage):
+    """Text-to-speech for ctx[source]; speaks the fallback message when the pipeline halted"""
+    name = "tts"
+    runs_after_halt = True
+    
+    def __init__(self, source: str = "ai_response", allow_chunking: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.source = source
+        self.allow_chunking = allow_chunking
+    
+    def should_run(self, ctx):
+        if ctx["halted"]:
+            return bool(ctx.get("fallback_message"))
+        return bool(ctx.get(self.source))
+    
+    async def synthesize_segment(self, ctx, index: int, count: int, text: str) -> Dict[str, Any]:
+        """Synthesise one segment and announce it as soon as it is ready"""
+        result = await self.call_backends(ctx, text, ctx["voice_id"])
+        await self.announce_segment(ctx, index, count, text, result)
+        return result
+    
+    async def announce_segment(self, ctx, index, count, text, result):
+        segment = {"index": index, "count": count, "text": text, "audio_url": result.get("audio_url"),
+                   "fallback_text": result.get("fallback_text"),
+                   "processing_time": None if result.get("cached") else result.get("processing_time")}
+        # Segments finish concurrently, so each event gets its own view of ctx
+        await emit_pipeline_event("segment_ready", self.name, {**ctx, "segment": segment})
+    
+    async def run(self, ctx):
+        text = ctx["fallback_message"] if ctx["halted"] else ctx[self.source]
+        cache_entry = None if ctx["halted"] or self.source != "ai_response" else ctx.get("response_cache_entry")
+        cached_audio = cache_entry["audio"].get(ctx["voice_id"]) if cache_entry else None
+        # Replies over Murf's limit need several calls; outside streaming they get one URL the
+        # chunks are joined behind (see serve_assembled_audio). Anything shorter stays one call
+        # with a persistent URL.
+        assembles = (self.allow_chunking and AUDIO_ASSEMBLY_ENABLED and not ctx.get("stream_segments")
+                     and not ctx["halted"] and len(text) > MURF_MAX_CHARS)
+        chunks = [text]
+        if cached_audio:
+            pass
+        elif streams_segments(ctx):
+            chunks = plan_tts_segments(text, ctx["voice_id"])
+        elif (self.allow_chunking or ctx.get("stream_segments")) and len(text) > MURF_MAX_CHARS:
+            chunks = split_text_for_murf(text, MURF_MAX_CHARS)
+        if len(chunks) > 1:
+            pipeline_logger.info("Response of %d chars split into %d segments", len(text), len(chunks))
+            segments = [asyncio.create_task(self.synthesize_segment(ctx, index, len(chunks), chunk))
+                        for index, chunk in enumerate(chunks)]
+            if assembles:
+                assembly = create_audio_assembly(segments)
+                # Only the first segment is waited for; the rest are streamed as they finish
+                if (await asyncio.shield(segments[0])).get("audio_url"):
+                    ctx["audio_result"] = {"audio_url": f"/audio/assembled/{assembly['assembly_id']}", "assembled": True}
+                    ctx["assembled_segments"] = len(chunks)
+                    return
+                audio_assemblies.pop(assembly["assembly_id"], None)
+            results = await asyncio.gather(*segments)
+            ctx["audio_results"] = results
+            ctx["audio_result"] = results[0]
+            ctx["audio_urls"] = [result["audio_url"] for result in results if result.get("audio_url")]
+        else:
+            if cached_audio:
+                response_cache.metrics["audio_reuses"] += 1
+                ctx["audio_result"] = dict(cached_audio)
+            else:
+                ctx["audio_result"] = await self.call_backends(ctx, text, ctx["voice_id"])
+                if cache_entry and ctx["audio_result"].get("audio_url"):
+                    cache_entry["audio"][ctx["voice_id"]] = ctx["audio_result"]
+            await self.announce_segment(ctx, 0, 1, text, ctx["audio_result"])
+
+class VoicePipeline:
+    """Runs stages in order with per-stage timing hooks, retries and fallback policies.
+
+    With recover=True a failing stage halts the pipeline with a fallback message
+    (spoken by stages marked runs_after_halt) instead of raising.
+    """
+    
+    def __init__(self, name: str, stages: List[PipelineStage], recover: bool = False):
+        self.name = name
+        self.stages = stages
+        self.recover = recover
+    
+    async def run(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        turn_context = {"endpoint": ctx["endpoint"], "session_id": ctx["session_id"], "turn_id": ctx["turn_id"]}
+        context_token = log_context.set(turn_context)
+        # Provider calls made by this run queue under the endpoint's class, fairly per session (or job)
+        priority_token = request_priority.set((scheduling_class(ctx["endpoint"]), ctx["session_id"] or ctx.get("flow") or ctx["endpoint"]))
+        try:
+            for stage in self.stages:
+                if ctx["halted"] and not stage.runs_after_halt:
+                    continue
+                if not stage.should_run(ctx):
+                    continue
+                
+                log_context.set({**turn_context, "stage": stage.name})
+                stats = pipeline_metrics.setdefault(stage.name, {"runs": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0})
+                await emit_pipeline_event("stage_start", stage.name, ctx)
+                start_time = time.time()
+                error = None
+                try:
+                    await stage.run(ctx)
+                except HTTPException as e:
+                    error = e
+                
+                elapsed_ms = (time.time() - start_time) * 1000
+                ctx["timings"][stage.name] = round(ctx["timings"].get(stage.name, 0.0) + elapsed_ms, 1)
+                stats["runs"] += 1
+                stats["total_ms"] += elapsed_ms
+                stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+                
+                if error is not None:
+                    stats["failures"] += 1
+                    await emit_pipeline_event("stage_error", stage.name, ctx)
+                    await stage.on_failure(ctx, error, self.recover)
+                await emit_pipeline_event("stage_end", stage.name, ctx)
+        finally:
+            request_priority.reset(priority_token)
+            log_context.reset(context_token)
+        return ctx
+
+conversation_pipeline = VoicePipeline(
+    "agent_chat",
+    [TranscribeStage(), ContextStage(), GenerateReplyStage(), SynthesizeStage()],
+    recover=True
+)
+voice_query_pipeline = VoicePipeline(
+    "llm_query",
+    [TranscribeStage(), ContextStage(), GenerateReplyStage(), SynthesizeStage(allow_chunking=True)]
+)
+text_query_pipeline = VoicePipeline("llm_query", [ContextStage(), GenerateReplyStage()])
+echo_pipeline = VoicePipeline("tts_echo", [TranscribeStage(), SynthesizeStage(source="user_message")])
+transcription_pipeline = VoicePipeline("transcribe_file", [TranscribeStage()])
+speech_pipeline = VoicePipeline("tts", [SynthesizeStage(source="text", allow_chunking=True)])
+
+# Generation budgets: before the LLM runs, pick max_tokens, the LLM backend and a brevity
+# instruction so the predicted first-audio and total times meet the turn's targets. Runs as a
+# pipeline hook, so a failing planner leaves the turn as it was.
+BUDGET_CHARS_PER_TOKEN = 4
+BUDGET_WORDS_PER_TOKEN = 0.75
+# Requests for detail are held to the total-duration target only
+BUDGET_DETAIL_PATTERN = re.compile(r"\b(explain|in detail|step by step|elaborate|tell me more|walk me through)\b", re.IGNORECASE)
+
+class GenerationBudgetController:
+    """Plans each spoken turn's generation budget and compares predictions with what happened"""
+    
+    def __init__(self):
+        self.llm_models: Dict[str, LinearLatencyModel] = {}
+        self.reply_tokens = None  # moving average length of unconstrained replies
+        self.metrics = {"planned": 0, "constrained": 0, "rerouted": 0, "measured": 0,
+                        "first_audio_met": 0, "total_met": 0, "first_audio_error_ms": 0.0, "total_error_ms": 0.0}
+    
+    def llm_model(self, backend: str) -> LinearLatencyModel:
+        if backend not in self.llm_models:
+            self.llm_models[backend] = LinearLatencyModel(*BUDGET_LLM_PRIORS.get(backend, [500, 8]))
+        return self.llm_models[backend]
+    
+    def targets(self, ctx: Dict[str, Any]) -> Optional[Dict[str, int]]:
+        requested = ctx.get("budget_targets") or {}
+        if ctx["endpoint"] not in BUDGET_ENDPOINTS or not (GENERATION_BUDGET_ENABLED or any(requested.values())):
+            return None
+        return {
+            "first_audio_ms": int(requested.get("first_audio_ms") or BUDGET_TARGET_FIRST_AUDIO_MS),
+            "total_ms": int(requested.get("total_ms") or BUDGET_TARGET_TOTAL_MS)
+        }
+    
+    def predict(self, ctx: Dict[str, Any], backend: str, elapsed_ms: float, tokens: float) -> Dict[str, float]:
+        llm_ms = self.llm_model(backend).predict(tokens)
+        tts_model = tts_latency_model(ctx["voice_id"])
+        chars = int(tokens * BUDGET_CHARS_PER_TOKEN)
+        # Segments are synthesised concurrently: first audio waits for the first, the total for the longest
+        lengths = tts_segment_lengths(chars, ctx["voice_id"]) if streams_segments(ctx) else [min(chars, MURF_MAX_CHARS)]
+        first_ms, longest_ms = tts_model.predict(lengths[0]), tts_model.predict(max(lengths))
+        return {
+            "llm_ms": round(llm_ms, 1),
+            "tts_ms": round(longest_ms, 1),
+            "first_audio_ms": round(elapsed_ms + llm_ms + first_ms, 1),
+            "total_ms": round(elapsed_ms + llm_ms + longest_ms, 1)
+        }
+    
+    def plan(self, ctx: Dict[str, Any]) -> None:
+        targets = self.targets(ctx)
+        if targets is None or ctx["halted"]:
+            return
+        elapsed_ms = sum(ctx["timings"].values())
+        requested = ctx["max_tokens"]
+        detail = bool(BUDGET_DETAIL_PATTERN.search(ctx.get("user_message") or ""))
+        tts_model = tts_latency_model(ctx["voice_id"])
+        tts_base, tts_per_char = tts_model.coefficients()
+        # With segmented synthesis the first audio only waits for the short first segment
+        first_tts_ms = tts_model.predict(first_tts_segment_chars(ctx["voice_id"])) if streams_segments(ctx) else None
+        backends = [name for name in PIPELINE_BACKENDS.get("llm", []) if name in stage_backends["llm"]]
+        
+        def tokens_within(budget_ms: float, ms_per_token: float) -> float:
+            # No per-token cost at all means length does not affect the time
+            return budget_ms / ms_per_token if ms_per_token > 0 else requested
+        
+        affordable = []
+        for backend in backends:
+            model = self.llm_model(backend)
+            base, per_token = model.coefficients()
+            if per_token <= 0:
+                # The fitted slope is clamped at zero when samples don't show one; use the prior
+                per_token = model.prior[1]
+            # Total: the LLM writes every token and TTS reads them all (conservatively, as one segment)
+            tokens = tokens_within(targets["total_ms"] - elapsed_ms - base - tts_base, per_token + tts_per_char * BUDGET_CHARS_PER_TOKEN)
+            if not detail:
+                if first_tts_ms is None:
+                    first_tokens = tokens_within(targets["first_audio_ms"] - elapsed_ms - base - tts_base,
+                                                 per_token + tts_per_char * BUDGET_CHARS_PER_TOKEN)
+                else:
+                    first_tokens = tokens_within(targets["first_audio_ms"] - elapsed_ms - base - first_tts_ms, per_token)
+                tokens = min(tokens, first_tokens)
+            affordable.append((int(tokens), backend))
+        if not affordable:
+            return
+        # The primary unless it can't fit a useful reply and an alternate fits a longer one
+        tokens, backend = affordable[0]
+        if tokens < BUDGET_MIN_TOKENS:
+            tokens, backend = max(affordable, key=lambda item: item[0])
+        max_tokens = max(min(tokens, requested), BUDGET_MIN_TOKENS)
+        constrained = max_tokens < requested
+        
+        ctx["max_tokens"] = max_tokens
+        if backend != backends[0]:
+            ctx.setdefault("preferred_backends", {})["llm"] = backend
+            self.metrics["rerouted"] += 1
+        words = None
+        if constrained:
+            # Ask for a reply that ends naturally inside the token cap instead of being cut off
+            words = max(int(max_tokens * BUDGET_WORDS_PER_TOKEN * 0.8), 10)
+            ctx["prompt"] = f"{ctx['prompt']}\n(Reply in at most {words} words; the answer is read aloud.)"
+            self.metrics["constrained"] += 1
+        expected_tokens = max_tokens * 0.8 if constrained else min(self.reply_tokens or requested, requested)
+        ctx["budget"] = {
+            "targets": targets,
+            "detail_requested": detail,
+            "requested_max_tokens": requested,
+            "max_tokens": max_tokens,
+            "backend": backend,
+            "brevity_words": words,
+            "predicted": self.predict(ctx, backend, elapsed_ms, expected_tokens),
+            "actual": {},
+            "turn_started_at": time.time() - elapsed_ms / 1000
+        }
+        self.metrics["planned"] += 1
+    
+    def observe_reply(self, ctx: Dict[str, Any]) -> None:
+        backend = ctx["backends"].get("llm")
+        if ctx["halted"] or not ctx.get("ai_response") or backend in (None, "speculative") or ctx["llm"].get("cached"):
+            return
+        tokens = estimate_tokens(ctx["ai_response"])
+        self.llm_model(backend).observe(tokens, ctx["timings"]["llm"])
+        if not ctx.get("budget", {}).get("brevity_words"):
+            self.reply_tokens = tokens if self.reply_tokens is None else 0.8 * self.reply_tokens + 0.2 * tokens
+    
+    def finish(self, ctx: Dict[str, Any]) -> None:
+        budget = ctx.get("budget")
+        if not budget or "total_ms" in budget["actual"]:
+            return
+        actual = budget["actual"]
+        actual.update({"llm_ms": ctx["timings"].get("llm"), "tts_ms": ctx["timings"].get("tts"),
+                       "total_ms": round((time.time() - budget["turn_started_at"]) * 1000, 1)})
+        actual.setdefault("first_audio_ms", actual["total_ms"])
+        stats = self.metrics
+        stats["measured"] += 1
+        stats["first_audio_met"] += actual["first_audio_ms"] <= budget["targets"]["first_audio_ms"]
+        stats["total_met"] += actual["total_ms"] <= budget["targets"]["total_ms"]
+        stats["first_audio_error_ms"] += abs(actual["first_audio_ms"] - budget["predicted"]["first_audio_ms"])
+        stats["total_error_ms"] += abs(actual["total_ms"] - budget["predicted"]["total_ms"])
+    
+    async def on_pipeline_event(self, event: str, stage_name: str, ctx: Dict[str, Any]) -> None:
+        if event == "stage_start" and stage_name == "llm":
+            self.plan(ctx)
+        elif event == "stage_end" and stage_name == "llm":
+            self.observe_reply(ctx)
+        elif event == "segment_ready":
+            budget = ctx.get("budget")
+            if budget and "first_audio_ms" not in budget["actual"] and ctx["segment"]["audio_url"]:
+                budget["actual"]["first_audio_ms"] = round((time.time() - budget["turn_started_at"]) * 1000, 1)
+        elif event == "stage_end" and stage_name == "tts":
+            self.finish(ctx)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        stats = self.metrics
+        measured = stats["measured"]
+        return {
+            "enabled": GENERATION_BUDGET_ENABLED,
+            "targets": {"first_audio_ms": BUDGET_TARGET_FIRST_AUDIO_MS, "total_ms": BUDGET_TARGET_TOTAL_MS},
+            **{name: value for name, value in stats.items() if not name.endswith("_error_ms")},
+            "mean_first_audio_error_ms": round(stats["first_audio_error_ms"] / measured, 1) if measured else None,
+            "mean_total_error_ms": round(stats["total_error_ms"] / measured, 1) if measured else None,
+            "llm_models": {name: [round(value, 2) for value in model.coefficients()] for name, model in self.llm_models.items()}
+        }
+
+generation_budget = GenerationBudgetController()
+pipeline_hooks.append(generation_budget.on_pipeline_event)
+
+# Speculative generation: start the LLM on a stable partial transcript while the user may
+# still be talking, and keep the result only if the final transcript says the same thing
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def speculative_prompt(session_id: str, text: str) -> str:
+    """The prompt the context stage would build, without recording the user message yet"""
+    line = f"User: {text}"
+    if not get_or_create_session(session_id)["messages"]:
+        return line
+    return f"{format_chat_history_for_llm(session_id, text)}\n{line}"
+
+class SpeculativeTurn:
+    """Speculation state for one utterance on a streaming connection"""
+    
+    def __init__(self, session_id: str, max_tokens: int, temperature: float):
+        self.session_id = session_id
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.partial = ""          # latest normalised partial transcript
+        self.partial_text = ""
+        self.timer = None
+        self.task: Optional[asyncio.Task] = None
+        self.text = None           # normalised transcript the running speculation answers
+        self.prompt = ""
+        self.started_at = 0.0
+        self.completed_at = None
+        self.final_at = None
+        self.attempts = 0
+
+class SpeculationEngine:
+    """Starts generation once a partial transcript has been stable for SPECULATION_STABLE_MS,
+    restarts it when the user keeps talking, and commits it when the final transcript matches"""
+    
+    def __init__(self):
+        self.stage = GenerateReplyStage()
+        self.waste_budget = TokenBucket(SPECULATION_WASTE_TOKENS_PER_MINUTE / 60, SPECULATION_WASTE_TOKENS_PER_MINUTE)
+        self.metrics = {"utterances": 0, "started": 0, "committed": 0, "discarded": 0, "failed": 0,
+                        "skipped_budget": 0, "over_budget": 0, "wasted_tokens": 0, "saved_ms": 0.0}
+    
+    def new_turn(self, session_id: str, settings: Dict[str, Any]) -> SpeculativeTurn:
+        return SpeculativeTurn(session_id, int(settings["max_tokens"]), float(settings["temperature"]))
+    
+    def on_partial(self, turn: SpeculativeTurn, text: str) -> None:
+        normalized = normalize_query(text)
+        if normalized == turn.partial:
+            return
+        turn.partial = normalized
+        turn.partial_text = text
+        if turn.timer is not None:
+            turn.timer.cancel()
+            turn.timer = None
+        if turn.task is not None and turn.text != normalized:
+            # The user kept talking: the running speculation answers an outdated transcript
+            self.discard(turn)
+        if SPECULATION_ENABLED and len(normalized.split()) >= SPECULATION_MIN_WORDS:
+            turn.timer = asyncio.get_running_loop().call_later(SPECULATION_STABLE_MS / 1000, self.start, turn)
+    
+    def end_likely(self, turn: SpeculativeTurn) -> None:
+        """Endpointer hint: trailing silence says the utterance is probably over, so don't wait for stability"""
+        if turn.timer is not None:
+            turn.timer.cancel()
+        if SPECULATION_ENABLED and len(turn.partial.split()) >= SPECULATION_MIN_WORDS:
+            self.start(turn)
+    
+    def start(self, turn: SpeculativeTurn) -> None:
+        turn.timer = None
+        if turn.task is not None or turn.attempts >= SPECULATION_MAX_ATTEMPTS:
+            return
+        allowed, _ = self.waste_budget.take(0)
+        if not allowed:
+            self.metrics["skipped_budget"] += 1
+            return
+        turn.attempts += 1
+        turn.text = turn.partial
+        turn.prompt = speculative_prompt(turn.session_id, turn.partial_text)
+        turn.started_at = time.time()
+        turn.completed_at = None
+        # The speculative prompt shares the session's cached prefix
+        scope_token = context_cache_scope.set(turn.session_id)
+        priority_token = request_priority.set(("interactive", turn.session_id))
+        task = asyncio.create_task(
+            self.stage.call_backends({"backends": {}}, turn.prompt, turn.max_tokens, turn.temperature)
+        )
+        request_priority.reset(priority_token)
+        context_cache_scope.reset(scope_token)
+        task.add_done_callback(lambda done: setattr(turn, "completed_at", time.time()) if turn.task is done else None)
+        turn.task = task
+        self.metrics["started"] += 1
+        pipeline_logger.info("Speculating on partial transcript (%d words, attempt %d)", len(turn.text.split()), turn.attempts)
+    
+    def discard(self, turn: SpeculativeTurn) -> None:
+        task, turn.task, turn.text = turn.task, None, None
+        finished = task.done() and not task.cancelled() and task.exception() is None
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()  # retrieved, so a failed speculation is not reported as unhandled
+        # Cancelling only stops our wait: the provider still generates (and bills) the reply
+        wasted = estimate_tokens(turn.prompt) + (estimate_tokens(task.result()["text"]) if finished else turn.max_tokens)
+        self.waste_budget.take(wasted, max_wait=float("inf"))
+        self.metrics["discarded"] += 1
+        self.metrics["wasted_tokens"] += wasted
+    
+    def resolve(self, turn: SpeculativeTurn, final_text: str) -> Optional[SpeculativeTurn]:
+        """On the final transcript: the turn to commit if its speculation matches, else None"""
+        self.metrics["utterances"] += 1
+        if turn.timer is not None:
+            turn.timer.cancel()
+            turn.timer = None
+        if turn.task is None:
+            return None
+        if normalize_query(final_text) != turn.text:
+            self.discard(turn)
+            return None
+        turn.final_at = time.time()
+        return turn
+    
+    async def commit(self, turn: SpeculativeTurn, budget: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Result of a matching speculation, or None to generate normally if it failed or the turn's budget is tighter"""
+        if budget is not None and (budget["max_tokens"] < turn.max_tokens or budget["brevity_words"]):
+            # The speculation was written with the connection's max_tokens and no brevity instruction
+            self.discard(turn)
+            self.metrics["over_budget"] += 1
+            return None
+        try:
+            result = await turn.task
+        except HTTPException:
+            self.metrics["failed"] += 1
+            return None
+        completed_at = turn.completed_at or time.time()
+        # Without speculation generation would have started at final_at and taken as long
+        saved_ms = max(0.0, min(completed_at, turn.final_at) - turn.started_at) * 1000
+        self.metrics["committed"] += 1
+        self.metrics["saved_ms"] += saved_ms
+        return {**result, "speculative": True, "saved_ms": round(saved_ms, 1)}
+    
+    def close(self, turn: SpeculativeTurn) -> None:
+        if turn.timer is not None:
+            turn.timer.cancel()
+        if turn.task is not None:
+            self.discard(turn)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        started = self.metrics["started"]
+        committed = self.metrics["committed"]
+        return {
+            "enabled": SPECULATION_ENABLED,
+            **self.metrics,
+            "saved_ms": round(self.metrics["saved_ms"], 1),
+            "hit_rate": round(committed / started, 3) if started else 0.0,
+            "avg_saved_ms": round(self.metrics["saved_ms"] / committed, 1) if committed else 0.0,
+            "waste_budget_tokens": round(self.waste_budget.tokens)
+        }
+
+speculation_engine = SpeculationEngine()
+
+class RealtimeSTTSession:
+    """AssemblyAI real-time transcription for one streaming connection; SDK callbacks arrive
+    on the SDK's thread and are handed to the event loop as ("partial" | "final" | "error", text)"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, end_utterance_silence_ms: int = STREAM_END_UTTERANCE_SILENCE_MS):
+        self.loop = loop
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.transcriber = aai.RealtimeTranscriber(
+            sample_rate=STREAM_SAMPLE_RATE,
+            on_data=self.on_data,
+            on_error=self.on_error,
+            end_utterance_silence_threshold=end_utterance_silence_ms
+        )
+    
+    def on_data(self, transcript) -> None:
+        if isinstance(transcript, aai.RealtimeFinalTranscript):
+            self.loop.call_soon_threadsafe(self.events.put_nowait, ("final", transcript.text or ""))
+        elif transcript.text:
+            self.loop.call_soon_threadsafe(self.events.put_nowait, ("partial", transcript.text))
+    
+    def on_error(self, error) -> None:
+        self.loop.call_soon_threadsafe(self.events.put_nowait, ("error", str(error)))
+    
+    async def connect(self) -> None:
+        await asyncio.to_thread(self.transcriber.connect)
+    
+    async def send(self, audio_data: bytes) -> None:
+        await asyncio.to_thread(self.transcriber.stream, audio_data)
+    
+    async def force_end_utterance(self) -> None:
+        await asyncio.to_thread(self.transcriber.force_end_utterance)
+    
+    async def close(self) -> None:
+        try:
+            await asyncio.to_thread(self.transcriber.close)
+        except Exception as e:
+            logger.warning("Closing real-time transcriber failed: %s", e)
+
+def build_agent_chat_response(ctx: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    """Shape the agent_chat JSON from a finished conversation pipeline run"""
+    session_id = ctx["session_id"]
+    session_data = get_or_create_session(session_id)
+    audio_result = ctx.get("audio_result") or {}
+    
+    if ctx.get("error_type"):
+        response_data = {
+            "success": False,
+            "error_type": ctx["error_type"],
+            "fallback_message": ctx["fallback_message"],
+            "session_id": session_id,
+            "audio_url": audio_result.get("audio_url"),
+            "fallback_text": audio_result.get("fallback_text"),
+            "chat_history": session_data["messages"],
+            "stage_timings": ctx["timings"],
+            "timestamp": datetime.now().isoformat()
+        }
+        if ctx.get("user_message"):
+            response_data["user_message"] = ctx["user_message"]
+            response_data["ai_response"] = ctx.get("ai_response")
+        return response_data
+    
+    response_data = {
+        "success": True,
+        "session_id": session_id,
+        "user_message": ctx["user_message"],
+        "ai_response": ctx["ai_response"],
+        "voice_id": ctx["voice_id"],
+        "generated_at": datetime.now().isoformat(),
+        "total_processing_time": (time.time() - start_time) * 1000,
+        "stage_timings": ctx["timings"],
+        "response_cache": ctx.get("response_cache"),
+        "generation_budget": ctx.get("budget"),
+        "audio_preprocessing": ctx.get("transcription", {}).get("preprocessing"),
+        "chat_history": session_data["messages"]
+    }
+    
+    # Add audio or fallback text
+    if audio_result.get("audio_url"):
+        response_data["audio_url"] = audio_result["audio_url"]
+    else:
+        response_data["fallback_text"] = audio_result.get("fallback_text", ctx["ai_response"])
+        response_data["tts_error"] = audio_result.get("error")
+        response_data["fallback_message"] = audio_result.get("fallback_message")
+    
+    return response_data
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def make_progress_hook(emit):
+    """Pipeline hook that reports turn progress as (event, data): transcript, reply, audio per segment"""
+    async def forward(event, stage_name, event_ctx):
+        if event == "stage_end" and stage_name == "context":
+            emit("transcript", {"user_message": event_ctx["user_message"],
+                                "stage_ms": event_ctx["timings"].get("stt", 0.0)})
+        elif event == "stage_end" and stage_name == "llm" and event_ctx.get("ai_response"):
+            emit("reply", {"ai_response": event_ctx["ai_response"],
+                           "response_cache": event_ctx.get("response_cache"),
+                           "stage_ms": event_ctx["timings"].get("llm", 0.0)})
+        elif event == "segment_ready":
+            emit("audio", event_ctx["segment"])
+    return forward
+
+def build_turn_delta(ctx: Dict[str, Any], start_time: float, history_start: int, error: Optional[Exception] = None) -> Dict[str, Any]:
+    """Final event of a streamed turn: the usual response with only the messages this turn added"""
+    if error is None:
+        response_data = build_agent_chat_response(ctx, start_time)
+    else:
+        log_error("agent_chat_error", f"Unexpected error in streamed agent chat: {str(error)}", ctx["session_id"])
+        response_data = {
+            "success": False,
+            "error_type": "general_error",
+            "fallback_message": FALLBACK_MESSAGES["general_error"],
+            "session_id": ctx["session_id"]
+        }
+    response_data.pop("chat_history", None)
+    response_data["new_messages"] = get_or_create_session(ctx["session_id"])["messages"][history_start:]
+    return response_data
+
+async def stream_agent_chat(ctx: Dict[str, Any], start_time: float):
+    """Run the conversation pipeline, yielding Server-Sent Events as stages finish:
+    transcript, reply, audio (per segment), then done with the session delta"""
+    events: asyncio.Queue = asyncio.Queue()
+    history_start = len(get_or_create_session(ctx["session_id"])["messages"])
+    
+    ctx["hooks"].append(make_progress_hook(lambda event, data: events.put_nowait((event, data))))
+    ctx["stream_segments"] = True
+    task = asyncio.create_task(conversation_pipeline.run(ctx))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            yield format_sse(*item)
+        
+        error = task.exception()
+        yield format_sse("done", build_turn_delta(ctx, start_time, history_start, error))
+    finally:
+        # Client went away mid-turn
+        if not task.done():
+            task.cancel()
+
+endpointing_metrics = {"utterances": 0, "endpoints": 0, "false_cuts": 0, "speculation_hints": 0}
+
+def endpointing_profile(session_id: str) -> Dict[str, Any]:
+    """Per-session endpointing state, kept on the session so it survives reconnects"""
+    return get_or_create_session(session_id).setdefault("endpointing", {
+        "silence_ms": ENDPOINT_SILENCE_MS,
+        "bias_ms": 0,
+        "pauses": [],
+        "endpoints": 0,
+        "false_cuts": 0
+    })
+
+class Endpointer:
+    """Streaming energy VAD over 30 ms frames that ends an utterance after a trailing silence.
+
+    The silence threshold is tuned per session: just above the user's own mid-sentence
+    pauses (90th percentile plus a margin), raised whenever speech resumes right after
+    an endpoint (the turn was cut too early) and eased back after clean endpoints.
+    """
+    
+    def __init__(self, profile: Dict[str, Any]):
+        self.profile = profile
+        self.frame_samples = STREAM_SAMPLE_RATE * VAD_FRAME_MS // 1000
+        self.buffer = bytearray()
+        # Start at the absolute floor: the stream may open mid-speech, so the first frame says
+        # nothing about the background. A noisier room is picked up from recent_levels.
+        self.noise_floor_db = VAD_MIN_LEVEL_DB
+        self.recent_levels = deque(maxlen=3000 // VAD_FRAME_MS)
+        self.in_utterance = False
+        self.speech_ms = 0
+        self.silence_ms = 0
+        self.hinted = False
+        self.since_endpoint_ms = None
+    
+    def feed(self, audio_data: bytes) -> List[str]:
+        """Consume PCM16 audio; returns events in order: speech_start, end_likely, endpoint"""
+        self.buffer.extend(audio_data)
+        usable = len(self.buffer) // (self.frame_samples * 2) * self.frame_samples * 2
+        if not usable:
+            return []
+        frames = np.frombuffer(bytes(self.buffer[:usable]), dtype=np.int16).astype(np.float32).reshape(-1, self.frame_samples) / 32768.0
+        del self.buffer[:usable]
+        levels_db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+        events = []
+        for level_db in levels_db.tolist():
+            events.extend(self.step(level_db))
+        return events
+    
+    def step(self, level_db: float) -> List[str]:
+        self.recent_levels.append(level_db)
+        if len(self.recent_levels) >= 1000 // VAD_FRAME_MS:
+            # Even the quietest frame of the last seconds counts as speech: the floor is too low
+            quietest = min(self.recent_levels)
+            if quietest > self.noise_floor_db + VAD_THRESHOLD_DB:
+                self.noise_floor_db = quietest
+        voiced = level_db > max(self.noise_floor_db + VAD_THRESHOLD_DB, VAD_MIN_LEVEL_DB)
+        if not voiced:
+            # Follow the background level on non-speech frames; drop quickly, rise slowly
+            self.noise_floor_db += (0.3 if level_db < self.noise_floor_db else 0.05) * (level_db - self.noise_floor_db)
+        
+        if self.since_endpoint_ms is not None:
+            self.since_endpoint_ms += VAD_FRAME_MS
+            if voiced:
+                self.record_false_cut()
+            elif self.since_endpoint_ms > ENDPOINT_FALSE_CUT_MS:
+                self.record_clean_endpoint()
+            if voiced or self.since_endpoint_ms > ENDPOINT_FALSE_CUT_MS:
+                self.since_endpoint_ms = None
+        
+        events = []
+        if voiced:
+            if self.in_utterance and self.silence_ms >= 2 * VAD_FRAME_MS:
+                self.record_pause(self.silence_ms)
+            self.silence_ms = 0
+            self.hinted = False
+            self.speech_ms += VAD_FRAME_MS
+            if not self.in_utterance and self.speech_ms >= VAD_MIN_SPEECH_MS:
+                self.in_utterance = True
+                endpointing_metrics["utterances"] += 1
+                events.append("speech_start")
+            return events
+        
+        self.silence_ms += VAD_FRAME_MS
+        if not self.in_utterance:
+            # Isolated blips don't add up to an utterance
+            if self.silence_ms >= VAD_MIN_SPEECH_MS:
+                self.speech_ms = 0
+            return events
+        
+        threshold = self.profile["silence_ms"]
+        if not self.hinted and self.silence_ms >= threshold * ENDPOINT_SPECULATE_RATIO:
+            self.hinted = True
+            endpointing_metrics["speculation_hints"] += 1
+            events.append("end_likely")
+        if self.silence_ms >= threshold:
+            self.in_utterance = False
+            self.speech_ms = 0
+            self.since_endpoint_ms = 0
+            self.profile["endpoints"] += 1
+            endpointing_metrics["endpoints"] += 1
+            events.append("endpoint")
+        return events
+    
+    def record_pause(self, pause_ms: int) -> None:
+        pauses = self.profile["pauses"]
+        pauses.append(pause_ms)
+        del pauses[:-50]
+        self.retune()
+    
+    def record_false_cut(self) -> None:
+        self.profile["false_cuts"] += 1
+        self.profile["bias_ms"] = min(self.profile["bias_ms"] + 100, 500)
+        endpointing_metrics["false_cuts"] += 1
+        self.retune()
+    
+    def record_clean_endpoint(self) -> None:
+        # Each endpoint the user did not talk over earns back a little of the false-cut bias
+        if self.profile["bias_ms"] > 0:
+            self.profile["bias_ms"] = max(self.profile["bias_ms"] - 25, 0)
+            self.retune()
+    
+    def retune(self) -> None:
+        pauses = sorted(self.profile["pauses"])
+        base = pauses[int(0.9 * (len(pauses) - 1))] + ENDPOINT_MARGIN_MS if len(pauses) >= 5 else ENDPOINT_SILENCE_MS
+        self.profile["silence_ms"] = int(min(max(base + self.profile["bias_ms"], ENDPOINT_MIN_SILENCE_MS), ENDPOINT_MAX_SILENCE_MS))
+
+async def run_stream_turn(session_id: str, text: str, settings: Dict[str, Any],
+                          speculation: Optional[SpeculativeTurn], emit) -> None:
+    """One conversation turn from a final streamed transcript, reporting progress through emit"""
+    start_time = time.time()
+    history_start = len(get_or_create_session(session_id)["messages"])
+    ctx = new_pipeline_context(
+        "agent_stream",
+        session_id=session_id,
+        user_message=text,
+        voice_id=settings["voice"],
+        max_tokens=int(settings["max_tokens"]),
+        temperature=float(settings["temperature"]),
+        speculation=speculation,
+        stream_segments=True,
+        budget_targets={"first_audio_ms": settings["target_first_audio_ms"], "total_ms": settings["target_total_ms"]}
+    )
+    ctx["hooks"].append(make_progress_hook(emit))
+    error = None
+    try:
+        await conversation_pipeline.run(ctx)
+    except Exception as e:
+        error = e
+    emit("done", build_turn_delta(ctx, start_time, history_start, error))
+
+async def read_audio_upload(upload: UploadFile, session_id: str = None) -> bytes:
+    """Read an uploaded audio file, rejecting non-audio content types"""
+    try:
+        audio_data = await upload.read()
+        if not upload.content_type or not upload.content_type.startswith('audio/'):
+            raise HTTPException(status_code=400, detail="File must be an audio file")
+        return audio_data
+    except Exception as e:
+        log_error("audio_read_error", str(e), session_id)
+        raise HTTPException(status_code=400, detail="Error reading audio file")
+
+# Batch transcription
+batch_jobs: Dict[str, Dict[str, Any]] = {}
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+def batch_job_path(job_id: str, name: str) -> str:
+    return os.path.join(BATCH_JOBS_DIR, job_id, name)
+
+def save_batch_manifest(job: Dict[str, Any]) -> None:
+    with open(batch_job_path(job["job_id"], "manifest.json"), "w") as f:
+        json.dump({key: job[key] for key in ("job_id", "kind", "status", "created_at", "items")}, f)
+
+def load_batch_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return a job from memory, or reload it (with completed results) from disk"""
+    if job_id in batch_jobs:
+        return batch_jobs[job_id]
+    if not JOB_ID_PATTERN.match(job_id) or not os.path.exists(batch_job_path(job_id, "manifest.json")):
+        return None
+    with open(batch_job_path(job_id, "manifest.json")) as f:
+        job = json.load(f)
+    job["results"] = []
+    results_path = batch_job_path(job_id, "results.ndjson")
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            job["results"] = [json.loads(line) for line in f if line.strip()]
+    job["condition"] = asyncio.Condition()
+    batch_jobs[job_id] = job
+    return job
+
+async def append_batch_result(job: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """Persist one per-item result and wake result streams"""
+    job["results"].append(result)
+    async with aiofiles.open(batch_job_path(job["job_id"], "results.ndjson"), "a") as f:
+        await f.write(json.dumps(result) + "\n")
+    async with job["condition"]:
+        job["condition"].notify_all()
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        # ::ffff:127.0.0.1 reaches 127.0.0.1, so judge the IPv4 address it wraps
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+def check_manifest_url(url: str) -> str:
+    """Reject manifest URLs the server should not fetch; returns the host"""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("URL must be http(s) with a host")
+    if BATCH_URL_ALLOWED_HOSTS:
+        if host not in BATCH_URL_ALLOWED_HOSTS:
+            raise ValueError(f"Host {host} is not allowed")
+        return host
+    try:
+        literal = ipaddress.ip_address(host)
+    except ValueError:
+        if host == "localhost" or host.endswith((".localhost", ".local", ".internal")):
+            raise ValueError(f"Host {host} is not public")
+        return host
+    if not is_public_address(str(literal)):
+        raise ValueError(f"Host {host} is not public")
+    return host
+
+async def resolve_public_address(host: str) -> str:
+    """Resolve a manifest host once; every address it maps to must be public"""
+    addresses = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    if not addresses or not all(is_public_address(address[4][0]) for address in addresses):
+        raise ValueError(f"Host {host} resolves to a non-public address")
+    return addresses[0][4][0]
+
+async def read_batch_item_audio(item: Dict[str, Any]) -> bytes:
+    """Load a batch item's audio from its stored path or remote URL"""
+    if item.get("path"):
+        async with aiofiles.open(item["path"], "rb") as f:
+            return await f.read()
+    url = item["url"]
+    host = check_manifest_url(url)
+    headers, extensions = {}, {}
+    if not BATCH_URL_ALLOWED_HOSTS:
+        # Connect to the address that was checked. Letting httpx resolve the name again would
+        # let a rebinding DNS server answer with an internal address the second time
+        address = await resolve_public_address(host)
+        parts = urlsplit(url)
+        userinfo, _, netloc = parts.netloc.rpartition("@")
+        pinned = f"[{address}]" if ":" in address else address
+        if parts.port:
+            pinned += f":{parts.port}"
+        url = parts._replace(netloc=f"{userinfo}@{pinned}" if userinfo else pinned).geturl()
+        # The Host header and TLS (SNI and certificate check) still use the name
+        headers, extensions = {"Host": netloc}, {"sni_hostname": host}
+    
+    chunks, size = [], 0
+    # Redirects are not followed: they could lead anywhere
+    async with get_http_client().stream("GET", url, headers=headers, extensions=extensions, follow_redirects=False) as response:
+        if response.is_redirect:
+            raise ValueError(f"Audio URL redirected ({response.status_code})")
+        response.raise_for_status()
+        if int(response.headers.get("content-length") or 0) > BATCH_URL_MAX_BYTES:
+            raise ValueError(f"Audio at {host} is larger than {BATCH_URL_MAX_BYTES} bytes")
+        async for chunk in response.aiter_bytes(AUDIO_PROXY_CHUNK_SIZE):
+            size += len(chunk)
+            if size > BATCH_URL_MAX_BYTES:
+                raise ValueError(f"Audio at {host} is larger than {BATCH_URL_MAX_BYTES} bytes")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+async def run_batch_transcription(job: Dict[str, Any]) -> None:
+    """Transcribe every unfinished item with bounded concurrency, recording results as they complete"""
+    semaphore = asyncio.Semaphore(BATCH_STT_CONCURRENCY)
+    finished = {result["id"] for result in job["results"]}
+    
+    async def process(item: Dict[str, Any]) -> None:
+        async with semaphore:
+            start_time = time.time()
+            result = {"id": item["id"], "source": item.get("filename") or item.get("url")}
+            try:
+                ctx = new_pipeline_context("transcribe_batch", audio_data=await read_batch_item_audio(item), flow=job["job_id"])
+                await transcription_pipeline.run(ctx)
+                result.update({
+                    "status": "completed",
+                    "transcript": ctx["user_message"],
+                    "confidence": ctx["transcription"]["confidence"],
+                    "word_count": len(ctx["user_message"].split())
+                })
+            except HTTPException as e:
+                result.update({"status": "error", "error": e.detail})
+            except Exception as e:
+                result.update({"status": "error", "error": str(e)})
+            result["processing_time"] = (time.time() - start_time) * 1000
+            await append_batch_result(job, result)
+    
+    try:
+        await asyncio.gather(*(process(item) for item in job["items"] if item["id"] not in finished))
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "interrupted"
+        log_error("batch_transcription_error", str(e), additional_info={"job_id": job["job_id"]})
+    finally:
+        save_batch_manifest(job)
+        async with job["condition"]:
+            job["condition"].notify_all()
+
+def batch_job_last_activity(directory: str) -> float:
+    # Results are appended as items finish, so the newest file says when the job last did anything
+    return max([os.path.getmtime(directory)] + [entry.stat().st_mtime for entry in os.scandir(directory)])
+
+def batch_job_running(job_id: str) -> bool:
+    job = batch_jobs.get(job_id)
+    return job is not None and job["status"] == "running"
+
+async def sweep_batch_jobs() -> int:
+    """Delete job directories untouched for BATCH_JOB_RETENTION_HOURS, unless the job is running"""
+    cutoff = time.time() - BATCH_JOB_RETENTION_HOURS * 3600
+    removed = 0
+    for job_id in await asyncio.to_thread(os.listdir, BATCH_JOBS_DIR):
+        if not JOB_ID_PATTERN.match(job_id) or batch_job_running(job_id):
+            continue
+        directory = os.path.join(BATCH_JOBS_DIR, job_id)
+        try:
+            last_activity = await asyncio.to_thread(batch_job_last_activity, directory)
+        except OSError:
+            continue
+        # A resume may have restarted the job while the directory was being checked
+        if last_activity < cutoff and not batch_job_running(job_id):
+            batch_jobs.pop(job_id, None)
+            await asyncio.to_thread(shutil.rmtree, directory, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info("Removed %d expired batch job directories", removed)
+    return removed
+
+batch_job_sweep_task: Optional[asyncio.Task] = None
+
+async def batch_job_sweep_loop() -> None:
+    while True:
+        await sweep_batch_jobs()
+        await asyncio.sleep(3600)
+
+def start_batch_job(job: Dict[str, Any], runner) -> None:
+    """(Re)start a job's worker task unless it is finished or already running"""
+    if job["status"] == "completed" or (job.get("task") and not job["task"].done()):
+        return
+    job["status"] = "running"
+    save_batch_manifest(job)
+    job["task"] = asyncio.create_task(runner(job))
+
+async def stream_batch_results(job: Dict[str, Any], offset: int = 0):
+    """NDJSON: a job header, then per-item results as they complete, then a summary"""
+    yield json.dumps({"job_id": job["job_id"], "status": job["status"], "total": len(job["items"]), "offset": offset}) + "\n"
+    index = offset
+    while True:
+        while index < len(job["results"]):
+            yield json.dumps(job["results"][index]) + "\n"
+            index += 1
+        if job["status"] != "running":
+            break
+        async with job["condition"]:
+            await job["condition"].wait_for(lambda: len(job["results"]) > index or job["status"] != "running")
+    errors = sum(1 for result in job["results"] if result.get("status") == "error")
+    yield json.dumps({
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "completed": len(job["results"]) - errors,
+        "errors": errors,
+        "total": len(job["items"])
+    }) + "\n"
+
+def resolve_manifest_item(index: int, entry: Any) -> Dict[str, Any]:
+    """Validate a manifest entry: a URL, or a path inside the uploads directory"""
+    if isinstance(entry, str):
+        entry = {"url": entry} if entry.startswith(("http://", "https://")) else {"path": entry}
+    item_id = str(entry.get("id", index))
+    if entry.get("url"):
+        try:
+            check_manifest_url(entry["url"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Manifest entry {item_id}: {str(e)}")
+        return {"id": item_id, "url": entry["url"]}
+    uploads_root = os.path.realpath(UPLOAD_DIR)
+    path = os.path.realpath(os.path.join(uploads_root, entry.get("path", "")))
+    if not path.startswith(uploads_root + os.sep) or not os.path.isfile(path):
+        raise HTTPException(status_code=400, detail=f"Manifest entry {item_id}: file not found in uploads")
+    return {"id": item_id, "path": path, "filename": os.path.basename(path)}
+
+# Bulk TTS rendering
+async def wait_for_cached_audio(audio_id: str) -> Optional[Dict[str, Any]]:
+    """Wait for a cached audio download to finish; None if it is missing or failed"""
+    entry = await get_cached_audio(audio_id)
+    if entry is None:
+        return None
+    if not entry["complete"]:
+        async with entry["condition"]:
+            await entry["condition"].wait_for(lambda: entry["complete"] or entry.get("error"))
+    return None if entry.get("error") else entry
+
+async def render_cached_tts(text: str, voice_id: str) -> tuple:
+    """Make sure text+voice is in the local audio cache; returns (cache entry, cache_hit)"""
+    audio_id = audio_cache_id(text, voice_id)
+    if await get_cached_audio(audio_id) is not None:
+        entry = await wait_for_cached_audio(audio_id)
+        if entry is not None:
+            return entry, True
+    
+    audio_result = await safe_generate_audio(text, voice_id)
+    if not audio_result.get("audio_url"):
+        raise HTTPException(status_code=503, detail=audio_result.get("error") or "TTS failed")
+    if not AUDIO_PROXY_ENABLED:
+        await proxy_provider_audio(audio_id, audio_result["audio_url"])
+    entry = await wait_for_cached_audio(audio_id)
+    if entry is None:
+        raise HTTPException(status_code=502, detail="Failed to download synthesised audio")
+    return entry, False
+
+def write_bulk_tts_index(job: Dict[str, Any]) -> None:
+    """Index manifest: one record per input item pointing at its audio file"""
+    results = {result["id"]: result for result in job["results"]}
+    index = [{**item, **results.get(item["id"], {"status": "pending"})} for item in job["items"]]
+    with open(batch_job_path(job["job_id"], "index.json"), "w") as f:
+        json.dump({"job_id": job["job_id"], "status": job["status"], "items": index}, f, indent=2)
+
+async def run_bulk_tts(job: Dict[str, Any]) -> None:
+    """Synthesise each unique (text, voice) once with rate-limited concurrency, writing audio files"""
+    # The job runs in its own task, so this only applies to its renders
+    request_priority.set(("bulk", job["job_id"]))
+    semaphore = asyncio.Semaphore(BULK_TTS_CONCURRENCY)
+    pacing = {"lock": asyncio.Lock(), "next_start": time.time()}
+    finished = {result["id"] for result in job["results"]}
+    audio_dir = batch_job_path(job["job_id"], "audio")
+    os.makedirs(audio_dir, exist_ok=True)
+    
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for item in job["items"]:
+        if item["id"] not in finished:
+            groups.setdefault(item["audio_id"], []).append(item)
+    
+    async def render(audio_id: str, items: List[Dict[str, Any]]) -> None:
+        async with semaphore:
+            start_time = time.time()
+            try:
+                cached = await get_cached_audio(audio_id) is not None
+                if not cached:
+                    # Space out provider requests to stay under the Murf rate
+                    async with pacing["lock"]:
+                        await asyncio.sleep(max(pacing["next_start"] - time.time(), 0))
+                        pacing["next_start"] = max(time.time(), pacing["next_start"]) + 1 / BULK_TTS_RATE
+                entry, cache_hit = await render_cached_tts(items[0]["text"], items[0]["voice_id"])
+                extension = "mp3" if "mpeg" in entry["content_type"] else "wav"
+                filename = f"{audio_id}.{extension}"
+                await asyncio.to_thread(shutil.copyfile, entry["path"], os.path.join(audio_dir, filename))
+                outcome = {"status": "completed", "file": f"audio/{filename}", "cache_hit": cache_hit}
+            except HTTPException as e:
+                outcome = {"status": "error", "error": e.detail}
+            except Exception as e:
+                outcome = {"status": "error", "error": str(e)}
+            outcome["processing_time"] = (time.time() - start_time) * 1000
+            for item in items:
+                await append_batch_result(job, {"id": item["id"], **outcome})
+    
+    try:
+        await asyncio.gather(*(render(audio_id, items) for audio_id, items in groups.items()))
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "interrupted"
+        log_error("bulk_tts_error", str(e), additional_info={"job_id": job["job_id"]})
+    finally:
+        save_batch_manifest(job)
+        write_bulk_tts_index(job)
+        async with job["condition"]:
+            job["condition"].notify_all()
+
+def bulk_tts_progress(job: Dict[str, Any]) -> Dict[str, Any]:
+    results = job["results"]
+    errors = sum(1 for result in results if result.get("status") == "error")
+    total = len(job["items"])
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "total": total,
+        "unique_renders": len({item["audio_id"] for item in job["items"]}),
+        "completed": len(results) - errors,
+        "errors": errors,
+        "cache_hits": sum(1 for result in results if result.get("cache_hit")),
+        "progress": round(len(results) / total * 100, 1) if total else 100.0,
+        "index": f"{BATCH_JOBS_DIR}/{job['job_id']}/index.json",
+        "created_at": job["created_at"]
+    }
+
+# Asynchronous pipeline jobs: submit returns a job ID at once, a fixed pool of workers runs
+# the pipeline, and the client fetches or long-polls the result instead of holding the socket
+class PipelineJobQueue:
+    """Bounded job queue and worker pool with an expiring result store"""
+    
+    def __init__(self, workers: int, queue_size: int, store_size: int, result_ttl: float):
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.store_size = store_size
+        self.result_ttl = result_ttl
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.metrics = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0, "expired": 0}
+    
+    def ensure_workers(self) -> None:
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.workers = [task for task in self.workers if not task.done()]
+        while len(self.workers) < self.worker_count:
+            self.workers.append(asyncio.create_task(self.worker()))
+    
+    def expire(self) -> None:
+        """Drop finished jobs past their TTL, then the oldest finished ones while the store is full"""
+        now = time.time()
+        finished = [job for job in self.jobs.values() if job["finished_at"] is not None]
+        for job in finished:
+            if job["finished_at"] + self.result_ttl <= now or len(self.jobs) >= self.store_size:
+                del self.jobs[job["job_id"]]
+                self.metrics["expired"] += 1
+    
+    def submit(self, kind: str, runner) -> Dict[str, Any]:
+        self.ensure_workers()
+        self.expire()
+        if len(self.jobs) >= self.store_size or self.queue.full():
+            self.metrics["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Too many pending jobs, try again shortly", headers={"Retry-After": "5"})
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(),
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "runner": runner,
+            "task": None,
+            "done": asyncio.Event()
+        }
+        self.jobs[job["job_id"]] = job
+        self.queue.put_nowait(job)
+        self.metrics["submitted"] += 1
+        return job
+    
+    async def worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                if job["status"] == "queued":
+                    await self.run(job)
+            finally:
+                self.queue.task_done()
+    
+    async def run(self, job: Dict[str, Any]) -> None:
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        job["task"] = asyncio.create_task(job["runner"]())
+        try:
+            job["result"] = await job["task"]
+            job["status"] = "completed"
+        except asyncio.CancelledError:
+            if job["status"] != "cancelled":
+                raise  # the worker itself is shutting down
+        except HTTPException as e:
+            job["status"] = "failed"
+            job["error"] = {"status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            # The job view is public: the exception text stays in the error log
+            log_error(f"{job['kind']}_job_error", str(e), additional_info={"job_id": job["job_id"]})
+            job["status"] = "failed"
+            job["error"] = {"status_code": 500, "detail": FALLBACK_MESSAGES["general_error"]}
+        finally:
+            self.finish(job)
+    
+    def finish(self, job: Dict[str, Any]) -> None:
+        # The runner holds the request context (audio included); release it with the job
+        job["runner"] = job["task"] = None
+        job["finished_at"] = time.time()
+        if job["status"] in self.metrics:
+            self.metrics[job["status"]] += 1
+        job["done"].set()
+    
+    def get(self, job_id: str) -> Dict[str, Any]:
+        self.expire()
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found or expired")
+        return job
+    
+    def cancel(self, job: Dict[str, Any]) -> None:
+        if job["finished_at"] is not None:
+            return
+        running = job["task"]
+        job["status"] = "cancelled"
+        if running is not None:
+            running.cancel()  # run() finishes the job
+        else:
+            self.finish(job)
+    
+    async def wait(self, job: Dict[str, Any], timeout: float) -> None:
+        try:
+            await asyncio.wait_for(job["done"].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    def view(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        started_at, finished_at = job["started_at"], job["finished_at"]
+        return {
+            "job_id": job["job_id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "created_at": job["created_at"],
+            "queue_ms": round(((started_at or finished_at or time.time()) - job["submitted_at"]) * 1000, 1),
+            "run_ms": round(((finished_at or time.time()) - started_at) * 1000, 1) if started_at else None,
+            "result": job["result"],
+            "error": job["error"]
+        }
+    
+    def snapshot(self) -> Dict[str, Any]:
+        statuses = [job["status"] for job in self.jobs.values()]
+        return {
+            "workers": self.worker_count,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "stored": len(self.jobs),
+            "store_size": self.store_size,
+            **self.metrics
+        }
+
+pipeline_jobs = PipelineJobQueue(PIPELINE_JOB_WORKERS, PIPELINE_JOB_QUEUE_SIZE, PIPELINE_JOB_STORE_SIZE, PIPELINE_JOB_RESULT_TTL)
+
+def prefers_async_job(request: Request) -> bool:
+    return "respond-async" in request.headers.get("prefer", "").lower()
+
+def accept_pipeline_job(kind: str, runner) -> JSONResponse:
+    """Queue runner() as a job and answer 202 with where to fetch the result"""
+    job = pipeline_jobs.submit(kind, runner)
+    status_url = f"/jobs/{job['job_id']}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job["job_id"], "status": job["status"], "status_url": status_url},
+        headers={"Location": status_url, "Preference-Applied": "respond-async"}
+    )
+
+@app.on_event("startup")
+async def start_health_prober():
+    """Start background provider probing"""
+    global health_probe_task
+    refresh_health_snapshot()
+    if HEALTH_PROBE_ENABLED:
+        health_probe_task = asyncio.create_task(health_probe_loop())
+        logger.info("Health prober started (interval %ss)", HEALTH_PROBE_INTERVAL)
+
+@app.on_event("startup")
+async def start_context_cache_sweeper():
+    """Forget expired context caches in the background"""
+    global context_cache_sweep_task
+    if CONTEXT_CACHE_ENABLED:
+        context_cache_sweep_task = asyncio.create_task(context_cache_sweep_loop())
+
+@app.on_event("startup")
+async def start_batch_job_sweeper():
+    """Delete expired batch job directories now and hourly"""
+    global batch_job_sweep_task
+    batch_job_sweep_task = asyncio.create_task(batch_job_sweep_loop())
+
+@app.on_event("shutdown")
+async def stop_batch_job_sweeper():
+    """Stop the batch job sweeper"""
+    if batch_job_sweep_task is not None:
+        batch_job_sweep_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_pipeline_job_workers():
+    """Stop the job workers; queued and running jobs are abandoned"""
+    for task in pipeline_jobs.workers:
+        task.cancel()
+
+@app.on_event("shutdown")
+async def stop_context_cache_sweeper():
+    """Stop the context cache sweeper"""
+    if context_cache_sweep_task is not None:
+        context_cache_sweep_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_health_prober():
+    """Stop background provider probing"""
+    if health_probe_task is not None:
+        health_probe_task.cancel()
+
+@app.on_event("shutdown")
+async def shutdown_audio_process_pool():
+    """Stop audio preprocessing workers with the server"""
+    if audio_process_pool is not None:
+        audio_process_pool.shutdown(wait=False, cancel_futures=True)
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    """Close pooled outbound connections with the server"""
+    if http_client is not None:
+        await http_client.aclose()
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[tuple]:
+    """Parse a single 'bytes=start-end' range; returns (start, end) inclusive or None"""
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    start_text, _, end_text = range_header[6:].split(",")[0].strip().partition("-")
+    try:
+        if start_text == "":
+            start, end = max(size - int(end_text), 0), size - 1
+        else:
+            start = int(start_text)
+            end = min(int(end_text), size - 1) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+async def read_audio_file(path: str, start: int, length: int):
+    """Yield a byte range of a completed cache file"""
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(AUDIO_PROXY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            audio_proxy_metrics["bytes_served"] += len(chunk)
+            yield chunk
+
+async def follow_audio_download(entry: Dict[str, Any]):
+    """Yield a cache file while it is still being downloaded, following it to the end"""
+    condition = entry["condition"]
+    position = 0
+    async with aiofiles.open(entry["path"], "rb") as f:
+        while True:
+            chunk = await f.read(AUDIO_PROXY_CHUNK_SIZE)
+            if chunk:
+                position += len(chunk)
+                audio_proxy_metrics["bytes_served"] += len(chunk)
+                yield chunk
+                continue
+            if entry["complete"] or entry.get("error"):
+                return
+            async with condition:
+                await condition.wait_for(
+                    lambda: entry["complete"] or entry.get("error") or entry["size"] > position
+                )
+
 # API Endpoints with comprehensive error handling
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Home page with error handling"""
     try:
-        logger.info("Home endpoint accessed")
-        logger.info(f"Looking for template: index.html in {TEMPLATES_DIR}")
-        return templates.TemplateResponse("index.html", {"request": request})
+        if not index_page:
+            render_index_page()
+        # Revalidated on every load so a restart with new asset hashes is picked up
+        return serve_precompressed(request, index_page, "no-cache")
     except Exception as e:
-        logger.error(f"Error rendering home page: {str(e)}")
+        logger.error("Error rendering home page: %s", e)
         return HTMLResponse(
             content=f"<h1>Voice Agent Day 12</h1><p>Error loading page: {str(e)}</p>",
             status_code=500
         )
 
+@app.get("/assets/{name:path}")
+async def serve_asset(request: Request, name: str):
+    """Fingerprinted static asset, precompressed and cacheable forever"""
+    entry = static_assets.get(name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return serve_precompressed(request, entry, ASSET_CACHE_CONTROL)
+
 @app.get("/health")
 async def health_check():
-    """Comprehensive health check endpoint"""
+    """Health snapshot precomputed by the background prober and passive updates"""
+    # Sessions come and go between refreshes, so the count is the one live field
+    body = current_health_snapshot()["body_prefix"] + b"%d}" % len(chat_sessions)
+    return Response(content=body, media_type="application/json")
+
+def provider_clients_ready() -> bool:
+    """Whether the clients provider calls actually go through are usable"""
+    if ASYNC_PROVIDER_CLIENTS:
+        configured = all(all(api.headers.values()) for api in (assemblyai_client, gemini_client, murf_client))
+        return configured and not (http_client is not None and http_client.is_closed)
+    return client is not None and transcriber is not None and gemini_model is not None
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness for load balancers: clients initialised, first probe round done, not unhealthy"""
+    snapshot = current_health_snapshot()
+    clients_ready = provider_clients_ready()
+    probed = not HEALTH_PROBE_ENABLED or snapshot["probe_rounds"] > 0
+    ready = clients_ready and probed and snapshot["status"] != "unhealthy"
+    return Response(
+        content=json.dumps({"ready": ready, "status": snapshot["status"]}),
+        status_code=200 if ready else 503,
+        media_type="application/json"
+    )
+
+# Gapless assembly: the segments of one reply are synthesised separately and streamed back
+# as a single response, in order, each as soon as it is ready. Nothing is re-encoded; only
+# container headers are touched (the first WAV header is opened up for an unknown length,
+# and the headers of later segments are dropped so their samples follow on directly).
+audio_assemblies: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+audio_assembly_metrics = {"assemblies": 0, "streams": 0, "segments_streamed": 0, "segment_failures": 0, "expired": 0}
+
+class AudioConcatenator:
+    """Joins separately encoded segments of one voice into one byte stream"""
+    
+    def __init__(self):
+        self.index = -1
+        self.pending = b""
+        self.in_body = False
+    
+    def start_segment(self) -> None:
+        self.index += 1
+        self.pending = b""
+        self.in_body = False
+    
+    def feed(self, data: bytes) -> bytes:
+        if self.in_body:
+            return data
+        self.pending += data
+        body = self.strip_header(self.pending)
+        if body is None and len(self.pending) < 64 * 1024:
+            return b""  # need more bytes to find the end of the header
+        self.in_body = True
+        data, self.pending = self.pending if body is None else body, b""
+        return data
+    
+    def end_segment(self) -> bytes:
+        # A segment shorter than its own header is passed on as is
+        data, self.pending = self.pending, b""
+        return data
+    
+    def strip_header(self, data: bytes) -> Optional[bytes]:
+        if data[:4] == b"RIFF":
+            position = 12
+            while position + 8 <= len(data):
+                chunk_id, size = data[position:position + 4], struct.unpack("<I", data[position + 4:position + 8])[0]
+                if chunk_id == b"data":
+                    header_end = position + 8
+                    if self.index > 0:
+                        return data[header_end:]
+                    # Total length is unknown while later segments are still being synthesised
+                    header = bytearray(data[:header_end])
+                    header[4:8] = struct.pack("<I", 0xFFFFFFFF)
+                    header[header_end - 4:header_end] = struct.pack("<I", 0xFFFFFFFF)
+                    return bytes(header) + data[header_end:]
+                position += 8 + size + (size & 1)
+            return None
+        if data[:3] == b"ID3":
+            if len(data) < 10:
+                return None
+            # ID3v2 size is syncsafe (7 bits per byte), plus the footer when flagged
+            size = 10 + sum((byte & 0x7F) << shift for byte, shift in zip(data[6:10], (21, 14, 7, 0)))
+            size += 10 if data[5] & 0x10 else 0
+            if len(data) < size:
+                return None
+            return data if self.index == 0 else data[size:]
+        return data
+
+def sniff_audio_type(data: bytes, default: str) -> str:
+    if data[:4] == b"RIFF":
+        return "audio/wav"
+    if data[:3] == b"ID3" or data[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    if data[:4] == b"OggS":
+        return "audio/ogg"
+    return default
+
+def create_audio_assembly(segments: List[asyncio.Task]) -> Dict[str, Any]:
+    now = time.time()
+    while audio_assemblies and (len(audio_assemblies) >= AUDIO_ASSEMBLY_MAX or
+                                next(iter(audio_assemblies.values()))["created_at"] + AUDIO_ASSEMBLY_TTL_SECONDS <= now):
+        audio_assemblies.popitem(last=False)
+        audio_assembly_metrics["expired"] += 1
+    for task in segments:
+        # Retrieve failures here so a segment nobody streams is not reported as unhandled
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+    assembly = {"assembly_id": uuid.uuid4().hex, "segments": segments, "created_at": now}
+    audio_assemblies[assembly["assembly_id"]] = assembly
+    audio_assembly_metrics["assemblies"] += 1
+    return assembly
+
+async def open_segment_audio(segment: asyncio.Task) -> tuple:
+    """Wait for a segment's synthesis; returns (content type, async byte iterator) over its audio"""
+    result = await asyncio.wait_for(asyncio.shield(segment), AUDIO_ASSEMBLY_SEGMENT_TIMEOUT)
+    url = result.get("audio_url")
+    if url and url.startswith("/audio/"):
+        entry = await get_cached_audio(url[len("/audio/"):])
+        if entry is not None:
+            chunks = read_audio_file(entry["path"], 0, entry["size"]) if entry["complete"] else follow_audio_download(entry)
+            return entry["content_type"], chunks
+        url = result.get("source_audio_url")
+    if not url:
+        raise HTTPException(status_code=503, detail=result.get("error") or "Segment has no audio")
+    http = get_http_client()
+    response = await http.send(http.build_request("GET", url), stream=True)
+    if response.is_error:
+        await response.aclose()
+        raise HTTPException(status_code=502, detail=f"Segment audio fetch failed ({response.status_code})")
+    
+    async def chunks():
+        try:
+            async for chunk in response.aiter_bytes(AUDIO_PROXY_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await response.aclose()
+    return response.headers.get("content-type", "audio/wav"), chunks()
+
+async def stream_audio_assembly(assembly: Dict[str, Any], joiner: AudioConcatenator, first: bytes, first_chunks):
+    """The rest of an assembled stream, after the first bytes the endpoint already read"""
+    yield first
+    for index, segment in enumerate(assembly["segments"]):
+        try:
+            if index == 0:
+                chunks = first_chunks
+            else:
+                _, chunks = await open_segment_audio(segment)
+                joiner.start_segment()
+            async for data in chunks:
+                data = joiner.feed(data)
+                if data:
+                    yield data
+            tail = joiner.end_segment()
+            if tail:
+                yield tail
+            audio_assembly_metrics["segments_streamed"] += 1
+        except Exception as e:
+            # Keep going: a missing segment is a skipped sentence, not a dead stream
+            audio_assembly_metrics["segment_failures"] += 1
+            log_error("audio_assembly_error", f"Segment {index} of {assembly['assembly_id']} skipped: {str(e)}")
+
+@app.get("/audio/assembled/{assembly_id}")
+async def serve_assembled_audio(assembly_id: str = Path(..., description="Assembled reply ID")):
+    """One continuous audio stream of a reply's TTS segments, starting as soon as the first is ready"""
+    assembly = audio_assemblies.get(assembly_id)
+    if assembly is None:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+    joiner = AudioConcatenator()
+    joiner.start_segment()
     try:
-        overall_status = "healthy"
-        issues = []
-        
-        for service, health in service_health.items():
-            if health["status"] == "error":
-                overall_status = "degraded"
-                issues.append(f"{service}: {health.get('last_error', 'Unknown error')}")
-        
-        if len(issues) >= 3:
-            overall_status = "unhealthy"
-        
-        return {
-            "status": overall_status,
-            "timestamp": datetime.now().isoformat(),
-            "services": service_health,
-            "issues": issues,
-            "active_sessions": len(chat_sessions)
-        }
+        content_type, chunks = await open_segment_audio(assembly["segments"][0])
+        # Read up to the first audio bytes so the response type is known and playback can start at once
+        first = b""
+        async for data in chunks:
+            first = joiner.feed(data)
+            if first:
+                break
+        first = first or joiner.end_segment()
+    except HTTPException:
+        raise
     except Exception as e:
-        return {
-            "status": "error",
-            "timestamp": datetime.now().isoformat(),
-            "error": str(e)
+        log_error("audio_assembly_error", f"First segment of {assembly_id} failed: {str(e)}")
+        raise HTTPException(status_code=502, detail="Audio is not available")
+    audio_assembly_metrics["streams"] += 1
+    return StreamingResponse(
+        stream_audio_assembly(assembly, joiner, first, chunks),
+        media_type=sniff_audio_type(first, content_type),
+        headers={"Cache-Control": "no-store"}
+    )
+
+@app.get("/audio/{audio_id}")
+async def serve_cached_audio(request: Request, audio_id: str = Path(..., description="Cached audio ID")):
+    """Serve proxied TTS audio with Range, ETag and Cache-Control support"""
+    entry = audio_cache_entries.get(audio_id) or await get_cached_audio(audio_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    if entry.get("error"):
+        # Local copy failed; hand the client the provider URL instead
+        return RedirectResponse(entry["source_url"], status_code=307)
+    
+    etag = f'"{audio_id}"'
+    headers = {"ETag": etag, "Cache-Control": AUDIO_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    range_header = request.headers.get("range")
+    if not entry["complete"]:
+        if not range_header:
+            # Stream bytes to the client as they arrive from the provider
+            return StreamingResponse(follow_audio_download(entry), media_type=entry["content_type"], headers=headers)
+        async with entry["condition"]:
+            await entry["condition"].wait_for(lambda: entry["complete"] or entry.get("error"))
+        if entry.get("error"):
+            return RedirectResponse(entry["source_url"], status_code=307)
+    
+    size = entry["size"]
+    byte_range = parse_range_header(range_header, size)
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(read_audio_file(entry["path"], 0, size), media_type=entry["content_type"], headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        read_audio_file(entry["path"], start, end - start + 1),
+        status_code=206,
+        media_type=entry["content_type"],
+        headers=headers
+    )
+
+@app.post("/webhooks/assemblyai")
+async def assemblyai_webhook(request: Request):
+    """AssemblyAI completion webhook: resumes the coroutine waiting on the transcript"""
+    if request.headers.get("x-webhook-secret") != ASSEMBLYAI_WEBHOOK_SECRET:
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    try:
+        payload = await request.json()
+        transcript_id = payload["transcript_id"]
+    except (ValueError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    
+    try:
+        resumed = await transcription_engine.handle_webhook(transcript_id)
+    except Exception as e:
+        log_error("assemblyai_webhook_error", str(e), additional_info={"transcript_id": transcript_id})
+        raise HTTPException(status_code=502, detail="Error fetching transcript")
+    return {"received": True, "resumed": resumed}
+
+@app.get("/metrics")
+async def metrics():
+    """Performance metrics for provider request handling"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "singleflight": {
+            "enabled": SINGLEFLIGHT_ENABLED,
+            "in_flight": len(inflight_requests),
+            "providers": singleflight_metrics,
+            "calls_saved": sum(stats["coalesced"] for stats in singleflight_metrics.values())
+        },
+        "audio_preprocessing": {
+            "enabled": AUDIO_PREPROCESSING_AVAILABLE,
+            "vad_enabled": VAD_ENABLED,
+            "profiles": STT_PREPROCESSING_PROFILES,
+            **audio_preprocessing_metrics
+        },
+        "provider_clients": {
+            "async_enabled": ASYNC_PROVIDER_CLIENTS,
+            "http2": HTTP2_ENABLED,
+            "pool_limits": {
+                "max_connections": HTTP_POOL_MAX_CONNECTIONS,
+                "max_keepalive_connections": HTTP_POOL_MAX_KEEPALIVE,
+                "keepalive_expiry": HTTP_POOL_KEEPALIVE_EXPIRY
+            },
+            "providers": {
+                name: {**stats, "reused_connections": stats["requests"] - stats["new_connections"]}
+                for name, stats in provider_client_metrics.items()
+            }
+        },
+        "transcription_engine": {
+            "webhooks": bool(ASSEMBLYAI_WEBHOOK_BASE_URL),
+            "pending": len(transcription_engine.pending),
+            "poller_running": transcription_engine.poller_task is not None and not transcription_engine.poller_task.done(),
+            **transcription_engine.metrics
+        },
+        "pipeline": {
+            "backends": PIPELINE_BACKENDS,
+            "stages": {
+                name: {**stats, "avg_ms": round(stats["total_ms"] / stats["runs"], 1) if stats["runs"] else 0.0}
+                for name, stats in pipeline_metrics.items()
+            }
+        },
+        "routing": latency_router.snapshot(),
+        "response_cache": response_cache.snapshot(),
+        "batch_jobs": {
+            "running": sum(1 for job in batch_jobs.values() if job["status"] == "running"),
+            "loaded": len(batch_jobs),
+            "stt_concurrency": BATCH_STT_CONCURRENCY
+        },
+        "pipeline_jobs": pipeline_jobs.snapshot(),
+        "speculation": speculation_engine.snapshot(),
+        "generation_budget": generation_budget.snapshot(),
+        "tts_segmentation": {
+            "mode": TTS_SEGMENTATION,
+            **tts_segmentation_metrics,
+            "voices": {
+                voice_id: {"latency_model": [round(value, 2) for value in model.coefficients()],
+                           "first_segment_chars": first_tts_segment_chars(voice_id)}
+                for voice_id, model in tts_latency_models.items()
+            }
+        },
+        "audio_assembly": {
+            "enabled": AUDIO_ASSEMBLY_ENABLED,
+            "live": len(audio_assemblies),
+            **audio_assembly_metrics
+        },
+        "context_cache": context_cache.snapshot(),
+        "endpointing": {
+            "enabled": ENDPOINTING_ENABLED,
+            **endpointing_metrics
+        },
+        "scheduler": {
+            "enabled": SCHEDULER_ENABLED,
+            "providers": {provider: scheduler.snapshot() for provider, scheduler in provider_schedulers.items()}
+        },
+        "rate_limits": {
+            "enabled": RATE_LIMIT_ENABLED,
+            "providers": PROVIDER_RATE_LIMITS,
+            "scopes": rate_limiter.snapshot()
+        },
+        "audio_proxy": {
+            "enabled": AUDIO_PROXY_ENABLED,
+            "cached_files": len(audio_cache_entries),
+            **audio_proxy_metrics
         }
+    }
 
 @app.get("/agent/chat/{session_id}/history")
 async def get_chat_history(session_id: str = Path(..., description="The session ID")):
@@ -463,6 +4319,7 @@ async def clear_chat_session(session_id: str = Path(..., description="The sessio
     try:
         if session_id in chat_sessions:
             del chat_sessions[session_id]
+            context_cache.drop(session_id, "cleared")
             return {"message": f"Chat session {session_id} cleared successfully"}
         else:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -472,159 +4329,488 @@ async def clear_chat_session(session_id: str = Path(..., description="The sessio
         log_error("chat_clear_error", str(e), session_id)
         raise HTTPException(status_code=500, detail="Error clearing chat session")
 
-@app.post("/agent/chat/{session_id}")
+@app.post("/agent/chat/{session_id}", dependencies=[Depends(enforce_rate_limits)])
 async def agent_chat(
+    request: Request,
     session_id: str = Path(..., description="The session ID for conversation continuity"),
-    audio: UploadFile = File(..., description="Audio file containing user's message"),
+    audio: UploadFile = File(None, description="Audio file containing user's message"),
+    text: str = Form(None, description="Text of the user's message (skips transcription)"),
     voice: str = Form("en-US-natalie", description="Voice ID for TTS response"),
     max_tokens: int = Form(600, description="Maximum tokens for LLM response"),
-    temperature: float = Form(0.7, description="Temperature for LLM response")
+    temperature: float = Form(0.7, description="Temperature for LLM response"),
+    response_cache: bool = Form(True, description="Set false to opt this session out of the response cache"),
+    target_first_audio_ms: int = Form(None, description="Latency goal for the first reply audio; budgets the reply length"),
+    target_total_ms: int = Form(None, description="Latency goal for the whole spoken reply")
 ):
     """
     Conversational AI Chat with Comprehensive Error Handling
+
+    With "Accept: text/event-stream" the turn is streamed as Server-Sent Events
+    (transcript, reply, audio per segment, done) instead of one JSON document.
+    With "Prefer: respond-async" it is queued as a job and answered with 202;
+    the usual response is then fetched from GET /jobs/{job_id}.
     """
     start_time = time.time()
     
     try:
-        logger.info(f"Agent chat started for session: {session_id}")
-        
-        # Step 1: Read and validate audio file
-        try:
-            audio_data = await audio.read()
-            if not audio.content_type or not audio.content_type.startswith('audio/'):
-                raise HTTPException(status_code=400, detail="File must be an audio file")
-        except Exception as e:
-            log_error("audio_read_error", str(e), session_id)
-            raise HTTPException(status_code=400, detail="Error reading audio file")
+        pipeline_logger.info("Agent chat started for session: %s", session_id)
+        if audio is None and not (text and text.strip()):
+            raise HTTPException(status_code=400, detail="Either an audio file or text must be provided")
+        audio_data = await read_audio_upload(audio, session_id) if audio is not None else None
+        if not response_cache:
+            get_or_create_session(session_id)["response_cache_opt_out"] = True
         
-        # Step 2: Transcribe audio with retry logic
-        try:
-            transcription_result = await safe_transcribe_audio(audio_data)
-            user_message = transcription_result["text"]
-            logger.info(f"Transcription successful: {user_message}")
-        except HTTPException as e:
-            # Add error message to session for tracking
-            add_message_to_session(session_id, "system", f"Transcription failed: {e.detail}")
-            
-            # Generate fallback audio response
-            fallback_audio = await safe_generate_audio(
-                FALLBACK_MESSAGES["transcription_error"], 
-                voice
+        ctx = new_pipeline_context(
+            "agent_chat",
+            session_id=session_id,
+            audio_data=audio_data,
+            user_message=text.strip() if audio is None else None,
+            voice_id=voice,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            budget_targets={"first_audio_ms": target_first_audio_ms, "total_ms": target_total_ms}
+        )
+        if "text/event-stream" in request.headers.get("accept", ""):
+            return StreamingResponse(
+                stream_agent_chat(ctx, start_time),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
             )
-            
-            session_data = get_or_create_session(session_id)
-            session_data["error_count"] = session_data.get("error_count", 0) + 1
-            
-            return {
-                "success": False,
-                "error_type": "transcription_error",
-                "fallback_message": FALLBACK_MESSAGES["transcription_error"],
-                "session_id": session_id,
-                "audio_url": fallback_audio.get("audio_url"),
-                "fallback_text": fallback_audio.get("fallback_text"),
-                "chat_history": session_data["messages"],
-                "timestamp": datetime.now().isoformat()
-            }
-        
-        # Step 3: Add user message to session
-        add_message_to_session(session_id, "user", user_message)
-        
-        # Step 4: Format conversation history
-        conversation_context = format_chat_history_for_llm(session_id, user_message)
+        if prefers_async_job(request):
+            async def run_turn():
+                try:
+                    await conversation_pipeline.run(ctx)
+                    return build_agent_chat_response(ctx, start_time)
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    # The job's result is the same fallback response a synchronous turn gets
+                    return await agent_chat_fallback(session_id, voice, e)
+            return accept_pipeline_job("agent_chat", run_turn)
+        await conversation_pipeline.run(ctx)
+        return build_agent_chat_response(ctx, start_time)
         
-        # Step 5: Generate LLM response with retry logic
-        try:
-            llm_result = await safe_generate_llm_response(
-                conversation_context, max_tokens, temperature
+    except HTTPException:
+        raise
+    except Exception as e:
+        return await agent_chat_fallback(session_id, voice, e)
+
+async def agent_chat_fallback(session_id: str, voice: str, error: Exception) -> Dict[str, Any]:
+    """Comprehensive error fallback for an agent chat turn: a spoken apology instead of an error"""
+    error_msg = f"Unexpected error in agent chat: {str(error)}"
+    logger.error(error_msg)
+    log_error("agent_chat_error", error_msg, session_id)
+    
+    # Try to generate fallback audio
+    try:
+        fallback_audio = await safe_generate_audio(
+            FALLBACK_MESSAGES["general_error"], 
+            voice
+        )
+    except:
+        fallback_audio = {"audio_url": None, "fallback_text": FALLBACK_MESSAGES["general_error"]}
+    
+    session_data = get_or_create_session(session_id)
+    session_data["error_count"] = session_data.get("error_count", 0) + 1
+    
+    return {
+        "success": False,
+        "error_type": "general_error",
+        "fallback_message": FALLBACK_MESSAGES["general_error"],
+        "session_id": session_id,
+        "audio_url": fallback_audio.get("audio_url"),
+        "fallback_text": fallback_audio.get("fallback_text"),
+        "chat_history": session_data["messages"],
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.websocket("/agent/stream/{session_id}")
+async def agent_stream(websocket: WebSocket, session_id: str):
+    """
+    Streaming conversation: binary PCM16 mono 16 kHz frames in, JSON events out
+    (speech_start, partial, endpoint, transcript, reply, audio per segment, done, error).
+    Utterances are closed by server-side endpointing; control messages are
+    {"type": "config", "voice", "max_tokens", "temperature", "target_first_audio_ms", "target_total_ms"}
+    and {"type": "end_utterance"}.
+    """
+    await websocket.accept()
+    settings = {"voice": "en-US-natalie", "max_tokens": 600, "temperature": 0.7,
+                "target_first_audio_ms": None, "target_total_ms": None}
+    outgoing: asyncio.Queue = asyncio.Queue()
+    emit = lambda event, data: outgoing.put_nowait({"type": event, **data})
+    state = {"turn": speculation_engine.new_turn(session_id, settings)}
+    
+    endpointer = Endpointer(endpointing_profile(session_id)) if ENDPOINTING_ENABLED else None
+    # With server-side endpointing AssemblyAI's own end-of-utterance detection is only a backstop
+    stt = RealtimeSTTSession(
+        asyncio.get_running_loop(),
+        ENDPOINT_MAX_SILENCE_MS + 500 if endpointer else STREAM_END_UTTERANCE_SILENCE_MS
+    )
+    try:
+        await stt.connect()
+    except Exception as e:
+        log_error("transcription_error", f"Real-time transcription unavailable: {str(e)}", session_id)
+        await websocket.send_json({"type": "error", "error_type": "transcription_error",
+                                   "fallback_message": FALLBACK_MESSAGES["transcription_error"]})
+        await websocket.close(code=1011)
+        return
+    
+    async def send_events():
+        while True:
+            await websocket.send_json(await outgoing.get())
+    
+    async def receive_audio():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                await stt.send(message["bytes"])
+                for event in (endpointer.feed(message["bytes"]) if endpointer else ()):
+                    if event == "end_likely":
+                        speculation_engine.end_likely(state["turn"])
+                    elif event == "endpoint":
+                        # Close the utterance now; the final transcript starts the turn
+                        await stt.force_end_utterance()
+                        emit("endpoint", {"silence_ms": endpointer.profile["silence_ms"]})
+                    else:
+                        emit(event, {})
+            elif message.get("text"):
+                control = json.loads(message["text"])
+                if control.get("type") == "config":
+                    settings.update({key: control[key] for key in settings if key in control})
+                elif control.get("type") == "end_utterance":
+                    await stt.force_end_utterance()
+    
+    async def run_turns():
+        while True:
+            kind, text = await stt.events.get()
+            if kind == "error":
+                log_error("transcription_error", f"Real-time transcription error: {text}", session_id)
+                emit("error", {"error_type": "transcription_error", "fallback_message": FALLBACK_MESSAGES["transcription_error"]})
+            elif kind == "partial":
+                emit("partial", {"text": text})
+                speculation_engine.on_partial(state["turn"], text)
+            elif text.strip():
+                speculation = speculation_engine.resolve(state["turn"], text)
+                await run_stream_turn(session_id, text, settings, speculation, emit)
+                state["turn"] = speculation_engine.new_turn(session_id, settings)
+    
+    tasks = [asyncio.create_task(worker()) for worker in (send_events, receive_audio, run_turns)]
+    try:
+        # receive_audio returns when the client disconnects; the others only end on errors
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning("Agent stream for session %s ended: %s", session_id, task.exception())
+    finally:
+        for task in tasks:
+            task.cancel()
+        speculation_engine.close(state["turn"])
+        await stt.close()
+
+@app.post("/llm/query", dependencies=[Depends(enforce_rate_limits)])
+async def llm_query(
+    request: Request,
+    file: UploadFile = File(None),
+    voice_id: str = Form("en-US-natalie"),
+    max_tokens: int = Form(1000),
+    temperature: float = Form(0.7)
+):
+    """LLM query with a JSON body (LLMQuery) or a multipart audio upload; audio input gets a spoken
+    (possibly chunked) reply. With "Prefer: respond-async" the query runs as a job fetched from
+    GET /jobs/{job_id}."""
+    try:
+        if file is not None:
+            audio_data = await read_audio_upload(file)
+            ctx = new_pipeline_context(
+                "llm_query", audio_data=audio_data, voice_id=voice_id,
+                max_tokens=max_tokens, temperature=temperature
             )
-            ai_response = llm_result["text"]
-            logger.info(f"LLM response generated: {len(ai_response)} characters")
-        except HTTPException as e:
-            # Add error to session and generate fallback
-            add_message_to_session(session_id, "system", f"LLM failed: {e.detail}")
-            ai_response = FALLBACK_MESSAGES["llm_error"]
-            
-            fallback_audio = await safe_generate_audio(ai_response, voice)
-            
-            session_data = get_or_create_session(session_id)
-            session_data["error_count"] = session_data.get("error_count", 0) + 1
-            
-            return {
-                "success": False,
-                "error_type": "llm_error",
-                "fallback_message": ai_response,
-                "session_id": session_id,
-                "user_message": user_message,
-                "ai_response": ai_response,
-                "audio_url": fallback_audio.get("audio_url"),
-                "fallback_text": fallback_audio.get("fallback_text"),
-                "chat_history": session_data["messages"],
-                "timestamp": datetime.now().isoformat()
-            }
-        
-        # Step 6: Add AI response to session
-        add_message_to_session(session_id, "assistant", ai_response)
-        
-        # Step 7: Convert AI response to audio (with fallback)
-        logger.info("Converting AI response to audio...")
-        audio_result = await safe_generate_audio(ai_response, voice)
+            pipeline = voice_query_pipeline
+        else:
+            # The form parameters make FastAPI read the body as a form, so a JSON query is parsed here
+            if not request.headers.get("content-type", "").startswith("application/json"):
+                raise HTTPException(status_code=400, detail="Either text query or audio file must be provided")
+            try:
+                data = LLMQuery(**await request.json())
+            except (ValueError, TypeError) as e:
+                raise HTTPException(status_code=422, detail=f"Invalid query body: {str(e)}")
+            if not data.query or data.query.strip() == "":
+                raise HTTPException(status_code=400, detail="Query text cannot be empty")
+            ctx = new_pipeline_context(
+                "llm_query", user_message=data.query,
+                max_tokens=data.max_tokens, temperature=data.temperature, use_cache=data.use_cache
+            )
+            pipeline = text_query_pipeline
         
-        # Get updated session data
-        session_data = get_or_create_session(session_id)
-        total_time = (time.time() - start_time) * 1000
+        async def run_query():
+            await pipeline.run(ctx)
+            response_text = ctx["ai_response"]
+            response_data = {
+                "success": True,
+                "message": "LLM response generated successfully",
+                "query": ctx["user_message"],
+                "response": response_text,
+                "model": ctx["llm"].get("model", GEMINI_MODEL),
+                "max_tokens": ctx["max_tokens"],
+                "temperature": ctx["temperature"],
+                "response_length": len(response_text),
+                "word_count": len(response_text.split()),
+                "stage_timings": ctx["timings"],
+                "response_cache": ctx.get("response_cache"),
+                "generated_at": datetime.now().isoformat()
+            }
+            if file is not None:
+                audio_urls = ctx.get("audio_urls") or [ctx["audio_result"].get("audio_url")]
+                response_data.update({
+                    "message": "Voice-to-voice LLM conversation completed successfully",
+                    "voice_id": voice_id,
+                    "is_chunked": len(audio_urls) > 1,
+                    "chunk_count": len(audio_urls),
+                    "original_filename": file.filename
+                })
+                if len(audio_urls) > 1:
+                    response_data["audio_urls"] = audio_urls
+                else:
+                    response_data["audio_url"] = audio_urls[0]
+                    response_data["fallback_text"] = ctx["audio_result"].get("fallback_text")
+                if ctx.get("assembled_segments"):
+                    response_data["assembled_segments"] = ctx["assembled_segments"]
+            return response_data
         
-        # Prepare response
-        response_data = {
+        if prefers_async_job(request):
+            return accept_pipeline_job("llm_query", run_query)
+        return await run_query()
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error("llm_query_error", str(e))
+        raise HTTPException(status_code=500, detail=f"LLM Query failed: {str(e)}")
+
+@app.post("/transcribe/file", dependencies=[Depends(enforce_rate_limits)])
+async def transcribe_file(file: UploadFile = File(...)):
+    """Transcribe one uploaded audio file"""
+    try:
+        ctx = new_pipeline_context("transcribe_file", audio_data=await read_audio_upload(file))
+        await transcription_pipeline.run(ctx)
+        transcript_text = ctx["user_message"]
+        return {
             "success": True,
-            "session_id": session_id,
-            "user_message": user_message,
-            "ai_response": ai_response,
-            "voice_id": voice,
-            "generated_at": datetime.now().isoformat(),
-            "total_processing_time": total_time,
-            "chat_history": session_data["messages"]
+            "message": "Audio transcribed successfully",
+            "transcript": transcript_text,
+            "confidence": ctx["transcription"]["confidence"],
+            "word_count": len(transcript_text.split()),
+            "stage_timings": ctx["timings"],
+            "transcription_time": datetime.now().isoformat(),
+            "original_filename": file.filename
         }
-        
-        # Add audio or fallback text
-        if audio_result.get("audio_url"):
-            response_data["audio_url"] = audio_result["audio_url"]
-        else:
-            response_data["fallback_text"] = audio_result.get("fallback_text", ai_response)
-            response_data["tts_error"] = audio_result.get("error")
-            response_data["fallback_message"] = audio_result.get("fallback_message")
-        
-        return response_data
-        
     except HTTPException:
         raise
     except Exception as e:
-        # Comprehensive error fallback
-        error_msg = f"Unexpected error in agent chat: {str(e)}"
-        logger.error(error_msg)
-        log_error("agent_chat_error", error_msg, session_id)
-        
-        # Try to generate fallback audio
+        log_error("transcription_error", str(e))
+        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+
+@app.post("/transcribe/batch", dependencies=[Depends(enforce_rate_limits)])
+async def transcribe_batch(
+    files: List[UploadFile] = File(None, description="Audio files to transcribe"),
+    manifest: str = Form(None, description="JSON list of audio URLs or paths in the uploads directory")
+):
+    """Batch transcription: fans out to the STT stage with bounded concurrency and streams NDJSON results"""
+    files = files or []
+    manifest_items = []
+    if manifest:
         try:
-            fallback_audio = await safe_generate_audio(
-                FALLBACK_MESSAGES["general_error"], 
-                voice
-            )
-        except:
-            fallback_audio = {"audio_url": None, "fallback_text": FALLBACK_MESSAGES["general_error"]}
-        
-        session_data = get_or_create_session(session_id)
-        session_data["error_count"] = session_data.get("error_count", 0) + 1
-        
+            entries = json.loads(manifest)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Manifest must be a JSON list")
+        if not isinstance(entries, list):
+            raise HTTPException(status_code=400, detail="Manifest must be a JSON list")
+        manifest_items = [resolve_manifest_item(len(files) + i, entry) for i, entry in enumerate(entries)]
+    
+    if not files and not manifest_items:
+        raise HTTPException(status_code=400, detail="Provide audio files or a manifest")
+    if len(files) + len(manifest_items) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"A batch is limited to {BATCH_MAX_FILES} files")
+    
+    # Only a valid request gets a job directory
+    items = []
+    job_id = uuid.uuid4().hex
+    os.makedirs(os.path.join(BATCH_JOBS_DIR, job_id))
+    for index, upload in enumerate(files):
+        filename = os.path.basename(upload.filename or f"file_{index}")
+        path = batch_job_path(job_id, f"{index}_{filename}")
+        async with aiofiles.open(path, "wb") as f:
+            await f.write(await upload.read())
+        items.append({"id": str(index), "path": path, "filename": filename})
+    items.extend(manifest_items)
+    
+    job = {
+        "job_id": job_id,
+        "kind": "transcription",
+        "status": "pending",
+        "created_at": datetime.now().isoformat(),
+        "items": items,
+        "results": [],
+        "condition": asyncio.Condition()
+    }
+    batch_jobs[job_id] = job
+    start_batch_job(job, run_batch_transcription)
+    logger.info("Started batch transcription job %s with %d files", job_id, len(items))
+    return StreamingResponse(stream_batch_results(job), media_type="application/x-ndjson")
+
+@app.get("/transcribe/batch/{job_id}")
+async def resume_transcribe_batch(
+    job_id: str = Path(..., description="Batch job ID"),
+    offset: int = 0
+):
+    """Resume a batch job's NDJSON stream from `offset` results, restarting the job if it was interrupted"""
+    job = load_batch_job(job_id)
+    if job is None or job["kind"] != "transcription":
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    start_batch_job(job, run_batch_transcription)
+    return StreamingResponse(stream_batch_results(job, max(offset, 0)), media_type="application/x-ndjson")
+
+@app.get("/jobs/{job_id}")
+async def get_pipeline_job(
+    job_id: str = Path(..., description="Job ID returned by an asynchronous submit"),
+    wait: float = 0
+):
+    """Job status and result; `wait` long-polls up to PIPELINE_JOB_MAX_WAIT seconds for the job to finish"""
+    job = pipeline_jobs.get(job_id)
+    if wait > 0 and job["finished_at"] is None:
+        await pipeline_jobs.wait(job, min(wait, PIPELINE_JOB_MAX_WAIT))
+    return pipeline_jobs.view(job)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_pipeline_job(job_id: str = Path(..., description="Job ID")):
+    """Cancel a queued or running job"""
+    job = pipeline_jobs.get(job_id)
+    pipeline_jobs.cancel(job)
+    return pipeline_jobs.view(job)
+
+@app.post("/tts/echo", dependencies=[Depends(enforce_rate_limits)])
+async def tts_echo(file: UploadFile = File(...), voice_id: str = "en-US-natalie"):
+    """Echo Bot: transcribe audio and speak it back with a Murf voice"""
+    try:
+        ctx = new_pipeline_context("tts_echo", audio_data=await read_audio_upload(file), voice_id=voice_id)
+        await echo_pipeline.run(ctx)
+        audio_result = ctx.get("audio_result") or {}
         return {
-            "success": False,
-            "error_type": "general_error",
-            "fallback_message": FALLBACK_MESSAGES["general_error"],
-            "session_id": session_id,
-            "audio_url": fallback_audio.get("audio_url"),
-            "fallback_text": fallback_audio.get("fallback_text"),
-            "chat_history": session_data["messages"],
-            "timestamp": datetime.now().isoformat()
+            "success": True,
+            "message": "Audio echoed successfully with AI voice",
+            "original_transcript": ctx["user_message"],
+            "echo_audio_url": audio_result.get("audio_url"),
+            "fallback_text": audio_result.get("fallback_text"),
+            "voice_id": voice_id,
+            "confidence": ctx["transcription"]["confidence"],
+            "word_count": len(ctx["user_message"].split()),
+            "stage_timings": ctx["timings"],
+            "processing_time": datetime.now().isoformat(),
+            "original_filename": file.filename
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error("tts_echo_error", str(e))
+        raise HTTPException(status_code=500, detail=f"TTS Echo failed: {str(e)}")
+
+async def synthesize_text(data: TextInput) -> Dict[str, Any]:
+    """Shared body of /tts and /generate-audio"""
+    if not data.text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    
+    ctx = new_pipeline_context("tts", text=data.text, voice_id=data.voice_id)
+    await speech_pipeline.run(ctx)
+    audio_result = ctx["audio_result"]
+    
+    if ctx.get("audio_urls") and len(ctx["audio_urls"]) > 1:
+        return {"audio_url": ctx["audio_urls"][0], "audio_urls": ctx["audio_urls"], "is_chunked": True}
+    if audio_result.get("assembled"):
+        return {"audio_url": audio_result["audio_url"], "assembled_segments": ctx["assembled_segments"]}
+    if audio_result.get("audio_url"):
+        return {"audio_url": audio_result["audio_url"]}
+    return {
+        "audio_url": None,
+        "fallback_text": audio_result.get("fallback_text"),
+        "error": audio_result.get("error"),
+        "fallback_message": FALLBACK_MESSAGES["tts_error"]
+    }
+
+@app.post("/tts", dependencies=[Depends(enforce_rate_limits)])
+async def text_to_speech(data: TextInput):
+    """Text-to-speech with error handling"""
+    try:
+        return await synthesize_text(data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error("tts_error", str(e))
+        raise HTTPException(status_code=500, detail=FALLBACK_MESSAGES["tts_error"])
+
+@app.post("/tts/bulk", dependencies=[Depends(enforce_rate_limits)])
+async def bulk_text_to_speech(data: BulkTTSRequest):
+    """Bulk TTS job: dedupes (text, voice_id) pairs against the TTS cache and renders the rest"""
+    if not data.items:
+        raise HTTPException(status_code=400, detail="Items cannot be empty")
+    if len(data.items) > BULK_TTS_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A bulk job is limited to {BULK_TTS_MAX_ITEMS} items")
+    
+    items = []
+    for index, item in enumerate(data.items):
+        if not item.text.strip():
+            raise HTTPException(status_code=400, detail=f"Item {item.id or index}: text cannot be empty")
+        items.append({
+            "id": item.id or str(index),
+            "text": item.text,
+            "voice_id": item.voice_id,
+            "audio_id": audio_cache_id(item.text, item.voice_id)
+        })
+    job_id = uuid.uuid4().hex
+    os.makedirs(os.path.join(BATCH_JOBS_DIR, job_id))
+    
+    job = {
+        "job_id": job_id,
+        "kind": "tts",
+        "status": "pending",
+        "created_at": datetime.now().isoformat(),
+        "items": items,
+        "results": [],
+        "condition": asyncio.Condition()
+    }
+    batch_jobs[job_id] = job
+    start_batch_job(job, run_bulk_tts)
+    logger.info("Started bulk TTS job %s with %d items", job_id, len(items))
+    return bulk_tts_progress(job)
+
+@app.get("/tts/bulk/{job_id}")
+async def bulk_text_to_speech_progress(job_id: str = Path(..., description="Bulk TTS job ID")):
+    """Bulk TTS progress; resumes the job if it was interrupted"""
+    job = load_batch_job(job_id)
+    if job is None or job["kind"] != "tts":
+        raise HTTPException(status_code=404, detail="Bulk TTS job not found")
+    start_batch_job(job, run_bulk_tts)
+    return bulk_tts_progress(job)
+
+@app.get("/tts/bulk/{job_id}/stream")
+async def bulk_text_to_speech_stream(job_id: str = Path(..., description="Bulk TTS job ID"), offset: int = 0):
+    """Per-item bulk TTS results as NDJSON, following the job until it finishes"""
+    job = load_batch_job(job_id)
+    if job is None or job["kind"] != "tts":
+        raise HTTPException(status_code=404, detail="Bulk TTS job not found")
+    start_batch_job(job, run_bulk_tts)
+    return StreamingResponse(stream_batch_results(job, max(offset, 0)), media_type="application/x-ndjson")
+
+@app.post("/generate-audio", dependencies=[Depends(enforce_rate_limits)])
+async def generate_audio(data: TextInput):
+    """Text-to-speech under the route name used since day 3"""
+    try:
+        return await synthesize_text(data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error("tts_error", str(e))
+        raise HTTPException(status_code=500, detail=FALLBACK_MESSAGES["tts_error"])
 
 if __name__ == "__main__":
     import uvicorn
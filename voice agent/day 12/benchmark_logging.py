@@ -0,0 +1,100 @@
+"""
+Measure the logging cost one conversation turn adds to the request path.
+
+Replays the log calls of a typical agent_chat turn (session lookups, provider
+attempts, stage results, one error record) through four configurations:
+the previous synchronous f-string logging, lazy logging with sampling written
+synchronously, and the same behind the queue handler as text and as JSON.
+Output goes to a real file so write cost is included.
+
+    python benchmark_logging.py --turns 2000
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+
+
+def legacy_turn(logger, error_logger, session_id, content):
+    # The per-turn calls as they were before structured logging
+    logger.info(f"Agent chat started for session: {session_id}")
+    for _ in range(4):
+        logger.info(f"Retrieved existing chat session: {session_id} with {12} messages")
+    logger.info(f"Transcription attempt {1}/{3}")
+    logger.info(f"Transcription successful: {content}")
+    logger.info(f"Added user message to session {session_id}: {content[:100]}{'...' if len(content) > 100 else ''}")
+    logger.info(f"Formatted conversation context ({len(content) * 12} chars)")
+    logger.info(f"LLM generation attempt {1}/{3}")
+    logger.info(f"LLM response generated: {len(content)} characters")
+    logger.info(f"Added assistant message to session {session_id}: {content[:100]}{'...' if len(content) > 100 else ''}")
+    logger.info(f"TTS generation attempt {1}/{3}")
+    error_context = {"error_type": "tts_error", "error_message": "timeout", "session_id": session_id,
+                     "timestamp": datetime.now().isoformat(), "additional_info": {}}
+    error_logger.error(f"Error occurred: {json.dumps(error_context, indent=2)}")
+
+
+def structured_turn(app_module, session_id, content):
+    # The same turn through the category loggers with lazy arguments
+    token = app_module.log_context.set({"endpoint": "agent_chat", "session_id": session_id, "turn_id": "benchmark"})
+    app_module.pipeline_logger.info("Agent chat started for session: %s", session_id)
+    for _ in range(4):
+        app_module.session_logger.debug("Retrieved existing chat session: %s with %d messages", session_id, 12)
+    app_module.provider_logger.info("Transcription attempt %d/%d", 1, 3)
+    app_module.pipeline_logger.info("Transcription successful (%d chars)", len(content))
+    app_module.session_logger.info("Added %s message to session %s (%d chars)", "user", session_id, len(content))
+    app_module.session_logger.info("Formatted conversation context (%d chars)", len(content) * 12)
+    app_module.provider_logger.info("LLM generation attempt %d/%d", 1, 3)
+    app_module.pipeline_logger.info("LLM response generated: %d characters", len(content))
+    app_module.session_logger.info("Added %s message to session %s (%d chars)", "assistant", session_id, len(content))
+    app_module.provider_logger.info("TTS generation attempt %d/%d", 1, 3)
+    app_module.log_error("tts_error", "timeout", session_id)
+    app_module.log_context.reset(token)
+
+
+def measure(turn, turns):
+    start_time = time.perf_counter()
+    for _ in range(turns):
+        turn()
+    return (time.perf_counter() - start_time) / turns * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ["HEALTH_PROBE_ENABLED"] = "false"
+    import app as app_module
+
+    session_id = "benchmark-session"
+    content = "Could you tell me what the weather is going to be like in Bangalore tomorrow afternoon? " * 2
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, log_format, use_queue in (
+            ("previous (sync, f-strings)", "text", False),
+            ("lazy + sampling, sync text", "text", False),
+            ("lazy + sampling, queued text", "text", True),
+            ("lazy + sampling, queued json", "json", True),
+        ):
+            with open(os.path.join(directory, "log.txt"), "w") as stream:
+                app_module.configure_logging(log_format, use_queue, stream)
+                if name.startswith("previous"):
+                    stream_handler = logging.getLogger().handlers[0]
+                    stream_handler.setFormatter(logging.Formatter(app_module.TEXT_LOG_FORMAT))
+                    turn = lambda: legacy_turn(app_module.logger, app_module.error_logger, session_id, content)
+                else:
+                    turn = lambda: structured_turn(app_module, session_id, content)
+                results[name] = measure(turn, args.turns)
+                app_module.stop_logging()
+
+    baseline = results["previous (sync, f-strings)"]
+    print(f"{'configuration':32} {'us/turn':>9} {'vs previous':>12}")
+    for name, cost in results.items():
+        print(f"{name:32} {cost:>9.1f} {cost / baseline:>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
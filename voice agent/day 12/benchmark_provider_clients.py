@@ -0,0 +1,79 @@
+"""
+Measure the per-turn connection and polling overhead removed by the pooled
+async provider clients, compared with opening a fresh connection per call.
+
+Run against the local stand-ins (or the real APIs by omitting --base-url):
+    python standin_providers.py --port 8100 &
+    python benchmark_provider_clients.py --base-url http://127.0.0.1:8100 --turns 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def configure(base_url: str) -> None:
+    if base_url:
+        for name in ("ASSEMBLYAI_BASE_URL", "GEMINI_BASE_URL", "MURF_BASE_URL"):
+            os.environ[name] = base_url
+    os.environ["ASYNC_PROVIDER_CLIENTS"] = "true"
+    os.environ["HEALTH_PROBE_ENABLED"] = "false"
+
+
+async def run_turn(app_module, audio_data: bytes) -> float:
+    start_time = time.perf_counter()
+    transcript = await app_module.assemblyai_client.transcribe(audio_data)
+    reply = await app_module.gemini_client.generate(transcript.get("text") or "Hello")
+    await app_module.murf_client.generate(reply["text"] or "Hello", "en-US-natalie")
+    return (time.perf_counter() - start_time) * 1000
+
+
+async def benchmark(app_module, turns: int, pooled: bool) -> dict:
+    audio_data = b"\x00" * 32000
+    latencies = []
+    for name in app_module.provider_client_metrics:
+        app_module.provider_client_metrics[name].update(
+            {"requests": 0, "new_connections": 0, "connect_ms": 0.0, "tls_ms": 0.0, "poll_requests": 0, "poll_wait_ms": 0.0}
+        )
+    for _ in range(turns):
+        if not pooled and app_module.http_client is not None:
+            # Drop the pool so every turn pays connection setup again
+            await app_module.http_client.aclose()
+            app_module.http_client = None
+        latencies.append(await run_turn(app_module, audio_data))
+
+    totals = {key: sum(stats[key] for stats in app_module.provider_client_metrics.values())
+              for key in ("requests", "new_connections", "connect_ms", "tls_ms", "poll_requests", "poll_wait_ms")}
+    return {
+        "median_turn_ms": statistics.median(latencies),
+        "handshake_ms_per_turn": (totals["connect_ms"] + totals["tls_ms"]) / turns,
+        "new_connections_per_turn": totals["new_connections"] / turns,
+        "polls_per_turn": totals["poll_requests"] / turns,
+        "poll_wait_ms_per_turn": totals["poll_wait_ms"] / turns,
+    }
+
+
+async def main_async(args) -> None:
+    configure(args.base_url)
+    import app as app_module
+
+    cold = await benchmark(app_module, args.turns, pooled=False)
+    warm = await benchmark(app_module, args.turns, pooled=True)
+    print(f"{'metric':28} {'fresh connections':>18} {'shared pool':>12}")
+    for key in cold:
+        print(f"{key:28} {cold[key]:>18.1f} {warm[key]:>12.1f}")
+    print(f"\nHandshake overhead removed per turn: {cold['handshake_ms_per_turn'] - warm['handshake_ms_per_turn']:.1f} ms")
+    if app_module.http_client is not None:
+        await app_module.http_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="", help="Provider base URL (e.g. the local stand-ins)")
+    parser.add_argument("--turns", type=int, default=10)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark upload size and end-to-end STT latency with and without the
+pre-STT preprocessing stages (silence trimming, mono 16 kHz Opus transcode).
+
+Usage:
+    python benchmark_stt_preprocessing.py recording1.webm recording2.webm [--runs 3]
+"""
+import argparse
+import statistics
+import time
+
+import assemblyai as aai
+
+from app import ASSEMBLYAI_API_KEY, AUDIO_PREPROCESSING_AVAILABLE, run_audio_preprocessing
+
+PROFILES = {
+    "original": (),
+    "trim": ("trim",),
+    "trim+transcode": ("trim", "transcode"),
+}
+
+
+def benchmark_file(path: str, runs: int) -> list:
+    with open(path, "rb") as f:
+        original_audio = f.read()
+
+    transcriber = aai.Transcriber()
+    rows = []
+    for profile, stages in PROFILES.items():
+        start_time = time.time()
+        audio_data, _ = run_audio_preprocessing(original_audio, stages) if stages else (original_audio, None)
+        preprocessing_ms = (time.time() - start_time) * 1000
+        if audio_data is None:
+            rows.append({"file": path, "profile": profile, "bytes": 0, "preprocess_ms": preprocessing_ms,
+                         "stt_ms": 0.0, "total_ms": preprocessing_ms, "text": "<silence>"})
+            continue
+
+        latencies = []
+        text = ""
+        for _ in range(runs):
+            start_time = time.time()
+            transcript = transcriber.transcribe(audio_data)
+            latencies.append((time.time() - start_time) * 1000)
+            text = transcript.text or transcript.error or ""
+
+        stt_ms = statistics.median(latencies)
+        rows.append({"file": path, "profile": profile, "bytes": len(audio_data), "preprocess_ms": preprocessing_ms,
+                     "stt_ms": stt_ms, "total_ms": preprocessing_ms + stt_ms, "text": text[:40]})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="Audio recordings to benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="STT runs per profile (median is reported)")
+    args = parser.parse_args()
+
+    if not AUDIO_PREPROCESSING_AVAILABLE:
+        raise SystemExit("PyAV and numpy are required: pip install av numpy")
+
+    aai.settings.api_key = ASSEMBLYAI_API_KEY
+
+    print(f"{'file':30} {'profile':16} {'bytes':>10} {'prep ms':>9} {'stt ms':>9} {'total ms':>9}  text")
+    for path in args.files:
+        for row in benchmark_file(path, args.runs):
+            print(f"{row['file'][-30:]:30} {row['profile']:16} {row['bytes']:>10} {row['preprocess_ms']:>9.0f} "
+                  f"{row['stt_ms']:>9.0f} {row['total_ms']:>9.0f}  {row['text']}")
+
+
+if __name__ == "__main__":
+    main()
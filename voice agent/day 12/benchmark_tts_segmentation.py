@@ -0,0 +1,113 @@
+"""
+Compare time-to-first-audio, total synthesis time and playback stalls of a
+spoken reply under three ways of splitting it for Murf:
+
+    fixed      split_text_for_murf: chunks filled up to the 3,000-character limit
+    sentences  one request per sentence
+    adaptive   plan_tts_segments: a clause-sized first segment, growing after
+
+By default synthesis is modelled as base + per-character latency with
+--concurrency requests in flight. The first segment's size comes from the same
+model, as it would from measured latency. Against real or stand-in providers,
+every segment is actually synthesised:
+
+    STANDIN_TTS_SECONDS=0.4 STANDIN_TTS_SECONDS_PER_1K_CHARS=6 python standin_providers.py --port 8100 &
+    python benchmark_tts_segmentation.py --base-url http://127.0.0.1:8100
+"""
+import argparse
+import asyncio
+import os
+import re
+import time
+
+SENTENCE = ("The forecast for tomorrow shows light rain in the morning, clearing by noon; "
+            "temperatures should reach about twenty six degrees in the afternoon. ")
+
+
+def reply_of_length(chars):
+    return (SENTENCE * (chars // len(SENTENCE) + 1))[:chars].rsplit(" ", 1)[0] + "."
+
+
+def strategies(app_module, voice_id):
+    return {
+        "fixed": lambda text: app_module.split_text_for_murf(text, app_module.MURF_MAX_CHARS),
+        "sentences": lambda text: [part for part in re.split(r"(?<=[.!?])\s+", text) if part],
+        "adaptive": lambda text: app_module.plan_tts_segments(text, voice_id),
+    }
+
+
+def playback(ready_ms, segments, chars_per_second):
+    """First audio, last segment ready, and time spent waiting between segments once playing"""
+    clock = ready_ms[0]
+    stalls = 0.0
+    for index, segment in enumerate(segments):
+        if ready_ms[index] > clock:
+            stalls += ready_ms[index] - clock
+            clock = ready_ms[index]
+        clock += len(segment) / chars_per_second * 1000
+    return {"first_audio_ms": ready_ms[0], "all_ready_ms": max(ready_ms), "stall_ms": stalls, "segments": len(segments)}
+
+
+def simulate(segments, args):
+    # Requests start in segment order as slots free up
+    slots = [0.0] * args.concurrency
+    ready = []
+    for segment in segments:
+        start = min(slots)
+        finish = start + args.base_ms + args.ms_per_char * len(segment)
+        slots[slots.index(start)] = finish
+        ready.append(finish)
+    return ready
+
+
+async def synthesize(app_module, segments, args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    start_time = time.perf_counter()
+
+    async def one(segment):
+        async with semaphore:
+            await app_module.run_tts_generation(segment, args.voice)
+            return (time.perf_counter() - start_time) * 1000
+
+    return await asyncio.gather(*(one(segment) for segment in segments))
+
+
+async def main_async(args):
+    if args.base_url:
+        os.environ["MURF_BASE_URL"] = args.base_url
+        os.environ["ASYNC_PROVIDER_CLIENTS"] = "true"
+    os.environ["HEALTH_PROBE_ENABLED"] = "false"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["TTS_LATENCY_PRIOR"] = f"[{args.base_ms}, {args.ms_per_char}]"
+    import app as app_module
+
+    print(f"{'chars':>6} {'strategy':10} {'segments':>8} {'first audio':>12} {'all ready':>10} {'stalls':>8}")
+    for chars in args.lengths:
+        text = reply_of_length(chars)
+        for name, split in strategies(app_module, args.voice).items():
+            segments = split(text)
+            if args.base_url:
+                ready = await synthesize(app_module, segments, args)
+            else:
+                ready = simulate(segments, args)
+            result = playback(ready, segments, args.chars_per_second)
+            print(f"{chars:>6} {name:10} {result['segments']:>8} {result['first_audio_ms']:>10.0f}ms "
+                  f"{result['all_ready_ms']:>8.0f}ms {result['stall_ms']:>6.0f}ms")
+    if app_module.http_client is not None:
+        await app_module.http_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="", help="Synthesise for real against this Murf base URL")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[200, 600, 1200, 2400, 4800])
+    parser.add_argument("--voice", default="en-US-natalie")
+    parser.add_argument("--base-ms", type=float, default=400.0, help="Modelled fixed cost per Murf request")
+    parser.add_argument("--ms-per-char", type=float, default=6.0, help="Modelled cost per character")
+    parser.add_argument("--concurrency", type=int, default=4, help="Murf requests in flight at once")
+    parser.add_argument("--chars-per-second", type=float, default=15.0, help="Speaking rate used for playback")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Replay recorded conversations against the agent_chat pipeline, turn by turn,
+and write a per-turn latency report that can be diffed between two builds.
+
+Save a session with GET /agent/chat/{session_id}/history, then:
+
+    # In-process: providers are stubbed with the recorded replies at the recorded timing
+    python replay_sessions.py run history.json --label before --out before.json
+    # Against a running server (e.g. one wired to standin_providers.py); turns are sent as text
+    python replay_sessions.py run history.json --base-url http://127.0.0.1:8000 --label live --out live.json
+    # Per-stage and per-turn differences between two reports
+    python replay_sessions.py compare before.json after.json
+
+In stub mode the LLM time of each turn is the gap between the recorded user and
+assistant timestamps; STT and TTS times come from --stt-ms and --tts-ms-per-char.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+
+STAGES = ("stt", "context", "llm", "tts")
+
+# The recorded turn being replayed; the stub backends read it from inside the request
+current_turn = contextvars.ContextVar("current_turn", default=None)
+
+
+def load_turns(paths):
+    """Pair each recorded user message with the assistant reply that followed it"""
+    turns = []
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        histories = data if isinstance(data, list) else [data]
+        for index, history in enumerate(histories):
+            session_id = history.get("session_id") or f"{os.path.basename(path)}#{index}"
+            messages = history["messages"]
+            turn_index = 0
+            for position, message in enumerate(messages):
+                if message["role"] != "user":
+                    continue
+                reply = None
+                for following in messages[position + 1:]:
+                    if following["role"] == "user":
+                        break
+                    if following["role"] == "assistant":
+                        reply = following
+                        break
+                llm_ms = None
+                if reply is not None:
+                    llm_ms = (datetime.fromisoformat(reply["timestamp"]) -
+                              datetime.fromisoformat(message["timestamp"])).total_seconds() * 1000
+                turns.append({
+                    "session": session_id,
+                    "turn": turn_index,
+                    "user_message": message["content"],
+                    "reply": reply["content"] if reply else None,
+                    "recorded_llm_ms": round(llm_ms, 1) if llm_ms is not None else None
+                })
+                turn_index += 1
+    return turns
+
+
+def install_stub_backends(app_module, args):
+    """Replace the provider backends with stubs that replay the recorded turn"""
+    scale = args.time_scale
+
+    async def stt(audio_data, endpoint, max_retries):
+        turn = current_turn.get()
+        await asyncio.sleep(args.stt_ms * scale / 1000)
+        return {"text": turn["user_message"], "confidence": 1.0, "processing_time": args.stt_ms / 1000}
+
+    async def llm(prompt, max_tokens, temperature, max_retries):
+        turn = current_turn.get()
+        if turn["reply"] is None:
+            # The recorded turn never got a reply; fail it the same way
+            raise app_module.HTTPException(status_code=503, detail="No recorded reply for this turn")
+        llm_ms = max(turn["recorded_llm_ms"], 0.0)
+        await asyncio.sleep(llm_ms * scale / 1000)
+        return {"text": turn["reply"], "model": "replay", "processing_time": llm_ms / 1000}
+
+    async def tts(text, voice_id, max_retries):
+        tts_ms = args.tts_base_ms + args.tts_ms_per_char * len(text)
+        await asyncio.sleep(tts_ms * scale / 1000)
+        return {"audio_url": f"replay://{uuid.uuid4().hex}", "processing_time": tts_ms / 1000}
+
+    for stage, backend in (("stt", stt), ("llm", llm), ("tts", tts)):
+        app_module.register_stage_backend(stage, "replay", backend)
+
+
+async def replay(turns, args):
+    import httpx
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=120.0)
+    else:
+        os.environ["PIPELINE_BACKENDS"] = json.dumps({stage: ["replay"] for stage in ("stt", "llm", "tts")})
+        os.environ["HEALTH_PROBE_ENABLED"] = "false"
+        # Replayed turns arrive faster than a person talks; don't let the per-session limits refuse them
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        import app as app_module
+        install_stub_backends(app_module, args)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url="http://replay", timeout=120.0)
+
+    replay_sessions = {}
+    results = []
+    async with client:
+        for turn in turns:
+            session_id = replay_sessions.setdefault(turn["session"], f"replay-{uuid.uuid4().hex[:12]}")
+            token = current_turn.set(turn)
+            start_time = time.perf_counter()
+            try:
+                if args.base_url:
+                    response = await client.post(f"/agent/chat/{session_id}", data={"text": turn["user_message"]})
+                else:
+                    # Placeholder audio so the STT stage runs (and is timed) through the stub
+                    response = await client.post(
+                        f"/agent/chat/{session_id}",
+                        files={"audio": ("turn.webm", b"replay", "audio/webm")}
+                    )
+            finally:
+                current_turn.reset(token)
+            client_ms = (time.perf_counter() - start_time) * 1000
+            body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+            results.append({
+                "session": turn["session"],
+                "turn": turn["turn"],
+                "status": response.status_code,
+                "success": bool(body.get("success")),
+                "client_ms": round(client_ms, 1),
+                "stage_timings": body.get("stage_timings", {}),
+                "response_cache": body.get("response_cache")
+            })
+            print(f"{turn['session']}#{turn['turn']}: {client_ms:.0f} ms {body.get('stage_timings', {})}")
+    return results
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else None
+
+
+def summarize(results):
+    columns = {"client_ms": [result["client_ms"] for result in results]}
+    for stage in STAGES:
+        columns[stage] = [result["stage_timings"][stage] for result in results if stage in result["stage_timings"]]
+    return {
+        name: {
+            "count": len(values),
+            "mean": round(sum(values) / len(values), 1) if values else None,
+            "p50": percentile(values, 0.5),
+            "p95": percentile(values, 0.95)
+        }
+        for name, values in columns.items()
+    }
+
+
+def run_command(args):
+    turns = load_turns(args.histories)
+    if not turns:
+        raise SystemExit("No user turns found in the given histories")
+    results = asyncio.run(replay(turns, args))
+    report = {
+        "label": args.label,
+        "mode": "live" if args.base_url else "stub",
+        "target": args.base_url or "in-process",
+        "created_at": datetime.now().isoformat(),
+        "summary": summarize(results),
+        "turns": results
+    }
+    with open(args.out, "w") as f:
+        # Stable key order and one turn per block so two reports diff cleanly
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\nWrote {len(results)} turns to {args.out}")
+    print_summary(report)
+
+
+def print_summary(report):
+    print(f"{'metric':10} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9}")
+    for name, stats in report["summary"].items():
+        if stats["count"]:
+            print(f"{name:10} {stats['count']:>6} {stats['mean']:>9.1f} {stats['p50']:>9.1f} {stats['p95']:>9.1f}")
+
+
+def compare_command(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{'metric':10} {'stat':4} {before['label']:>12} {after['label']:>12} {'delta':>10}")
+    for name, stats in before["summary"].items():
+        other = after["summary"].get(name)
+        if not stats["count"] or not other or not other["count"]:
+            continue
+        for stat in ("p50", "p95"):
+            delta = other[stat] - stats[stat]
+            print(f"{name:10} {stat:4} {stats[stat]:>12.1f} {other[stat]:>12.1f} {delta:>+10.1f}")
+
+    after_turns = {(turn["session"], turn["turn"]): turn for turn in after["turns"]}
+    changed = []
+    for turn in before["turns"]:
+        other = after_turns.get((turn["session"], turn["turn"]))
+        if other is None:
+            continue
+        delta = other["client_ms"] - turn["client_ms"]
+        if abs(delta) >= args.threshold_ms or other["success"] != turn["success"]:
+            changed.append((turn, other, delta))
+    print(f"\nTurns changed by >= {args.threshold_ms:.0f} ms or in outcome: {len(changed)}")
+    for turn, other, delta in sorted(changed, key=lambda item: -abs(item[2])):
+        stage_deltas = {stage: round(other["stage_timings"].get(stage, 0.0) - turn["stage_timings"].get(stage, 0.0), 1)
+                        for stage in STAGES if stage in turn["stage_timings"] or stage in other["stage_timings"]}
+        outcome = "" if other["success"] == turn["success"] else f" success {turn['success']} -> {other['success']}"
+        print(f"  {turn['session']}#{turn['turn']}: {delta:+.0f} ms {stage_deltas}{outcome}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Replay histories and write a report")
+    run.add_argument("histories", nargs="+", help="History JSON files (one session or a list of sessions each)")
+    run.add_argument("--out", required=True, help="Report path")
+    run.add_argument("--label", default="build", help="Name for this build in comparisons")
+    run.add_argument("--base-url", default="", help="Replay against a running server instead of in-process stubs")
+    run.add_argument("--stt-ms", type=float, default=1000.0, help="Stubbed transcription time per turn")
+    run.add_argument("--tts-base-ms", type=float, default=300.0, help="Stubbed fixed TTS time per call")
+    run.add_argument("--tts-ms-per-char", type=float, default=5.0, help="Stubbed TTS time per reply character")
+    run.add_argument("--time-scale", type=float, default=1.0, help="Multiply stubbed delays (e.g. 0.1 for a quick run)")
+    run.set_defaults(handler=run_command)
+
+    compare = commands.add_parser("compare", help="Diff two reports")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.add_argument("--threshold-ms", type=float, default=100.0, help="Only list turns that moved at least this much")
+    compare.set_defaults(handler=compare_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
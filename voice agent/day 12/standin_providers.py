@@ -0,0 +1,212 @@
+"""
+Local stand-in for the AssemblyAI, Gemini and Murf HTTP APIs.
+
+Implements just enough of each API for the day 12 async provider clients,
+health probes and benchmarks, with configurable latency. Point the app at it
+with the *_BASE_URL settings:
+
+    python standin_providers.py --port 8100
+    ASSEMBLYAI_BASE_URL=http://127.0.0.1:8100 GEMINI_BASE_URL=http://127.0.0.1:8100 \
+    MURF_BASE_URL=http://127.0.0.1:8100 ASYNC_PROVIDER_CLIENTS=true python app.py
+"""
+import argparse
+import asyncio
+import io
+import os
+import time
+import uuid
+import wave
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+
+# Simulated provider latency in seconds
+STANDIN_STT_SECONDS = float(os.getenv("STANDIN_STT_SECONDS", "1.0"))
+STANDIN_LLM_SECONDS = float(os.getenv("STANDIN_LLM_SECONDS", "0.8"))
+# Extra prompt processing time per 1000 uncached input tokens
+STANDIN_LLM_SECONDS_PER_1K_INPUT = float(os.getenv("STANDIN_LLM_SECONDS_PER_1K_INPUT", "0.1"))
+STANDIN_TTS_SECONDS = float(os.getenv("STANDIN_TTS_SECONDS", "0.6"))
+# Extra synthesis time per 1000 characters of text
+STANDIN_TTS_SECONDS_PER_1K_CHARS = float(os.getenv("STANDIN_TTS_SECONDS_PER_1K_CHARS", "0"))
+STANDIN_TRANSCRIPT = os.getenv("STANDIN_TRANSCRIPT", "Hello, what can you do?")
+STANDIN_REPLY = os.getenv("STANDIN_REPLY", "I can answer questions and chat with you by voice.")
+
+app = FastAPI(title="Voice Agent provider stand-ins")
+
+uploads = {}
+transcripts = {}
+audio_files = {}
+cached_contents = {}
+
+
+def silent_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+# AssemblyAI
+@app.post("/v2/upload")
+async def upload(request: Request):
+    upload_id = uuid.uuid4().hex
+    uploads[upload_id] = await request.body()
+    return {"upload_url": f"{request.base_url}uploads/{upload_id}"}
+
+
+@app.post("/v2/transcript")
+async def submit_transcript(request: Request):
+    payload = await request.json()
+    transcript_id = uuid.uuid4().hex
+    transcripts[transcript_id] = {
+        "id": transcript_id,
+        "audio_url": payload["audio_url"],
+        "webhook_url": payload.get("webhook_url"),
+        "webhook_headers": {payload["webhook_auth_header_name"]: payload.get("webhook_auth_header_value", "")}
+        if payload.get("webhook_auth_header_name") else {},
+        "ready_at": time.time() + STANDIN_STT_SECONDS,
+    }
+    if payload.get("webhook_url"):
+        asyncio.create_task(deliver_webhook(transcript_id))
+    return {"id": transcript_id, "status": "queued"}
+
+
+def transcript_status(transcript_id: str) -> dict:
+    job = transcripts.get(transcript_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    if time.time() < job["ready_at"]:
+        return {"id": transcript_id, "status": "processing", "text": None, "confidence": None, "error": None}
+    return {"id": transcript_id, "status": "completed", "text": STANDIN_TRANSCRIPT, "confidence": 0.95, "error": None}
+
+
+async def deliver_webhook(transcript_id: str) -> None:
+    import httpx
+
+    job = transcripts[transcript_id]
+    await asyncio.sleep(max(job["ready_at"] - time.time(), 0))
+    async with httpx.AsyncClient() as client:
+        try:
+            await client.post(job["webhook_url"], json={"transcript_id": transcript_id, "status": "completed"},
+                              headers=job["webhook_headers"])
+        except httpx.HTTPError:
+            pass
+
+
+@app.get("/v2/transcript/{transcript_id}")
+async def get_transcript(transcript_id: str):
+    return transcript_status(transcript_id)
+
+
+@app.get("/v2/transcript")
+async def list_transcripts(limit: int = 10):
+    return {"transcripts": [transcript_status(tid) for tid in list(transcripts)[-limit:]]}
+
+
+# Gemini
+@app.get("/v1beta/models/{model}")
+async def get_model(model: str):
+    return {"name": f"models/{model}"}
+
+
+def contents_text(contents: list) -> str:
+    return "".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+
+
+def live_cached_content(cache_id: str) -> dict:
+    cache = cached_contents.get(cache_id)
+    if cache is None or cache["expires_at"] <= time.time():
+        cached_contents.pop(cache_id, None)
+        raise HTTPException(status_code=404, detail="Cached content not found")
+    return cache
+
+
+def cached_content_resource(cache_id: str) -> dict:
+    cache = cached_contents[cache_id]
+    return {
+        "name": f"cachedContents/{cache_id}",
+        "model": cache["model"],
+        "expireTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(cache["expires_at"])),
+        "usageMetadata": {"totalTokenCount": cache["tokens"]},
+    }
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def generate_content(model: str, request: Request):
+    payload = await request.json()
+    prompt = contents_text(payload.get("contents", []))
+    cached_tokens = 0
+    if payload.get("cachedContent"):
+        cached_tokens = live_cached_content(payload["cachedContent"].split("/")[-1])["tokens"]
+    prompt_tokens = len(prompt) // 4
+    await asyncio.sleep(STANDIN_LLM_SECONDS + prompt_tokens / 1000 * STANDIN_LLM_SECONDS_PER_1K_INPUT)
+    usage = {"promptTokenCount": cached_tokens + prompt_tokens, "candidatesTokenCount": len(STANDIN_REPLY) // 4}
+    if cached_tokens:
+        usage["cachedContentTokenCount"] = cached_tokens
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": STANDIN_REPLY}]}, "finishReason": "STOP"}],
+        "usageMetadata": usage,
+        "modelVersion": model,
+    }
+
+
+@app.post("/v1beta/cachedContents")
+async def create_cached_content(request: Request):
+    payload = await request.json()
+    tokens = len(contents_text(payload.get("contents", []))) // 4
+    # Registering pays the prompt processing once
+    await asyncio.sleep(tokens / 1000 * STANDIN_LLM_SECONDS_PER_1K_INPUT)
+    cache_id = uuid.uuid4().hex
+    ttl = float(payload.get("ttl", "3600s").rstrip("s"))
+    cached_contents[cache_id] = {"model": payload["model"], "tokens": tokens, "expires_at": time.time() + ttl}
+    return cached_content_resource(cache_id)
+
+
+@app.patch("/v1beta/cachedContents/{cache_id}")
+async def update_cached_content(cache_id: str, request: Request):
+    payload = await request.json()
+    live_cached_content(cache_id)["expires_at"] = time.time() + float(payload.get("ttl", "3600s").rstrip("s"))
+    return cached_content_resource(cache_id)
+
+
+@app.delete("/v1beta/cachedContents/{cache_id}")
+async def delete_cached_content(cache_id: str):
+    live_cached_content(cache_id)
+    del cached_contents[cache_id]
+    return {}
+
+
+# Murf
+@app.get("/v1/speech/voices")
+async def list_voices():
+    return [{"voiceId": "en-US-natalie", "displayName": "Natalie"}]
+
+
+@app.post("/v1/speech/generate")
+async def generate_speech(request: Request):
+    payload = await request.json()
+    await asyncio.sleep(STANDIN_TTS_SECONDS + len(payload.get("text", "")) / 1000 * STANDIN_TTS_SECONDS_PER_1K_CHARS)
+    audio_id = uuid.uuid4().hex
+    # Roughly 15 characters of speech per second
+    audio_files[audio_id] = silent_wav(max(len(payload.get("text", "")) / 15, 0.5))
+    return {"audioFile": f"{request.base_url}files/{audio_id}.wav", "audioLengthInSeconds": len(payload.get("text", "")) / 15}
+
+
+@app.get("/files/{audio_id}.wav")
+async def get_audio_file(audio_id: str):
+    if audio_id not in audio_files:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return Response(content=audio_files[audio_id], media_type="audio/wav")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the provider stand-in services")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -14,6 +14,15 @@ let isDarkMode = false;
 let recordingStartTime = null;
 let recordingTimer = null;
 const MIN_RECORDING_DURATION = 500; // Minimum 500ms recording
+let displayedMessages = [];
+let audioSegments = [];
+let nextSegmentIndex = 0;
+let segmentPlaying = false;
+let streamSocket = null;
+let streamAudioContext = null;
+let streamMicStream = null;
+let streamProcessor = null;
+let assistantSpeaking = false;
 
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
@@ -247,32 +256,43 @@ async function processRecording() {
         formData.append('max_tokens', '600');
         formData.append('temperature', temperature.toString());
 
-        // Send to chat endpoint
+        // Send to chat endpoint, streaming progress events as each stage finishes
+        resetAudioSegments();
         const response = await fetch(`/agent/chat/${currentSessionId}`, {
             method: 'POST',
+            headers: { 'Accept': 'text/event-stream' },
             body: formData
         });
 
-        hideLoadingOverlay();
-
         if (!response.ok) {
+            hideLoadingOverlay();
             const errorText = await response.text();
             throw new Error(`HTTP ${response.status}: ${errorText}`);
         }
 
-        const data = await response.json();
+        const data = await readAgentChatStream(response, {
+            transcript: (event) => {
+                hideLoadingOverlay();
+                updateStatus('🧠 Thinking...', `You said: "${event.user_message}"`);
+            },
+            reply: (event) => {
+                displayChatResponse(event);
+                updateStatus('🔊 Generating voice...', 'Reply ready, preparing audio');
+            },
+            audio: (segment) => queueAudioSegment(segment)
+        });
+
+        hideLoadingOverlay();
         
         // Display results
         displayChatResponse(data);
         
-        // Update chat history if available
-        if (data.chat_history) {
-            displayChatHistory(data.chat_history);
+        // Append this turn's messages to the chat history
+        if (data.new_messages) {
+            displayChatHistory(displayedMessages.concat(data.new_messages));
         }
 
-        // Handle audio playback
         if (data.audio_url) {
-            await playAudioResponse(data.audio_url);
             updateStatus('✅ Response complete', 'Ready for your next message');
         } else if (data.fallback_text) {
             updateStatus('⚠️ Audio unavailable - showing text', 'Ready for your next message');
@@ -404,11 +424,18 @@ function generateNewSession() {
     window.history.pushState({}, '', newUrl);
     updateSessionDisplay();
     
+    // A hands-free stream belongs to one session: reconnect it to the new one
+    if (streamSocket) {
+        stopHandsFreeConversation();
+        startHandsFreeConversation().catch(error => console.warn('Could not restart hands-free mode:', error.message));
+    }
+    
     // Clear chat display
     const chatHistory = document.getElementById('chatHistory');
     const chatMessages = document.getElementById('chatMessages');
     if (chatMessages) chatMessages.innerHTML = '';
     if (chatHistory) chatHistory.style.display = 'none';
+    displayedMessages = [];
     
     // Hide response section
     const responseSection = document.getElementById('responseSection');
@@ -432,6 +459,7 @@ async function clearCurrentSession() {
         const chatMessages = document.getElementById('chatMessages');
         if (chatMessages) chatMessages.innerHTML = '';
         if (chatHistory) chatHistory.style.display = 'none';
+        displayedMessages = [];
         
         // Hide response section
         const responseSection = document.getElementById('responseSection');
@@ -472,6 +500,7 @@ function displayChatHistory(messages) {
     if (!chatMessages) return;
     
     chatMessages.innerHTML = '';
+    displayedMessages = messages;
     
     messages.forEach(message => {
         const messageDiv = document.createElement('div');
@@ -517,6 +546,69 @@ function displayChatResponse(data) {
 }
 
 // Audio Functions
+// Reads the agent_chat Server-Sent Events stream, calling handlers per event; resolves with the final "done" payload
+async function readAgentChatStream(response, handlers) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            
+            const payload = JSON.parse(data);
+            if (event === 'done') return payload;
+            if (handlers[event]) handlers[event](payload);
+        }
+    }
+    throw new Error('Response stream ended before the reply was complete');
+}
+
+function resetAudioSegments() {
+    audioSegments = [];
+    nextSegmentIndex = 0;
+    segmentPlaying = false;
+}
+
+// Segments can arrive out of order; play them in order as soon as each is available
+function queueAudioSegment(segment) {
+    audioSegments[segment.index] = segment;
+    if (!segmentPlaying) {
+        playNextSegment();
+    }
+}
+
+async function playNextSegment() {
+    const segment = audioSegments[nextSegmentIndex];
+    if (!segment) {
+        segmentPlaying = false;
+        return;
+    }
+    nextSegmentIndex += 1;
+    if (!segment.audio_url) {
+        return playNextSegment();
+    }
+    
+    segmentPlaying = true;
+    await playAudioResponse(segment.audio_url);
+    if (nextSegmentIndex < segment.count) {
+        // Chain the following segment instead of the end-of-reply handling
+        document.getElementById('audioPlayer').onended = () => playNextSegment();
+    }
+}
+
 async function playAudioResponse(audioUrl) {
     try {
         const audioPlayer = document.getElementById('audioPlayer');
@@ -526,6 +618,13 @@ async function playAudioResponse(audioUrl) {
         audioPlayer.onended = () => {
             console.log('Audio response finished playing');
             
+            // Hands-free mode: the server detects the next utterance, just resume listening
+            if (streamSocket) {
+                assistantSpeaking = false;
+                updateStatus('🎙️ Listening...', 'Speak whenever you are ready');
+                return;
+            }
+            
             // Auto-continue conversation mode after audio finishes
             if (conversationMode && !isRecording && !isProcessing) {
                 setTimeout(() => {
@@ -558,6 +657,7 @@ async function playAudioResponse(audioUrl) {
     } catch (error) {
         console.warn('Could not auto-play audio:', error.message);
         // This is often due to browser autoplay policies, which is fine
+        assistantSpeaking = false;
         
         // If audio doesn't play, still trigger conversation mode continuation
         if (conversationMode && !isRecording && !isProcessing) {
@@ -571,15 +671,23 @@ async function playAudioResponse(audioUrl) {
 }
 
 // Conversation Mode Toggle
-function toggleConversationMode() {
+async function toggleConversationMode() {
     conversationMode = !conversationMode;
     const toggleButton = document.getElementById('toggleConversation');
     
     if (conversationMode) {
         toggleButton.classList.add('active');
-        updateStatus('🔄 Conversation mode enabled', 'Continuous conversation active');
+        try {
+            await startHandsFreeConversation();
+            updateStatus('🎙️ Listening...', 'Hands-free conversation: just start speaking');
+        } catch (error) {
+            console.warn('Hands-free mode unavailable, using push-to-talk:', error.message);
+            stopHandsFreeConversation();
+            updateStatus('🔄 Conversation mode enabled', 'Continuous conversation active');
+        }
     } else {
         toggleButton.classList.remove('active');
+        stopHandsFreeConversation();
         updateStatus('⏸️ Conversation mode disabled', 'Manual recording mode');
     }
     
@@ -587,6 +695,118 @@ function toggleConversationMode() {
     updateRecordButton('idle');
 }
 
+// Hands-free conversation: microphone audio is streamed to the server, which detects
+// when you stop speaking and starts the reply itself
+async function startHandsFreeConversation() {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${window.location.host}/agent/stream/${currentSessionId}`);
+    socket.binaryType = 'arraybuffer';
+    await new Promise((resolve, reject) => {
+        socket.onopen = resolve;
+        socket.onerror = () => reject(new Error('Could not open the streaming connection'));
+    });
+    
+    socket.send(JSON.stringify({
+        type: 'config',
+        voice: document.getElementById('voiceSelect').value,
+        temperature: parseFloat(document.getElementById('creativitySlider').value),
+        max_tokens: 600
+    }));
+    socket.onmessage = (message) => handleStreamEvent(JSON.parse(message.data));
+    socket.onclose = () => {
+        if (streamSocket === socket) {
+            stopHandsFreeConversation();
+            if (conversationMode) {
+                updateStatus('⚠️ Hands-free connection closed', 'Hold the button to keep talking');
+            }
+        }
+    };
+    streamSocket = socket;
+    
+    streamMicStream = await navigator.mediaDevices.getUserMedia({
+        audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true }
+    });
+    streamAudioContext = new AudioContext();
+    const source = streamAudioContext.createMediaStreamSource(streamMicStream);
+    streamProcessor = streamAudioContext.createScriptProcessor(4096, 1, 1);
+    streamProcessor.onaudioprocess = (event) => {
+        // Half duplex: don't feed the assistant's own voice back into the endpointer
+        if (!streamSocket || streamSocket.readyState !== WebSocket.OPEN || assistantSpeaking) return;
+        streamSocket.send(downsampleToPCM16(event.inputBuffer.getChannelData(0), streamAudioContext.sampleRate));
+    };
+    source.connect(streamProcessor);
+    streamProcessor.connect(streamAudioContext.destination);
+}
+
+function stopHandsFreeConversation() {
+    const socket = streamSocket;
+    streamSocket = null;
+    assistantSpeaking = false;
+    if (socket && socket.readyState <= WebSocket.OPEN) socket.close();
+    if (streamProcessor) {
+        streamProcessor.disconnect();
+        streamProcessor = null;
+    }
+    if (streamAudioContext) {
+        streamAudioContext.close();
+        streamAudioContext = null;
+    }
+    if (streamMicStream) {
+        streamMicStream.getTracks().forEach(track => track.stop());
+        streamMicStream = null;
+    }
+}
+
+// Float32 samples at the context rate -> 16 kHz PCM16, as the streaming endpoint expects
+function downsampleToPCM16(input, inputRate) {
+    const ratio = inputRate / 16000;
+    const length = Math.floor(input.length / ratio);
+    const output = new Int16Array(length);
+    for (let i = 0; i < length; i++) {
+        const sample = Math.max(-1, Math.min(1, input[Math.floor(i * ratio)]));
+        output[i] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+    }
+    return output.buffer;
+}
+
+function handleStreamEvent(event) {
+    switch (event.type) {
+        case 'partial':
+            updateStatus('🎙️ Listening...', event.text);
+            break;
+        case 'endpoint':
+            updateStatus('📤 Sending to AI...', 'Got it, working on a reply');
+            break;
+        case 'transcript':
+            resetAudioSegments();
+            updateStatus('🧠 Thinking...', `You said: "${event.user_message}"`);
+            break;
+        case 'reply':
+            displayChatResponse(event);
+            updateStatus('🔊 Generating voice...', 'Reply ready, preparing audio');
+            break;
+        case 'audio':
+            if (event.audio_url) assistantSpeaking = true;
+            queueAudioSegment(event);
+            break;
+        case 'done':
+            displayChatResponse(event);
+            if (event.new_messages) {
+                displayChatHistory(displayedMessages.concat(event.new_messages));
+            }
+            if (!event.success) {
+                showError('Service Warning', event.fallback_message || 'Some services experienced issues');
+            }
+            if (!assistantSpeaking) {
+                updateStatus('🎙️ Listening...', 'Speak whenever you are ready');
+            }
+            break;
+        case 'error':
+            showError('Streaming Error', event.fallback_message || 'Streaming conversation failed');
+            break;
+    }
+}
+
 // Error Handling
 function showError(title, message) {
     const errorAlert = document.getElementById('errorAlert');
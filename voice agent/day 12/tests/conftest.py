@@ -0,0 +1,70 @@
+"""
+The app is imported once, wired to the in-process provider stand-ins: every
+provider call goes through the async clients to standin_providers.app over
+an ASGI transport, so no test reaches a real provider.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import httpx
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DIR = tempfile.mkdtemp(prefix="voice-agent-tests-")
+
+os.environ.update({
+    "ASYNC_PROVIDER_CLIENTS": "true",
+    "ASSEMBLYAI_BASE_URL": "http://standin",
+    "GEMINI_BASE_URL": "http://standin",
+    "MURF_BASE_URL": "http://standin",
+    "ASSEMBLYAI_POLL_INTERVAL": "0.05",
+    "HEALTH_PROBE_ENABLED": "false",
+    "RATE_LIMIT_ENABLED": "false",
+    "AUDIO_CACHE_DIR": os.path.join(STATE_DIR, "audio_cache"),
+    "BATCH_JOBS_DIR": os.path.join(STATE_DIR, "batch_jobs"),
+    "STANDIN_STT_SECONDS": "0.05",
+    "STANDIN_LLM_SECONDS": "0.01",
+    "STANDIN_TTS_SECONDS": "0.01",
+})
+# app.py resolves static/, templates/ and uploads/ relative to the working directory
+os.chdir(APP_DIR)
+sys.path.insert(0, APP_DIR)
+
+import app as app_module  # noqa: E402
+import standin_providers  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    return app_module
+
+
+@pytest.fixture
+def standin():
+    return standin_providers
+
+
+@pytest.fixture
+def run(app):
+    """Run a coroutine with the shared provider pool pointed at the stand-ins"""
+    def runner(coro):
+        async def wrapped():
+            # Each test runs its own event loop; drop the poller state tied to the last one
+            app.transcription_engine.poller_task = None
+            app.transcription_engine.wakeup = asyncio.Event()
+            app.http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=standin_providers.app))
+            try:
+                return await coro
+            finally:
+                await app.http_client.aclose()
+                app.http_client = None
+        return asyncio.run(wrapped())
+    return runner
+
+
+@pytest.fixture
+def client(app):
+    """Async client for the app itself (startup events are not run)"""
+    return lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://app")
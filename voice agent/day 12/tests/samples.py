@@ -0,0 +1,28 @@
+"""Synthetic PCM16 audio for the audio handling tests"""
+import io
+import wave
+
+import numpy as np
+
+RATE = 16000
+
+
+def tone(db, seconds, rate=RATE):
+    """A 200 Hz tone at the given RMS level (dBFS)"""
+    t = np.arange(int(seconds * rate)) / rate
+    return (10 ** (db / 20) * np.sqrt(2) * np.sin(2 * np.pi * 200 * t) * 32767).astype(np.int16)
+
+
+def silence(seconds, rate=RATE):
+    return np.zeros(int(seconds * rate), dtype=np.int16)
+
+
+def wav_file(samples, rate=RATE):
+    """Mono PCM16 WAV bytes"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(samples.tobytes())
+    return buffer.getvalue()
@@ -0,0 +1,104 @@
+import io
+import struct
+import wave
+
+import pytest
+
+
+def test_short_tts_reply_is_one_murf_call(app, standin, run, client):
+    async def scenario():
+        async with client() as http:
+            return await http.post("/tts", json={"text": "Hello there. " * 20, "voice_id": "en-US-natalie"})
+
+    body = run(scenario()).json()
+    assert body["audio_url"].startswith("http://standin/files/")
+    assert "assembled_segments" not in body
+
+
+def test_long_tts_reply_streams_as_one_wav(app, standin, run, client):
+    text = "This sentence is part of a long reply that Murf cannot take in one request. " * 60
+
+    async def scenario():
+        async with client() as http:
+            response = await http.post("/tts", json={"text": text, "voice_id": "en-US-natalie"})
+            body = response.json()
+            audio = await http.get(body["audio_url"])
+            return body, audio
+
+    body, audio = run(scenario())
+    assert body["audio_url"].startswith("/audio/assembled/")
+    segments = body["assembled_segments"]
+    assert segments == len(app.split_text_for_murf(text, app.MURF_MAX_CHARS)) > 1
+    assert audio.status_code == 200
+    assert audio.headers["content-type"] == "audio/wav"
+    # One header, then every segment's samples back to back
+    data = audio.content
+    frames = data[44:]
+    expected = sum(len(standin.silent_wav(max(len(chunk) / 15, 0.5))) - 44
+                   for chunk in app.split_text_for_murf(text, app.MURF_MAX_CHARS))
+    assert len(frames) == expected
+    header = bytearray(data[:44])
+    header[4:8] = (len(data) - 8).to_bytes(4, "little")
+    header[40:44] = len(frames).to_bytes(4, "little")
+    with wave.open(io.BytesIO(bytes(header) + frames)) as wav:
+        assert wav.getnframes() * 2 == len(frames)
+
+
+def test_unknown_assembly_is_not_found(run, client):
+    async def scenario():
+        async with client() as http:
+            return await http.get("/audio/assembled/" + "0" * 32)
+
+    assert run(scenario()).status_code == 404
+
+
+# Gapless concatenation
+def wav(payload, rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(payload)
+    return buffer.getvalue()
+
+
+def join(app, segments, chunk_size=7):
+    joiner = app.AudioConcatenator()
+    output = b""
+    for segment in segments:
+        joiner.start_segment()
+        for offset in range(0, len(segment), chunk_size):
+            output += joiner.feed(segment[offset:offset + chunk_size])
+        output += joiner.end_segment()
+    return output
+
+
+def test_wav_segments_join_behind_one_open_ended_header(app):
+    output = join(app, [wav(b"\x01\x00" * 100), wav(b"\x02\x00" * 50), wav(b"\x03\x00" * 25)])
+    assert output[:4] == b"RIFF"
+    assert struct.unpack("<I", output[4:8])[0] == 0xFFFFFFFF
+    assert output[36:40] == b"data"
+    assert struct.unpack("<I", output[40:44])[0] == 0xFFFFFFFF
+    assert output[44:] == b"\x01\x00" * 100 + b"\x02\x00" * 50 + b"\x03\x00" * 25
+
+
+def test_id3_tags_of_later_mp3_segments_are_dropped(app):
+    tag = b"ID3\x04\x00\x00\x00\x00\x00\x05" + b"title"
+    output = join(app, [tag + b"\xff\xfbAAAA", tag + b"\xff\xfbBBBB"], chunk_size=4)
+    assert output == tag + b"\xff\xfbAAAA" + b"\xff\xfbBBBB"
+
+
+def test_unknown_formats_pass_through(app):
+    assert join(app, [b"OggS-first", b"OggS-second"]) == b"OggS-firstOggS-second"
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b"RIFF....WAVE", "audio/wav"),
+    (b"ID3\x04", "audio/mpeg"),
+    (b"\xff\xfb\x90", "audio/mpeg"),
+    (b"OggS", "audio/ogg"),
+    (b"????", "audio/x-unknown"),
+])
+def test_sniffed_audio_type(app, data, expected):
+    assert app.sniff_audio_type(data, "audio/x-unknown") == expected
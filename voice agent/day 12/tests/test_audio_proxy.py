@@ -0,0 +1,75 @@
+"""Proxied TTS audio: the local cache, Range/ETag handling and LRU eviction"""
+import os
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def proxy(app, monkeypatch):
+    monkeypatch.setattr(app, "AUDIO_PROXY_ENABLED", True)
+    monkeypatch.setattr(app, "audio_cache_entries", type(app.audio_cache_entries)())
+
+
+async def cache_reply(app, text=None):
+    """Synthesise through the stand-in and wait for the local copy; returns the cache entry"""
+    result = await app.safe_generate_audio(text or f"Cached reply {uuid.uuid4().hex}.", "en-US-natalie")
+    audio_id = result["audio_url"].rsplit("/", 1)[1]
+    return await app.wait_for_cached_audio(audio_id)
+
+
+def test_full_range_and_conditional_requests(app, run, client, proxy):
+    async def scenario():
+        entry = await cache_reply(app)
+        url = f"/audio/{entry['audio_id']}"
+        async with client() as http:
+            return entry, [
+                await http.get(url),
+                await http.get(url, headers={"Range": "bytes=0-9"}),
+                await http.get(url, headers={"Range": "bytes=-4"}),
+                await http.get(url, headers={"Range": f"bytes={entry['size']}-"}),
+                await http.get(url, headers={"If-None-Match": f'"{entry["audio_id"]}"'}),
+            ]
+
+    entry, (full, head, tail, beyond, not_modified) = run(scenario())
+    with open(entry["path"], "rb") as f:
+        audio = f.read()
+    assert full.status_code == 200 and full.content == audio
+    assert full.headers["etag"] == f'"{entry["audio_id"]}"' and full.headers["accept-ranges"] == "bytes"
+    assert head.status_code == 206 and head.content == audio[:10]
+    assert head.headers["content-range"] == f"bytes 0-9/{len(audio)}"
+    assert tail.status_code == 206 and tail.content == audio[-4:]
+    assert beyond.status_code == 416 and beyond.headers["content-range"] == f"bytes */{len(audio)}"
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+
+def test_cache_entry_is_reloaded_from_disk(app, run, proxy):
+    async def scenario():
+        entry = await cache_reply(app)
+        # As after a restart: only the files are left
+        app.audio_cache_entries.clear()
+        return entry, await app.get_cached_audio(entry["audio_id"])
+
+    entry, reloaded = run(scenario())
+    assert reloaded["complete"] and reloaded["size"] == entry["size"]
+
+
+def test_least_recently_used_files_are_evicted(app, run, proxy, monkeypatch):
+    monkeypatch.setattr(app, "AUDIO_CACHE_MAX_FILES", 1)
+
+    async def scenario():
+        first = await cache_reply(app)
+        second = await cache_reply(app)
+        return first, second
+
+    first, second = run(scenario())
+    assert list(app.audio_cache_entries) == [second["audio_id"]]
+    assert not os.path.exists(first["path"]) and os.path.exists(second["path"])
+
+
+def test_unknown_audio_is_not_found(run, client):
+    async def scenario():
+        async with client() as http:
+            return await http.get(f"/audio/{uuid.uuid4().hex}")
+
+    assert run(scenario()).status_code == 404
@@ -0,0 +1,189 @@
+"""Batch transcription: manifest URL checks, remote fetches and resuming jobs by ID"""
+import asyncio
+import json
+import os
+import socket
+import time
+
+import httpx
+import pytest
+
+from samples import tone, wav_file
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/a.wav",
+    "http://10.0.0.5/a.wav",
+    "http://192.168.1.10/a.wav",
+    "http://169.254.169.254/latest/meta-data",
+    "http://100.64.0.1/a.wav",
+    "http://[::1]/a.wav",
+    "http://[::ffff:127.0.0.1]/a.wav",
+    "http://[::ffff:10.0.0.5]/a.wav",
+    "http://[fe80::1]/a.wav",
+    "http://localhost:8000/a.wav",
+    "http://metadata.google.internal/a.wav",
+    "ftp://example.com/a.wav",
+    "http:///a.wav",
+])
+def test_internal_and_malformed_urls_are_rejected(app, url):
+    with pytest.raises(ValueError):
+        app.check_manifest_url(url)
+
+
+def test_public_urls_are_accepted(app):
+    assert app.check_manifest_url("https://Audio.Example.com/a.wav") == "audio.example.com"
+    assert app.check_manifest_url("http://93.184.216.34:8080/a.wav") == "93.184.216.34"
+    assert app.is_public_address("::ffff:93.184.216.34")
+    assert not app.is_public_address("::ffff:127.0.0.1")
+
+
+def test_allowlist_replaces_the_public_host_check(app, monkeypatch):
+    monkeypatch.setattr(app, "BATCH_URL_ALLOWED_HOSTS", {"audio.internal"})
+    assert app.check_manifest_url("http://audio.internal/a.wav") == "audio.internal"
+    with pytest.raises(ValueError):
+        app.check_manifest_url("https://example.com/a.wav")
+
+
+@pytest.fixture
+def dns(monkeypatch):
+    """Fake resolver: host -> address"""
+    answers = {}
+
+    async def getaddrinfo(self, host, port, *args, **kwargs):
+        return [(socket.AF_INET6 if ":" in answers[host] else socket.AF_INET, socket.SOCK_STREAM, 6, "",
+                 (answers[host], port or 0))]
+
+    monkeypatch.setattr(asyncio.base_events.BaseEventLoop, "getaddrinfo", getaddrinfo)
+    return answers
+
+
+def fetch(app, run, url, handler):
+    """read_batch_item_audio for url, with the outbound pool answering through handler"""
+    async def scenario():
+        standin_client = app.http_client
+        app.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await app.read_batch_item_audio({"id": "0", "url": url})
+        finally:
+            await app.http_client.aclose()
+            app.http_client = standin_client
+    return run(scenario())
+
+
+def test_fetch_connects_to_the_checked_address(app, run, dns):
+    dns["audio.example.com"] = "93.184.216.34"
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=b"RIFFaudio")
+
+    assert fetch(app, run, "https://audio.example.com:8443/a.wav?x=1", handler) == b"RIFFaudio"
+    request, = requests
+    assert str(request.url) == "https://93.184.216.34:8443/a.wav?x=1"
+    assert request.headers["host"] == "audio.example.com:8443"
+    assert request.extensions["sni_hostname"] == "audio.example.com"
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "10.1.2.3", "::1", "::ffff:127.0.0.1"])
+def test_name_resolving_to_an_internal_address_is_not_fetched(app, run, dns, address):
+    dns["rebind.example.com"] = address
+    requests = []
+    with pytest.raises(ValueError):
+        fetch(app, run, "http://rebind.example.com/a.wav", requests.append)
+    assert not requests
+
+
+def test_redirects_are_not_followed(app, run, dns):
+    dns["audio.example.com"] = "93.184.216.34"
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(302, headers={"Location": "http://127.0.0.1/secret"})
+
+    with pytest.raises(ValueError, match="redirected"):
+        fetch(app, run, "http://audio.example.com/a.wav", handler)
+    assert len(requests) == 1
+
+
+def test_downloads_stop_at_the_size_cap(app, run, dns, monkeypatch):
+    monkeypatch.setattr(app, "BATCH_URL_MAX_BYTES", 1000)
+    dns["audio.example.com"] = "93.184.216.34"
+
+    async def unsized_body():
+        for _ in range(10):
+            yield b"\x00" * 500
+
+    with pytest.raises(ValueError, match="larger than"):
+        fetch(app, run, "http://audio.example.com/a.wav", lambda request: httpx.Response(200, content=b"\x00" * 5000))
+    with pytest.raises(ValueError, match="larger than"):
+        fetch(app, run, "http://audio.example.com/a.wav", lambda request: httpx.Response(200, content=unsized_body()))
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_interrupted_job_resumes_by_id(app, standin, run, client):
+    files = [("files", (f"clip{n}.wav", wav_file(tone(-20, 1.0)), "audio/wav")) for n in range(3)]
+
+    async def submit():
+        async with client() as http:
+            return await http.post("/transcribe/batch", files=files)
+
+    lines = read_ndjson(run(submit()))
+    job_id = lines[0]["job_id"]
+    assert [line["status"] for line in lines[1:-1]] == ["completed"] * 3
+    assert lines[-1]["completed"] == 3
+
+    # As after a crash mid-job: one result on disk, the manifest still says running
+    results_path = app.batch_job_path(job_id, "results.ndjson")
+    with open(results_path) as f:
+        first = f.readline()
+    with open(results_path, "w") as f:
+        f.write(first)
+    with open(app.batch_job_path(job_id, "manifest.json")) as f:
+        manifest = json.load(f)
+    with open(app.batch_job_path(job_id, "manifest.json"), "w") as f:
+        json.dump({**manifest, "status": "running"}, f)
+    app.batch_jobs.pop(job_id)
+
+    async def resume():
+        async with client() as http:
+            return await http.get(f"/transcribe/batch/{job_id}", params={"offset": 1})
+
+    lines = read_ndjson(run(resume()))
+    assert lines[0]["offset"] == 1
+    resumed = lines[1:-1]
+    assert len(resumed) == 2 and json.loads(first)["id"] not in {line["id"] for line in resumed}
+    assert (lines[-1]["status"], lines[-1]["completed"], lines[-1]["errors"]) == ("completed", 3, 0)
+    with open(results_path) as f:
+        assert len(f.readlines()) == 3
+
+
+def test_unknown_job_is_not_found(run, client):
+    async def scenario():
+        async with client() as http:
+            return await http.get(f"/transcribe/batch/{'0' * 32}")
+
+    assert run(scenario()).status_code == 404
+
+
+def test_sweep_removes_only_idle_jobs_that_are_not_running(app, run, monkeypatch):
+    monkeypatch.setattr(app, "BATCH_JOB_RETENTION_HOURS", 1)
+    idle, running, recent = (f"{n:032x}" for n in (0xa1, 0xa2, 0xa3))
+    for job_id in (idle, running, recent):
+        os.makedirs(app.batch_job_path(job_id, ""), exist_ok=True)
+        with open(app.batch_job_path(job_id, "results.ndjson"), "w"):
+            pass
+    stale = time.time() - 2 * 3600
+    for job_id in (idle, running):
+        for path in (app.batch_job_path(job_id, "results.ndjson"), app.batch_job_path(job_id, "")):
+            os.utime(path, (stale, stale))
+    monkeypatch.setitem(app.batch_jobs, running, {"status": "running"})
+
+    assert run(app.sweep_batch_jobs()) == 1
+    assert not os.path.exists(app.batch_job_path(idle, ""))
+    assert os.path.exists(app.batch_job_path(running, "")) and os.path.exists(app.batch_job_path(recent, ""))
@@ -0,0 +1,86 @@
+"""Gemini context caching against the stand-in's cachedContents API"""
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+HISTORY = "".join(f"User: question {n} about the weather\nAssistant: answer {n}, mostly sunny\n" for n in range(40))
+
+
+@pytest.fixture
+def cache(app, monkeypatch):
+    monkeypatch.setattr(app, "CONTEXT_CACHE_MIN_TOKENS", 100)
+    monkeypatch.setitem(app.chat_sessions, "cache-session", {"messages": []})
+    return app.ContextCacheManager(app.gemini_client)
+
+
+async def settle(cache):
+    await asyncio.gather(*cache.registering.values())
+    await asyncio.sleep(0.01)  # background deletes
+
+
+def test_later_turns_send_only_the_suffix(app, standin, run, cache):
+    first = f"{HISTORY}User: will it rain?\nAssistant:"
+    second = f"{HISTORY}User: will it rain?\nAssistant: no\nUser: and tomorrow?\nAssistant:"
+
+    async def scenario():
+        await cache.generate("cache-session", first, app.GEMINI_MODEL, 100, 0.7)
+        await settle(cache)
+        entry = cache.entries["cache-session"]
+        assert entry["name"].split("/")[-1] in standin.cached_contents
+        reply = await cache.generate("cache-session", second, app.GEMINI_MODEL, 100, 0.7)
+        await settle(cache)
+        return reply
+
+    assert run(scenario()) == standin.STANDIN_REPLY
+    assert cache.metrics["created"] == 1
+    assert cache.metrics["uncached_calls"] == 1 and cache.metrics["cached_calls"] == 1
+    assert cache.metrics["input_tokens_from_cache"] > 0
+
+
+def test_rewritten_history_invalidates_and_deletes_the_cache(app, standin, run, cache):
+    async def scenario():
+        await cache.generate("cache-session", f"{HISTORY}User: hi\nAssistant:", app.GEMINI_MODEL, 100, 0.7)
+        await settle(cache)
+        name = cache.entries["cache-session"]["name"]
+        await cache.generate("cache-session", "User: a fresh start\nAssistant:", app.GEMINI_MODEL, 100, 0.7)
+        await settle(cache)
+        return name
+
+    name = run(scenario())
+    assert cache.metrics["invalidated"] == 1
+    assert "cache-session" not in cache.entries
+    assert name.split("/")[-1] not in standin.cached_contents
+
+
+def test_short_prompts_are_not_cached(app, run, cache):
+    async def scenario():
+        await cache.generate("cache-session", "User: hi\nAssistant: hello\nUser: bye\nAssistant:", app.GEMINI_MODEL, 100, 0.7)
+        await settle(cache)
+
+    run(scenario())
+    assert not cache.entries and cache.metrics["created"] == 0
+
+
+def test_cache_for_a_cleared_session_is_not_kept(app, standin, run, cache):
+    async def scenario():
+        await cache.generate("cache-session", f"{HISTORY}User: hi\nAssistant:", app.GEMINI_MODEL, 100, 0.7)
+        # The session goes away while the cache is being created
+        del app.chat_sessions["cache-session"]
+        await settle(cache)
+
+    before = set(standin.cached_contents)
+    run(scenario())
+    assert not cache.entries
+    assert set(standin.cached_contents) == before
+
+
+def test_cache_stays_off_on_the_sdk_path(app):
+    # The flag is resolved at import, so check it in a fresh interpreter
+    env = {**os.environ, "CONTEXT_CACHE_ENABLED": "true", "ASYNC_PROVIDER_CLIENTS": "false"}
+    result = subprocess.run([sys.executable, "-c", "import app; print(app.CONTEXT_CACHE_ENABLED)"],
+                            env=env, capture_output=True, text=True, timeout=60)
+    assert result.stdout.strip().splitlines()[-1] == "False"
+    assert "context caching is off" in result.stderr
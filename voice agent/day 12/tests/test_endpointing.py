@@ -0,0 +1,50 @@
+import numpy as np
+
+from samples import silence, tone
+
+
+def profile():
+    return {"silence_ms": 600, "bias_ms": 0, "pauses": [], "endpoints": 0, "false_cuts": 0}
+
+
+def test_endpoint_after_trailing_silence(app):
+    endpointer = app.Endpointer(profile())
+    events = endpointer.feed(tone(-20, 1.0).tobytes())
+    assert events == ["speech_start"]
+    events = endpointer.feed(silence(1.0).tobytes())
+    assert events == ["end_likely", "endpoint"]
+
+
+def test_stream_opening_mid_speech_is_detected(app):
+    endpointer = app.Endpointer(profile())
+    # The very first frame is already speech
+    events = endpointer.feed(tone(-15, 1.0).tobytes()) + endpointer.feed(silence(1.0).tobytes())
+    assert events == ["speech_start", "end_likely", "endpoint"]
+
+
+def test_mid_sentence_pause_does_not_end_the_turn(app):
+    endpointer = app.Endpointer(profile())
+    audio = np.concatenate([tone(-20, 1.0), silence(0.25), tone(-20, 1.0)])
+    assert endpointer.feed(audio.tobytes()) == ["speech_start"]
+    # Past the speculation point, but still short of the threshold
+    assert endpointer.feed(np.concatenate([silence(0.45), tone(-20, 0.5)]).tobytes()) == ["end_likely"]
+
+
+def test_false_cut_raises_the_threshold_and_clean_endpoints_lower_it(app):
+    state = profile()
+    endpointer = app.Endpointer(state)
+    endpointer.feed(np.concatenate([tone(-20, 1.0), silence(0.7), tone(-20, 0.5)]).tobytes())
+    assert state["false_cuts"] == 1
+    raised = state["bias_ms"]
+    assert raised > 0
+    endpointer.feed(np.concatenate([tone(-20, 1.0), silence(2.0)]).tobytes())
+    assert state["bias_ms"] < raised
+
+
+def test_frames_split_across_feeds(app):
+    endpointer = app.Endpointer(profile())
+    audio = np.concatenate([tone(-20, 1.0), silence(1.0)]).tobytes()
+    events = []
+    for offset in range(0, len(audio), 1001):
+        events += endpointer.feed(audio[offset:offset + 1001])
+    assert events == ["speech_start", "end_likely", "endpoint"]
@@ -0,0 +1,58 @@
+import uuid
+
+import pytest
+
+TARGETS = {"first_audio_ms": 3000, "total_ms": 6000}
+
+
+@pytest.fixture
+def controller(app):
+    return app.GenerationBudgetController()
+
+
+@pytest.fixture
+def voice_id(app):
+    voice_id = f"budget-{uuid.uuid4().hex}"
+    yield voice_id
+    app.tts_latency_models.pop(voice_id, None)
+
+
+def planned(app, controller, voice_id, max_tokens=800):
+    ctx = app.new_pipeline_context("agent_chat", voice_id=voice_id, max_tokens=max_tokens,
+                                   user_message="what is the weather", prompt="what is the weather",
+                                   budget_targets=TARGETS)
+    controller.plan(ctx)
+    return ctx
+
+
+def test_fitted_slope_is_clamped_at_zero(app):
+    model = app.LinearLatencyModel(500, 8)
+    # Longer replies that happened to come back faster
+    for size, elapsed_ms in [(100, 2000), (200, 1800), (300, 1600), (400, 1400), (500, 1200)]:
+        model.observe(size, elapsed_ms)
+    base, slope = model.coefficients()
+    assert slope == 0.0 and base == 1600
+    assert model.predict(10_000) == 1600
+
+
+def test_plan_falls_back_to_the_prior_slope_when_the_fit_is_flat(app, controller, voice_id):
+    model = controller.llm_model("gemini")
+    for size, elapsed_ms in [(100, 2000), (200, 1800), (300, 1600), (400, 1400), (500, 1200)]:
+        model.observe(size, elapsed_ms)
+    assert model.coefficients()[1] == 0.0
+    app.tts_latency_models[voice_id] = app.LinearLatencyModel(400, 0)
+
+    ctx = planned(app, controller, voice_id)
+    # A zero slope would make every length fit; the prior per-token cost still caps the reply
+    # (3000 ms - 1600 ms fitted base - 400 ms TTS) / 8 ms per token
+    assert ctx["max_tokens"] == 125
+    assert ctx["budget"]["brevity_words"] and controller.metrics["constrained"] == 1
+
+
+def test_no_per_token_cost_keeps_the_requested_length(app, controller, voice_id, monkeypatch):
+    monkeypatch.setattr(app, "BUDGET_LLM_PRIORS", {"gemini": [500, 0]})
+    app.tts_latency_models[voice_id] = app.LinearLatencyModel(400, 0)
+
+    ctx = planned(app, controller, voice_id)
+    assert ctx["max_tokens"] == 800
+    assert ctx["budget"]["brevity_words"] is None and controller.metrics["constrained"] == 0
@@ -0,0 +1,52 @@
+import copy
+import json
+
+import pytest
+
+
+@pytest.fixture
+def health(app, monkeypatch):
+    """Private copies of the health state, so marking providers down does not leak into other tests"""
+    monkeypatch.setattr(app, "service_health", copy.deepcopy(app.service_health))
+    monkeypatch.setattr(app, "health_snapshot", dict(app.health_snapshot))
+    app.refresh_health_snapshot()
+
+
+def get(run, client, path):
+    async def scenario():
+        async with client() as http:
+            return await http.get(path)
+    return run(scenario())
+
+
+def test_health_body_is_json_with_the_live_session_count(app, run, client, health, monkeypatch):
+    monkeypatch.setitem(app.chat_sessions, "health-session", {"messages": []})
+    body = json.loads(get(run, client, "/health").content)
+    assert body["active_sessions"] == len(app.chat_sessions)
+    assert set(body["services"]) == {"assemblyai", "gemini", "murf"}
+
+
+def test_provider_updates_only_mark_the_snapshot_stale(app, run, client, health):
+    prefix = app.health_snapshot["body_prefix"]
+    app.update_service_health("murf", False, "Murf is down")
+    assert app.health_snapshot["dirty"] and app.health_snapshot["body_prefix"] is prefix
+    body = json.loads(get(run, client, "/health").content)
+    assert body["status"] == "degraded" and body["issues"] == ["murf: Murf is down"]
+    assert not app.health_snapshot["dirty"]
+
+
+def test_not_ready_until_the_first_probe_round(app, run, client, health, monkeypatch):
+    monkeypatch.setattr(app, "HEALTH_PROBE_ENABLED", True)
+    app.health_snapshot["probe_rounds"] = 0
+    assert get(run, client, "/ready").status_code == 503
+    app.health_snapshot["probe_rounds"] = 1
+    response = get(run, client, "/ready")
+    assert response.status_code == 200 and response.json()["ready"] is True
+
+
+def test_not_ready_when_every_provider_is_failing(app, run, client, health):
+    for name in app.service_health:
+        app.update_service_health(name, False, "down")
+    response = get(run, client, "/ready")
+    assert response.status_code == 503
+    assert response.json() == {"ready": False, "status": "unhealthy"}
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+ASYNC = {"Prefer": "respond-async"}
+
+
+@pytest.fixture
+def jobs(app, monkeypatch):
+    """A fresh queue per test: its workers belong to the test's event loop"""
+    queue = app.PipelineJobQueue(workers=1, queue_size=1, store_size=10, result_ttl=300)
+    monkeypatch.setattr(app, "pipeline_jobs", queue)
+    return queue
+
+
+def test_agent_chat_job_is_accepted_then_fetched(app, standin, run, client, jobs):
+    async def scenario():
+        async with client() as http:
+            accepted = await http.post("/agent/chat/job-session", data={"text": "hello there"}, headers=ASYNC)
+            finished = await http.get(accepted.headers["location"], params={"wait": 5})
+            return accepted, finished
+
+    accepted, finished = run(scenario())
+    assert accepted.status_code == 202 and accepted.json()["status"] == "queued"
+    body = finished.json()
+    assert body["status"] == "completed" and body["error"] is None
+    assert body["result"]["success"] is True and body["result"]["ai_response"] == standin.STANDIN_REPLY
+    app.chat_sessions.pop("job-session", None)
+
+
+def test_long_poll_returns_at_the_wait_or_when_the_job_finishes(app, run, client, jobs):
+    async def slow():
+        await asyncio.sleep(0.2)
+        return {"answer": 42}
+
+    async def scenario():
+        job = jobs.submit("llm_query", slow)
+        async with client() as http:
+            early = await http.get(f"/jobs/{job['job_id']}", params={"wait": 0.05})
+            done = await http.get(f"/jobs/{job['job_id']}", params={"wait": 5})
+            return early.json(), done.json()
+
+    early, done = run(scenario())
+    assert early["status"] == "running" and early["result"] is None
+    assert done["status"] == "completed" and done["result"] == {"answer": 42}
+
+
+def test_full_queue_answers_503_with_retry_after(app, run, client, jobs):
+    release = None
+
+    async def blocked():
+        await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        jobs.submit("llm_query", blocked)
+        await asyncio.sleep(0)  # the worker takes the first job, the second one fills the queue
+        jobs.submit("llm_query", blocked)
+        async with client() as http:
+            response = await http.post("/llm/query", json={"query": "hello"}, headers=ASYNC)
+        release.set()
+        return response
+
+    response = run(scenario())
+    assert response.status_code == 503 and response.headers["retry-after"] == "5"
+    assert jobs.metrics["rejected"] == 1
+
+
+def test_unexpected_failure_does_not_leak_the_error_text(app, run, jobs):
+    async def broken():
+        raise RuntimeError("connection string postgres://admin:secret@db")
+
+    async def scenario():
+        job = jobs.submit("llm_query", broken)
+        await jobs.wait(job, 1)
+        return jobs.view(job)
+
+    view = run(scenario())
+    assert view["status"] == "failed"
+    assert view["error"] == {"status_code": 500, "detail": app.FALLBACK_MESSAGES["general_error"]}
+
+
+def test_failed_agent_chat_job_returns_the_fallback_response(app, run, client, jobs, monkeypatch):
+    async def broken(ctx):
+        raise RuntimeError("pipeline exploded")
+
+    monkeypatch.setattr(app.conversation_pipeline, "run", broken)
+
+    async def scenario():
+        async with client() as http:
+            accepted = await http.post("/agent/chat/job-failure", data={"text": "hello"}, headers=ASYNC)
+            return (await http.get(accepted.headers["location"], params={"wait": 5})).json()
+
+    body = run(scenario())
+    assert body["status"] == "completed"
+    assert body["result"]["success"] is False and body["result"]["error_type"] == "general_error"
+    assert "exploded" not in str(body)
+    app.chat_sessions.pop("job-failure", None)
+
+
+def test_finished_jobs_expire(app, run, jobs):
+    jobs.result_ttl = 0.05
+
+    async def quick():
+        return "done"
+
+    async def scenario():
+        job = jobs.submit("llm_query", quick)
+        await jobs.wait(job, 1)
+        await asyncio.sleep(0.1)
+        with pytest.raises(HTTPException) as raised:
+            jobs.get(job["job_id"])
+        return raised.value
+
+    assert run(scenario()).status_code == 404
+    assert jobs.metrics["expired"] == 1
@@ -0,0 +1,67 @@
+import io
+import math
+import struct
+import wave
+
+
+def spoken_wav(seconds=1.0, sample_rate=16000):
+    """A tone loud enough to pass the VAD"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"".join(
+            struct.pack("<h", int(8000 * math.sin(2 * math.pi * 220 * n / sample_rate)))
+            for n in range(int(seconds * sample_rate))
+        ))
+    return buffer.getvalue()
+
+
+def test_text_query_from_json_body(app, standin, run, client):
+    async def scenario():
+        async with client() as http:
+            return await http.post("/llm/query", json={"query": "What can you do?", "max_tokens": 200})
+
+    response = run(scenario())
+    assert response.status_code == 200
+    body = response.json()
+    assert body["query"] == "What can you do?"
+    assert body["response"] == standin.STANDIN_REPLY
+    assert body["max_tokens"] == 200
+    assert "audio_url" not in body
+
+
+def test_text_query_rejects_invalid_json_body(run, client):
+    async def scenario():
+        async with client() as http:
+            return await http.post("/llm/query", json={"max_tokens": 200})
+
+    assert run(scenario()).status_code == 422
+
+
+def test_query_without_text_or_audio_is_rejected(run, client):
+    async def scenario():
+        async with client() as http:
+            return await http.post("/llm/query", data={"voice_id": "en-US-natalie"})
+
+    assert run(scenario()).status_code == 400
+
+
+def test_voice_query_from_multipart_upload(app, standin, run, client):
+    async def scenario():
+        async with client() as http:
+            return await http.post(
+                "/llm/query",
+                files={"file": ("question.wav", spoken_wav(), "audio/wav")},
+                data={"voice_id": "en-US-natalie", "max_tokens": "300"}
+            )
+
+    response = run(scenario())
+    assert response.status_code == 200
+    body = response.json()
+    assert body["query"] == standin.STANDIN_TRANSCRIPT
+    assert body["response"] == standin.STANDIN_REPLY
+    assert body["max_tokens"] == 300
+    assert body["audio_url"]
+    assert set(body["stage_timings"]) >= {"stt", "llm", "tts"}
@@ -0,0 +1,66 @@
+import io
+import json
+import logging
+import random
+import threading
+
+import pytest
+
+
+def record(level=logging.INFO):
+    return logging.LogRecord("app.session", level, __file__, 1, "message %s", ("argument",), None)
+
+
+def test_sampling_keeps_a_fraction_of_info_records(app, monkeypatch):
+    monkeypatch.setattr(random, "random", iter([0.05, 0.5, 0.09, 0.95]).__next__)
+    sampler = app.LogSamplingFilter(0.1)
+    assert [sampler.filter(record()) for _ in range(4)] == [True, False, True, False]
+
+
+def test_sampling_never_drops_warnings_or_errors(app):
+    sampler = app.LogSamplingFilter(0.0)
+    assert not sampler.filter(record(logging.INFO))
+    assert sampler.filter(record(logging.WARNING)) and sampler.filter(record(logging.ERROR))
+
+
+@pytest.fixture
+def log_output(app):
+    """Route the root logger into a buffer for the test, then restore the app's configuration"""
+    output = io.StringIO()
+    yield output
+    app.configure_logging()
+
+
+def test_queued_records_are_formatted_on_the_listener_thread(app, log_output):
+    app.configure_logging("json", use_queue=True, stream=log_output)
+    formatted_on = []
+
+    class Argument:
+        def __str__(self):
+            formatted_on.append(threading.current_thread())
+            return "argument"
+
+    token = app.log_context.set({"endpoint": "agent_chat", "session_id": "s1"})
+    try:
+        app.logger.info("queued %s", Argument())
+        app.error_logger.error("Error occurred: %s", "tts_error", extra={"fields": {"error_type": "tts_error"}})
+    finally:
+        app.log_context.reset(token)
+    app.stop_logging()
+
+    info, error = [json.loads(line) for line in log_output.getvalue().splitlines()]
+    assert formatted_on and threading.current_thread() not in formatted_on
+    assert info["message"] == "queued argument" and info["level"] == "INFO"
+    assert (info["endpoint"], info["session_id"]) == ("agent_chat", "s1")
+    assert error["error_type"] == "tts_error" and error["session_id"] == "s1"
+
+
+def test_text_format_appends_the_request_context(app, log_output):
+    app.configure_logging("text", use_queue=False, stream=log_output)
+    token = app.log_context.set({"turn_id": "t1"})
+    try:
+        app.logger.warning("slow turn")
+    finally:
+        app.log_context.reset(token)
+    line = log_output.getvalue().strip()
+    assert " - app - WARNING - slow turn " in line and line.endswith('{"turn_id":"t1"}')
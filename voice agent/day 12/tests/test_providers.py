@@ -0,0 +1,71 @@
+"""The async provider clients and adapters against the provider stand-ins"""
+
+
+def test_transcription_is_completed_by_the_shared_poller(app, standin, run):
+    async def scenario():
+        return await app.run_transcription(b"audio bytes")
+
+    before = app.transcription_engine.metrics["completed_by_poll"]
+    result = run(scenario())
+    assert result["status"] == "completed"
+    assert result["text"] == standin.STANDIN_TRANSCRIPT
+    assert app.transcription_engine.metrics["completed_by_poll"] == before + 1
+    assert not app.transcription_engine.pending
+
+
+def test_concurrent_transcriptions_are_not_limited_by_provider_slots(app, run, monkeypatch):
+    scheduler = app.ProviderScheduler("assemblyai", limit=1)
+    monkeypatch.setitem(app.provider_schedulers, "assemblyai", scheduler)
+
+    async def scenario():
+        import asyncio
+        return await asyncio.gather(*(app.run_transcription(f"clip {n}".encode()) for n in range(4)))
+
+    results = run(scenario())
+    assert [result["status"] for result in results] == ["completed"] * 4
+    assert scheduler.active["standard"] == 0
+
+
+def test_webhook_completes_a_pending_transcript(app, standin, run):
+    async def scenario():
+        import asyncio
+        upload_url = await app.assemblyai_client.upload(b"audio")
+        job = await app.assemblyai_client.submit(upload_url)
+        future = asyncio.get_running_loop().create_future()
+        app.transcription_engine.pending[job["id"]] = {"future": future, "interval": 60, "next_poll": float("inf")}
+        try:
+            standin.transcripts[job["id"]]["ready_at"] = 0
+            assert await app.transcription_engine.handle_webhook(job["id"])
+            return await future
+        finally:
+            app.transcription_engine.pending.pop(job["id"], None)
+
+    assert run(scenario())["text"] == standin.STANDIN_TRANSCRIPT
+
+
+def test_llm_generation(app, standin, run):
+    async def scenario():
+        return await app.run_llm_generation("User: hello\nAssistant:", 100, 0.7)
+
+    assert run(scenario()) == standin.STANDIN_REPLY
+
+
+def test_tts_generation_returns_a_fetchable_url(app, run):
+    async def scenario():
+        url = await app.run_tts_generation("Hello there.", "en-US-natalie")
+        response = await app.get_http_client().get(url)
+        return response
+
+    response = run(scenario())
+    assert response.status_code == 200
+    assert response.content[:4] == b"RIFF"
+
+
+def test_health_probe_marks_providers_healthy(app, run):
+    async def scenario():
+        for name in app.service_health:
+            await app.probe_service(name)
+
+    run(scenario())
+    assert all(health["status"] == "healthy" for health in app.service_health.values())
+    assert all(health["probe_latency_ms"] is not None for health in app.service_health.values())
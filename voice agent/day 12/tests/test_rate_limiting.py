@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.fixture
+def clock(app, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_allows_burst_then_reports_retry_after(app, clock):
+    bucket = app.TokenBucket(rate=2.0, burst=3)
+    assert [bucket.take()[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = bucket.take()
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+
+
+def test_bucket_refills_at_rate_up_to_burst(app, clock):
+    bucket = app.TokenBucket(rate=2.0, burst=3)
+    for _ in range(3):
+        bucket.take()
+    clock[0] += 1.0
+    assert bucket.take(cost=2) == (True, 0.0)
+    clock[0] += 60
+    assert bucket.take(cost=3) == (True, 0.0)
+    assert not bucket.take()[0]
+
+
+def test_bucket_reserves_future_tokens_within_max_wait(app, clock):
+    bucket = app.TokenBucket(rate=1.0, burst=1)
+    bucket.take()
+    allowed, wait = bucket.take(max_wait=2.0)
+    assert allowed and wait == pytest.approx(1.0)
+    # The reservation is spent: the next caller waits behind it
+    allowed, wait = bucket.take(max_wait=1.5)
+    assert not allowed and wait == pytest.approx(2.0)
+
+
+def test_rate_limiter_keys_are_independent_and_bounded(app, clock):
+    limiter = app.RateLimiter(max_keys=2)
+    assert limiter.check("session", "a", 1.0, 1)[0]
+    assert not limiter.check("session", "a", 1.0, 1)[0]
+    assert limiter.check("session", "b", 1.0, 1)[0]
+    limiter.check("session", "c", 1.0, 1)
+    assert list(limiter.buckets["session"]) == ["b", "c"]
+    assert limiter.snapshot()["session"]["limited"] == 1
+
+
+def test_zero_rate_disables_the_bucket(app):
+    limiter = app.RateLimiter(max_keys=10)
+    assert all(limiter.check("provider", "murf", 0, 0)[0] for _ in range(100))
+    assert "provider" not in limiter.buckets
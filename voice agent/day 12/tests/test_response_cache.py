@@ -0,0 +1,45 @@
+import pytest
+
+
+@pytest.fixture
+def cache(app):
+    return app.ResponseCache()
+
+
+def test_exact_hit_ignores_case_and_punctuation(cache):
+    cache.store("What is the capital of France?", "Paris.")
+    entry, tier = cache.lookup("what is the capital of france")
+    assert (entry["response"], tier) == ("Paris.", "exact")
+
+
+def test_semantic_hit_on_a_reworded_query(cache):
+    cache.store("What is the weather like in Paris today", "Sunny.")
+    entry, tier = cache.lookup("What's the weather like in Paris today?")
+    assert (entry["response"], tier) == ("Sunny.", "semantic")
+    assert cache.metrics["semantic_hits"] == 1
+
+
+def test_different_numbers_are_never_a_semantic_hit(app, cache, monkeypatch):
+    # Low enough that these queries are otherwise near neighbours
+    monkeypatch.setattr(app, "RESPONSE_CACHE_SIMILARITY", 0.8)
+    cache.store("What is 2+2?", "4")
+    cache.store("Convert 5 km to miles", "3.1 miles")
+    assert cache.lookup("What is 2+3?") is None
+    assert cache.lookup("Convert 50 km to miles") is None
+    assert cache.lookup("Convert five km to miles") is None
+    assert cache.metrics["misses"] == 3
+
+
+def test_semantic_tier_skips_a_closer_match_with_other_numbers(app, cache, monkeypatch):
+    monkeypatch.setattr(app, "RESPONSE_CACHE_SIMILARITY", 0.8)
+    cache.store("please convert 5 km to miles", "3.1 miles")
+    cache.store("please convert 50 km in miles", "31 miles")
+    entry, tier = cache.lookup("please convert 50 km to miles")
+    assert (entry["response"], tier) == ("31 miles", "semantic")
+
+
+def test_entries_expire_after_the_ttl(app, cache, monkeypatch):
+    monkeypatch.setattr(app, "RESPONSE_CACHE_TTL", 60)
+    cache.store("What is the capital of France?", "Paris.")["created_at"] -= 61
+    assert cache.lookup("What is the capital of France?") is None
+    assert not cache.entries
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+
+@pytest.fixture
+def router(app, monkeypatch):
+    router = app.LatencyRouter()
+    monkeypatch.setattr(app, "latency_router", router)
+    return router
+
+
+def observe(app, router, backend, elapsed_ms):
+    for _ in range(app.LATENCY_MIN_SAMPLES):
+        router.record("llm", backend, elapsed_ms)
+
+
+def test_default_llm_chain_has_no_lite_model_and_no_hedging(app):
+    assert app.PIPELINE_BACKENDS["llm"] == ["gemini"]
+    assert not app.HEDGE_ENABLED
+
+
+def test_order_keeps_the_primary_until_an_alternate_is_clearly_faster(app, router):
+    backends = ["primary", "alternate"]
+    assert router.order("llm", backends) == backends  # no samples yet
+    observe(app, router, "primary", 1000)
+    observe(app, router, "alternate", 800)
+    assert router.order("llm", backends) == backends  # faster, but not by the switch ratio
+    observe(app, router, "alternate", 500)
+    assert router.order("llm", backends) == ["alternate", "primary"]
+    assert router.stage_metrics("llm")["reroutes"] == 1
+
+
+def test_order_keeps_exploring_the_configured_order(app, router):
+    observe(app, router, "primary", 1000)
+    observe(app, router, "alternate", 100)
+    orders = [router.order("llm", ["primary", "alternate"])[0] for _ in range(app.LATENCY_ROUTING_EXPLORE_EVERY)]
+    assert orders.count("primary") == 1 and orders[-1] == "primary"
+
+
+def test_hedges_are_capped_to_the_max_rate(app, router):
+    stats = router.stage_metrics("llm")
+    stats["calls"] = 10
+    assert router.allow_hedge("llm")
+    stats["hedges"] = int(10 * app.HEDGE_MAX_RATE)
+    assert not router.allow_hedge("llm")
+    assert stats["hedges_capped"] == 1
+
+
+@pytest.fixture
+def stage(app, router, monkeypatch):
+    """An llm stage over two scripted backends; the hedge fires after 50 ms"""
+    monkeypatch.setattr(app, "HEDGE_DEFAULT_DELAY", 0.05)
+    monkeypatch.setattr(app, "stage_backends", {**app.stage_backends, "llm": {}})
+
+    class ScriptedStage(app.PipelineStage):
+        name = "llm"
+
+        async def run(self, ctx):
+            pass
+
+    return ScriptedStage(backends=["primary", "alternate"])
+
+
+def backend(delay, result=None, error=None, events=None):
+    async def call(*args, max_retries):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if events is not None:
+                events.append("cancelled")
+            raise
+        if error:
+            raise error
+        return result
+    return call
+
+
+def test_slow_primary_loses_to_the_hedge_and_is_cancelled(app, router, stage):
+    events = []
+    app.stage_backends["llm"].update(primary=backend(1.0, "slow", events=events), alternate=backend(0.01, "fast"))
+    router.stage_metrics("llm")["calls"] = 100
+
+    async def scenario():
+        result = await stage.hedged_call("primary", "alternate", ())
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == ("alternate", "fast")
+    assert events == ["cancelled"]
+    assert router.stage_metrics("llm")["hedges"] == 1 and router.stage_metrics("llm")["hedge_wins"] == 1
+
+
+def test_primary_that_answers_in_time_is_not_hedged(app, router, stage):
+    app.stage_backends["llm"].update(primary=backend(0.01, "primary"), alternate=backend(0.01, "alternate"))
+    assert asyncio.run(stage.hedged_call("primary", "alternate", ())) == ("primary", "primary")
+    assert router.stage_metrics("llm")["hedges"] == 0
+
+
+def test_primary_failing_fast_falls_back_without_counting_a_hedge(app, router, stage):
+    app.stage_backends["llm"].update(primary=backend(0, error=HTTPException(status_code=503, detail="down")),
+                        alternate=backend(0.01, "alternate"))
+    assert asyncio.run(stage.hedged_call("primary", "alternate", ())) == ("alternate", "alternate")
+    assert router.stage_metrics("llm")["hedges"] == 0
+
+
+def test_client_errors_are_not_retried_on_the_alternate(app, router, stage):
+    app.stage_backends["llm"].update(primary=backend(0, error=HTTPException(status_code=400, detail="bad")),
+                        alternate=backend(0.01, "alternate"))
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(stage.hedged_call("primary", "alternate", ()))
+    assert raised.value.status_code == 400
+
+
+def test_capped_hedge_waits_for_the_primary(app, router, stage):
+    app.stage_backends["llm"].update(primary=backend(0.1, "slow"), alternate=backend(0.01, "fast"))
+    # No calls recorded yet, so even one hedge would exceed HEDGE_MAX_RATE
+    assert asyncio.run(stage.hedged_call("primary", "alternate", ())) == ("primary", "slow")
+    assert router.stage_metrics("llm")["hedges_capped"] == 1
@@ -0,0 +1,97 @@
+import asyncio
+
+
+def test_interactive_calls_are_served_before_queued_bulk_work(app):
+    async def scenario():
+        scheduler = app.ProviderScheduler("murf", limit=1)
+        order = []
+        await scheduler.acquire("standard", "holder", 1)
+
+        async def call(priority, flow):
+            await scheduler.acquire(priority, flow, 1)
+            order.append(priority)
+            scheduler.release(priority)
+
+        tasks = [asyncio.create_task(call("bulk", "job")), asyncio.create_task(call("interactive", "session"))]
+        await asyncio.sleep(0)
+        scheduler.release("standard")
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "bulk"]
+
+
+def test_bulk_work_is_capped_to_its_share_of_slots(app):
+    async def scenario():
+        scheduler = app.ProviderScheduler("murf", limit=4)
+        for _ in range(scheduler.bulk_limit):
+            await scheduler.acquire("bulk", "job", 1)
+        blocked = asyncio.create_task(scheduler.acquire("bulk", "job", 1))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        # Conversational calls still find a free slot
+        await asyncio.wait_for(scheduler.acquire("interactive", "session", 1), 1)
+        scheduler.release("bulk")
+        await asyncio.wait_for(blocked, 1)
+        return scheduler.active
+
+    active = asyncio.run(scenario())
+    assert active["interactive"] == 1 and active["bulk"] == 2
+
+
+def test_flows_in_one_class_share_slots_fairly(app):
+    async def scenario():
+        scheduler = app.ProviderScheduler("gemini", limit=1)
+        await scheduler.acquire("standard", "holder", 1)
+        served = []
+
+        async def call(flow):
+            await scheduler.acquire("standard", flow, 1)
+            served.append(flow)
+            scheduler.release("standard")
+
+        # One session queues four calls before another queues one
+        tasks = [asyncio.create_task(call("busy")) for _ in range(4)]
+        tasks.append(asyncio.create_task(call("quiet")))
+        await asyncio.sleep(0)
+        scheduler.release("standard")
+        await asyncio.gather(*tasks)
+        return served
+
+    served = asyncio.run(scenario())
+    assert served.index("quiet") <= 1
+
+
+def test_shortest_job_first_within_a_flow(app):
+    async def scenario():
+        scheduler = app.ProviderScheduler("murf", limit=1)
+        await scheduler.acquire("standard", "holder", 1)
+        served = []
+
+        async def call(cost):
+            await scheduler.acquire("standard", "session", cost)
+            served.append(cost)
+            scheduler.release("standard")
+
+        tasks = [asyncio.create_task(call(cost)) for cost in (300, 20, 100)]
+        await asyncio.sleep(0)
+        scheduler.release("standard")
+        await asyncio.gather(*tasks)
+        return served
+
+    assert asyncio.run(scenario()) == [20, 100, 300]
+
+
+def test_cancelled_waiter_gives_up_its_place(app):
+    async def scenario():
+        scheduler = app.ProviderScheduler("murf", limit=1)
+        await scheduler.acquire("standard", "holder", 1)
+        waiter = asyncio.create_task(scheduler.acquire("standard", "gone", 1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        scheduler.release("standard")
+        await asyncio.wait_for(scheduler.acquire("standard", "next", 1), 1)
+        return scheduler.active["standard"], scheduler.depth["standard"]
+
+    assert asyncio.run(scenario()) == (1, 0)
@@ -0,0 +1,57 @@
+import asyncio
+
+
+def test_identical_concurrent_calls_share_one_execution(app):
+    calls = []
+
+    async def provider_call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"text": "shared"}
+
+    async def scenario():
+        results = await asyncio.gather(*(app.single_flight("gemini", "gemini:same", provider_call) for _ in range(5)))
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [{"text": "shared"}] * 5
+    # Coalesced callers get their own copy to modify
+    assert len({id(result) for result in results}) == 5
+    assert "gemini:same" not in app.inflight_requests
+
+
+def test_cancelling_one_waiter_does_not_fail_the_others(app):
+    async def provider_call():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(app.single_flight("murf", "murf:hedge", provider_call))
+        second = asyncio.create_task(app.single_flight("murf", "murf:hedge", provider_call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_failures_reach_every_waiter_and_are_not_cached(app):
+    attempts = []
+
+    async def failing_call():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(app.single_flight("assemblyai", "assemblyai:fail", failing_call) for _ in range(3)),
+            return_exceptions=True
+        )
+        retry = await asyncio.gather(app.single_flight("assemblyai", "assemblyai:fail", failing_call), return_exceptions=True)
+        return results + retry
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(attempts) == 2
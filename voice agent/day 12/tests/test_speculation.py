@@ -0,0 +1,141 @@
+import asyncio
+import uuid
+
+import pytest
+
+SETTINGS = {"max_tokens": 200, "temperature": 0.7}
+
+
+@pytest.fixture
+def engine(app):
+    return app.SpeculationEngine()
+
+
+@pytest.fixture
+def session_id(app):
+    session_id = f"speculation-{uuid.uuid4().hex}"
+    yield session_id
+    app.chat_sessions.pop(session_id, None)
+
+
+def test_matching_final_transcript_commits_the_speculation(app, standin, run, engine, session_id):
+    async def scenario():
+        turn = engine.new_turn(session_id, SETTINGS)
+        engine.on_partial(turn, "what is the weather in paris")
+        engine.end_likely(turn)
+        await asyncio.sleep(0.05)
+        resolved = engine.resolve(turn, "What is the weather in Paris?")
+        return resolved is turn, await engine.commit(turn)
+
+    matched, result = run(scenario())
+    assert matched
+    assert result["text"] == standin.STANDIN_REPLY and result["speculative"] is True
+    assert result["saved_ms"] > 0
+    assert engine.metrics["started"] == 1 and engine.metrics["committed"] == 1 and engine.metrics["discarded"] == 0
+
+
+def test_speculation_starts_once_the_partial_is_stable(app, run, engine, session_id, monkeypatch):
+    monkeypatch.setattr(app, "SPECULATION_STABLE_MS", 20)
+
+    async def scenario():
+        turn = engine.new_turn(session_id, SETTINGS)
+        engine.on_partial(turn, "what is the weather")
+        await asyncio.sleep(0.01)
+        engine.on_partial(turn, "what is the weather in paris")
+        await asyncio.sleep(0.01)
+        early = turn.task
+        await asyncio.sleep(0.03)
+        started = turn.text
+        engine.close(turn)
+        return early, started
+
+    early, started = run(scenario())
+    assert early is None and started == "what is the weather in paris"
+    assert engine.metrics["started"] == 1
+
+
+def test_diverging_partial_discards_and_charges_the_full_reply(app, run, engine, session_id):
+    async def scenario():
+        turn = engine.new_turn(session_id, SETTINGS)
+        engine.on_partial(turn, "what is the weather")
+        engine.end_likely(turn)
+        task, prompt = turn.task, turn.prompt
+        engine.on_partial(turn, "what is the weather in paris tomorrow")
+        await asyncio.sleep(0)
+        return task, prompt, turn
+
+    task, prompt, turn = run(scenario())
+    assert task.cancelled() and turn.task is None
+    # Cancelling does not stop the provider, so the whole max_tokens is counted as wasted
+    assert engine.metrics["wasted_tokens"] == app.estimate_tokens(prompt) + SETTINGS["max_tokens"]
+    assert engine.metrics["discarded"] == 1
+
+
+def test_different_final_transcript_discards_a_finished_speculation(app, standin, run, engine, session_id):
+    async def scenario():
+        turn = engine.new_turn(session_id, SETTINGS)
+        engine.on_partial(turn, "what is the weather")
+        engine.end_likely(turn)
+        await turn.task
+        prompt = turn.prompt
+        return prompt, engine.resolve(turn, "what is the weather in Rome")
+
+    prompt, resolved = run(scenario())
+    assert resolved is None
+    assert engine.metrics["wasted_tokens"] == app.estimate_tokens(prompt) + app.estimate_tokens(standin.STANDIN_REPLY)
+    assert engine.metrics["utterances"] == 1 and engine.metrics["committed"] == 0
+
+
+def test_no_speculation_while_the_waste_budget_is_in_debt(app, run, engine, session_id):
+    engine.waste_budget = app.TokenBucket(0.001, 100)
+
+    async def scenario():
+        turn = engine.new_turn(session_id, SETTINGS)
+        engine.on_partial(turn, "what is the weather")
+        engine.end_likely(turn)
+        # Discarding charges more than the whole burst; the debt is taken regardless
+        engine.on_partial(turn, "what is the weather in paris")
+        engine.end_likely(turn)
+        return turn
+
+    turn = run(scenario())
+    assert turn.task is None and engine.waste_budget.tokens < 0
+    assert engine.metrics["started"] == 1 and engine.metrics["skipped_budget"] == 1
+
+
+def test_short_partials_do_not_start_speculation(app, run, engine, session_id):
+    async def scenario():
+        turn = engine.new_turn(session_id, SETTINGS)
+        engine.on_partial(turn, "what is")
+        engine.end_likely(turn)
+        return turn
+
+    assert run(scenario()).task is None
+    assert engine.metrics["started"] == 0
+
+
+def test_tighter_budget_discards_the_speculation(app, standin, run, engine, session_id):
+    async def scenario():
+        turn = engine.new_turn(session_id, SETTINGS)
+        engine.on_partial(turn, "what is the weather in paris")
+        engine.end_likely(turn)
+        await turn.task
+        engine.resolve(turn, "what is the weather in paris")
+        return turn, await engine.commit(turn, {"max_tokens": 120, "brevity_words": 76})
+
+    turn, result = run(scenario())
+    assert result is None and turn.task is None
+    assert engine.metrics["over_budget"] == 1 and engine.metrics["discarded"] == 1 and engine.metrics["committed"] == 0
+
+
+def test_unconstrained_budget_commits_the_speculation(app, standin, run, engine, session_id):
+    async def scenario():
+        turn = engine.new_turn(session_id, SETTINGS)
+        engine.on_partial(turn, "what is the weather in paris")
+        engine.end_likely(turn)
+        engine.resolve(turn, "what is the weather in paris")
+        return await engine.commit(turn, {"max_tokens": SETTINGS["max_tokens"], "brevity_words": None})
+
+    result = run(scenario())
+    assert result["text"] == standin.STANDIN_REPLY
+    assert engine.metrics["over_budget"] == 0 and engine.metrics["committed"] == 1
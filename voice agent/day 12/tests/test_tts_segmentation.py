@@ -0,0 +1,45 @@
+import uuid
+
+REPLY = ("Tomorrow looks mild, with light rain in the morning. It should clear by noon, and the "
+         "afternoon will be dry; temperatures reach about twenty six degrees. ") * 20
+
+
+def fresh_voice():
+    # Latency models are per voice; a new voice starts from TTS_LATENCY_PRIOR
+    return f"test-{uuid.uuid4().hex}"
+
+
+def test_short_reply_is_one_segment(app):
+    assert app.plan_tts_segments("Sure, happy to help.", fresh_voice()) == ["Sure, happy to help."]
+
+
+def test_segments_cover_the_reply_and_grow(app):
+    voice = fresh_voice()
+    segments = app.plan_tts_segments(REPLY, voice)
+    assert " ".join(segments).split() == REPLY.split()
+    assert len(segments) > 2
+    assert len(segments[0]) <= app.first_tts_segment_chars(voice)
+    assert len(segments[-2]) > len(segments[0])
+    assert all(len(segment) <= app.MURF_MAX_CHARS for segment in segments)
+
+
+def test_segments_end_at_sentence_or_clause_breaks(app):
+    segments = app.plan_tts_segments(REPLY, fresh_voice())
+    assert all(segment[-1] in ".,;" for segment in segments)
+
+
+def test_first_segment_follows_measured_latency(app):
+    fast, slow = fresh_voice(), fresh_voice()
+    for size in (50, 100, 150, 200, 250):
+        app.tts_latency_model(fast).observe(size, 100 + 1 * size)
+        app.tts_latency_model(slow).observe(size, 600 + 8 * size)
+    assert app.first_tts_segment_chars(fast) > app.first_tts_segment_chars(slow)
+    assert app.first_tts_segment_chars(slow) == app.TTS_FIRST_SEGMENT_MIN_CHARS
+
+
+def test_flat_latency_samples_keep_a_usable_slope(app):
+    voice = fresh_voice()
+    for size in (50, 100, 150, 200, 250):
+        app.tts_latency_model(voice).observe(size, 500)
+    segments = app.plan_tts_segments(REPLY, voice)
+    assert " ".join(segments).split() == REPLY.split()
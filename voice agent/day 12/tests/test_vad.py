@@ -0,0 +1,24 @@
+import numpy as np
+
+from samples import RATE, silence, tone
+
+
+def test_speech_bounds_trim_leading_and_trailing_silence(app):
+    samples = np.concatenate([silence(1.0), tone(-20, 1.0), silence(1.0)])
+    start, end = app.detect_speech_bounds(samples)
+    padding = app.VAD_PADDING_MS * RATE // 1000
+    assert RATE - padding - 480 <= start <= RATE - padding + 480
+    assert 2 * RATE + padding - 480 <= end <= 2 * RATE + padding + 480
+
+
+def test_silent_clip_has_no_speech(app):
+    assert app.detect_speech_bounds(silence(2.0)) is None
+    assert app.detect_speech_bounds(tone(-70, 2.0)) is None
+
+
+def test_continuous_speech_without_quiet_part_is_kept(app):
+    # Loud throughout with under 12 dB of range: no frame is far above the clip's own floor
+    t = np.arange(2 * RATE) / RATE
+    level = 10 ** ((-13 - 3 * np.sin(2 * np.pi * 3 * t)) / 20)
+    samples = (level * np.sqrt(2) * np.sin(2 * np.pi * 200 * t) * 32767).astype(np.int16)
+    assert app.detect_speech_bounds(samples) == (0, len(samples))